@@ -0,0 +1,60 @@
+"""
+Compare two `benchmarks.run` reports route by route.
+
+Prints p50/p95 latency, throughput and queries per request side by side with the relative
+change, flagging latency regressions above a threshold.
+
+Usage (from the backend directory):
+    python -m benchmarks.compare results/before.json results/after.json --threshold 10
+"""
+import argparse
+import json
+from typing import Any, Dict, Tuple
+
+METRICS = ("p50_ms", "p95_ms", "throughput_rps", "queries_per_request", "bytes_per_request")
+
+
+def load(path: str) -> Tuple[Dict[str, Any], Dict[Tuple[str, str], Dict[str, Any]]]:
+    with open(path) as handle:
+        report = json.load(handle)
+    return report["meta"], {(result["mode"], result["route"]): result for result in report["results"]}
+
+
+def change(before: float, after: float) -> float:
+    return round((after - before) / before * 100, 1) if before else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent p95 increase reported as a regression")
+    args = parser.parse_args()
+
+    before_meta, before = load(args.before)
+    after_meta, after = load(args.after)
+    print(f"before: {before_meta.get('git_commit')} {before_meta.get('database')} {before_meta.get('scale')}")
+    print(f"after:  {after_meta.get('git_commit')} {after_meta.get('database')} {after_meta.get('scale')}")
+    print(f"peak RSS: {before_meta.get('peak_rss_mb')}MB -> {after_meta.get('peak_rss_mb')}MB\n")
+
+    regressions = 0
+    for key in sorted(set(before) & set(after)):
+        mode, route = key
+        cells = []
+        for metric in METRICS:
+            # Reports from before a metric existed count it as 0
+            old, new = before[key].get(metric, 0), after[key].get(metric, 0)
+            cells.append(f"{metric}={old}->{new} ({change(old, new):+}%)")
+        flag = ""
+        if change(before[key]["p95_ms"], after[key]["p95_ms"]) > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{mode:6} {route:50} {'  '.join(cells)}{flag}")
+
+    for key in sorted(set(before) ^ set(after)):
+        print(f"{key[0]:6} {key[1]:50} only in {'before' if key in before else 'after'}")
+    print(f"\n{regressions} route(s) regressed more than {args.threshold}% at p95")
+
+
+if __name__ == "__main__":
+    main()
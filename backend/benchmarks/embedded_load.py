@@ -0,0 +1,67 @@
+"""
+Concurrent read/write load test of a local SQLite database, with and without the embedded mode.
+
+Seeds a temporary SQLite file, serves it with gunicorn, once as configured by default and once
+with `SQLITE_EMBEDDED=true` (WAL, tuned pragmas, one group-committing writer thread), and drives
+both with the same mix of `GET /surveys/<id>` and `POST /surveys/<id>/submit`. Prints latency
+percentiles, throughput and error counts (typically "database is locked") as JSON.
+
+Usage (from the backend directory):
+    python -m benchmarks.embedded_load --concurrency 100 --requests 5000 --write-ratio 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import tempfile
+from typing import Any, Dict
+
+from benchmarks.submit_load import BACKEND_DIR, drive, free_port, seed_database, server_command, wait_until_ready
+
+
+def run_mode(embedded: bool, args: argparse.Namespace) -> Dict[str, Any]:
+    # A fresh file per mode, so neither run starts from the other's WAL or data
+    database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "embedded.db")
+    survey_id = seed_database(database_url)
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED="false",
+               SQLITE_EMBEDDED=str(embedded).lower(), SQLITE_SYNCHRONOUS=args.synchronous)
+    server = subprocess.Popen(
+        server_command("sync", port, args.workers, args.threads),
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url)
+        result = asyncio.run(drive(base_url, survey_id, args.concurrency, args.requests, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    result.update({
+        "embedded": embedded, "workers": args.workers, "threads": args.threads,
+        "concurrency": args.concurrency, "write_ratio": args.write_ratio,
+    })
+    if embedded:
+        result["synchronous"] = args.synchronous
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["default", "embedded", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests per mode")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=16, help="Threads per gunicorn worker")
+    parser.add_argument("--write-ratio", type=float, default=0.5, help="Share of requests that submit a response")
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLITE_SYNCHRONOUS of the embedded run")
+    args = parser.parse_args()
+
+    modes = [False, True] if args.mode == "both" else [args.mode == "embedded"]
+    results = [run_mode(embedded, args) for embedded in modes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Request builders for every route registered in `survey.driver`."""
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from benchmarks.seed import QUESTION_KINDS, _answers, _question_rows
+from survey.extensions import Session
+from survey.models.models import Question, Response, Survey
+from survey.utils.snapshots import SnapshotStore
+
+RequestSpec = Dict[str, Any]
+
+
+class BenchmarkContext:
+    """Gives request builders valid ids and throwaway rows for destructive routes."""
+    def __init__(self, app: Flask, bounds: Dict[str, Any], questions_per_survey: int, seed_value: int = 7):
+        self.app = app
+        self.bounds = bounds
+        self.questions_per_survey = questions_per_survey
+        self.rng = random.Random(seed_value)
+        self._question_ids: Dict[int, List[int]] = {}
+
+    def survey_id(self) -> int:
+        return self.rng.randint(*self.bounds["survey_ids"])
+
+    def response_id(self) -> int:
+        return self.rng.randint(*self.bounds["response_ids"])
+
+    def question_ids(self, survey_id: int) -> List[int]:
+        if survey_id not in self._question_ids:
+            with self.app.app_context(), Session() as session:
+                self._question_ids[survey_id] = [
+                    row[0] for row in session.query(Question.id)
+                    .filter(Question.survey_id == survey_id)
+                    .order_by(Question.order)
+                ]
+        return self._question_ids[survey_id]
+
+    def questions_payload(self, survey_id: int) -> List[Dict[str, Any]]:
+        return [
+            {key: row[key] for key in ("text", "type", "options", "required", "order")}
+            for row in _question_rows(survey_id, self.questions_per_survey)
+        ]
+
+    def answers_payload(self, survey_id: int) -> List[Dict[str, Any]]:
+        return _answers(self.rng, survey_id, self.questions_per_survey)
+
+    def create_survey(self) -> int:
+        """Insert a survey outside the timed section, for routes that consume one."""
+        with self.app.app_context(), Session() as session:
+            survey = Survey(title="Benchmark throwaway", published=True)
+            session.add(survey)
+            session.commit()
+            return survey.id
+
+    def create_response(self) -> int:
+        """Insert a response outside the timed section, for routes that consume one."""
+        survey_id = self.survey_id()
+        with self.app.app_context(), Session() as session:
+            response = Response(survey_id=survey_id, answers=self.answers_payload(survey_id))
+            session.add(response)
+            session.commit()
+            return response.id
+
+
+def _csv_upload(ctx: BenchmarkContext) -> RequestSpec:
+    lines = ["text,type,options,required,order"]
+    for order in range(ctx.questions_per_survey):
+        kind, options = QUESTION_KINDS[order % len(QUESTION_KINDS)]
+        lines.append(f'Question {order},{kind},"{options or ""}",true,{order}')
+    return {
+        "method": "POST",
+        "path": "/surveys/upload",
+        "form": {"title": "Uploaded benchmark survey"},
+        "files": {"csv": ("questions.csv", "\n".join(lines).encode(), "text/csv")},
+    }
+
+
+def _crosstab(ctx: BenchmarkContext) -> RequestSpec:
+    survey_id = ctx.survey_id()
+    question_ids = ctx.question_ids(survey_id)
+    # Seeded questions cycle multiple-choice, checkbox, ... so the first two are both choice questions
+    row, col = (question_ids + [0, 0])[:2]
+    return {
+        "method": "GET",
+        "path": f"/surveys/{survey_id}/crosstab",
+        "query": {"row": row, "col": col, "percentages": 1, "chi2": 1},
+    }
+
+
+def _snapshot(ctx: BenchmarkContext) -> RequestSpec:
+    survey_id = ctx.survey_id()
+    store = SnapshotStore.from_app(ctx.app)
+    # Surveys without a snapshot (or SNAPSHOT_DIR unset) measure the 404 path
+    digest = (store.current(survey_id) if store else None) or "0" * 16
+    return {"method": "GET", "path": f"/surveys/{survey_id}/snapshots/{digest}"}
+
+
+BUILDERS: Dict[Tuple[str, str], Callable[[BenchmarkContext], RequestSpec]] = {
+    ("/survey/ping", "GET"): lambda ctx: {"method": "GET", "path": "/survey/ping"},
+    ("/surveys", "GET"): lambda ctx: {"method": "GET", "path": "/surveys"},
+    ("/surveys", "POST"): lambda ctx: {
+        "method": "POST",
+        "path": "/surveys",
+        "json": {"title": "Benchmark survey", "published": True, "questions": ctx.questions_payload(0)},
+    },
+    ("/surveys/<int:survey_id>", "GET"): lambda ctx: {"method": "GET", "path": f"/surveys/{ctx.survey_id()}"},
+    ("/surveys/<int:survey_id>", "PUT"): lambda ctx: (lambda survey_id: {
+        "method": "PUT",
+        "path": f"/surveys/{survey_id}",
+        "json": {"title": f"Survey {survey_id} edited", "published": True,
+                 "questions": ctx.questions_payload(survey_id)},
+    })(ctx.survey_id()),
+    ("/surveys/<int:survey_id>", "DELETE"): lambda ctx: {
+        "method": "DELETE", "path": f"/surveys/{ctx.create_survey()}",
+    },
+    ("/surveys/upload", "POST"): _csv_upload,
+    ("/surveys/search", "GET"): lambda ctx: {
+        "method": "GET", "path": "/surveys/search", "query": {"q": ctx.rng.choice(["survey", "question 1", "surv"])},
+    },
+    ("/surveys/bulk", "POST"): lambda ctx: {
+        "method": "POST",
+        "path": "/surveys/bulk",
+        "json": {"action": "retitle", "title": "{title}", "ids": [ctx.survey_id() for _ in range(50)]},
+    },
+    ("/surveys/<int:survey_id>/submit", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/submit",
+    },
+    ("/surveys/<int:survey_id>/submit", "POST"): lambda ctx: (lambda survey_id: {
+        "method": "POST",
+        "path": f"/surveys/{survey_id}/submit",
+        "json": {"survey_id": survey_id, "answers": ctx.answers_payload(survey_id)},
+    })(ctx.survey_id()),
+    ("/responses/<int:response_id>", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/responses/{ctx.response_id()}",
+    },
+    ("/responses/<int:response_id>", "PUT"): lambda ctx: {
+        "method": "PUT",
+        "path": f"/responses/{ctx.response_id()}",
+        "json": {"answers": [{"question": "Question 0", "answer": "Yes"}]},
+    },
+    ("/responses/<int:response_id>", "DELETE"): lambda ctx: {
+        "method": "DELETE", "path": f"/responses/{ctx.create_response()}",
+    },
+    ("/surveys/<int:survey_id>/stats", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/stats",
+    },
+    ("/surveys/stats", "GET"): lambda ctx: {"method": "GET", "path": "/surveys/stats"},
+    ("/surveys/<int:survey_id>/share", "POST"): lambda ctx: {
+        "method": "POST",
+        "path": f"/surveys/{ctx.survey_id()}/share",
+        "json": {"emails": "bench@example.com", "survey_link": "http://localhost/survey"},
+    },
+    ("/surveys/<int:survey_id>/versions", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/versions",
+    },
+    ("/surveys/<int:survey_id>/versions/<int:version>", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/versions/1",
+    },
+    ("/surveys/<int:survey_id>/snapshots/<string:digest>", "GET"): _snapshot,
+    ("/surveys/<int:survey_id>/respondents/<string:email>", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/respondents/user{ctx.rng.randint(1, 1000)}@example.com",
+    },
+    ("/surveys/<int:survey_id>/crosstab", "GET"): _crosstab,
+    ("/surveys/<int:survey_id>/timeseries", "GET"): lambda ctx: {
+        "method": "GET", "path": f"/surveys/{ctx.survey_id()}/timeseries", "query": {"bucket": "day"},
+    },
+}
+
+
+# Extra runs of a route with a query string, reported as "METHOD rule?query" next to the plain route
+VARIANTS: Dict[Tuple[str, str], List[Dict[str, str]]] = {
+    ("/surveys", "GET"): [{"fields": "id,title,published"}, {"fields": "id,title", "include": "questions"}],
+    ("/surveys/<int:survey_id>/submit", "GET"): [{"fields": "id,created_at"}],
+}
+
+
+# Event streams never end, so there is no per-request latency to measure
+STREAMING_RULES = {"/surveys/<int:survey_id>/live"}
+
+
+def _with_query(builder: Callable[[BenchmarkContext], RequestSpec], query: Dict[str, str]):
+    def build(ctx: BenchmarkContext) -> RequestSpec:
+        spec = builder(ctx)
+        spec["query"] = dict(spec.get("query") or {}, **query)
+        return spec
+    return build
+
+
+def _fallback_builder(rule: str) -> Callable[[BenchmarkContext], RequestSpec]:
+    """GET with path parameters filled in, for routes without a dedicated builder."""
+    def build(ctx: BenchmarkContext) -> RequestSpec:
+        path = rule.replace("<int:survey_id>", str(ctx.survey_id()))
+        path = path.replace("<int:response_id>", str(ctx.response_id()))
+        return {"method": "GET", "path": path}
+    return build
+
+
+def discover_routes(app: Flask, only: Optional[List[str]] = None) -> List[Tuple[str, str, Callable]]:
+    """
+    List the (rule, method, builder) triples to benchmark.
+
+    Every rule registered on the app except `STREAMING_RULES` is covered: rules with builders
+    use them, other rules get a plain GET. Rules in `VARIANTS` are also run with each of their query strings. `only`
+    filters by substring of "METHOD rule".
+
+    Args:
+        app (Flask): The application.
+        only (List[str], optional): Substrings selecting a subset of routes.
+
+    Returns:
+        list: Route triples in a stable order.
+    """
+    routes = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint == "static" or rule.rule in STREAMING_RULES:
+            continue
+        configured = [(rule.rule, method) for method in sorted(rule.methods) if (rule.rule, method) in BUILDERS]
+        if configured:
+            for path, method in configured:
+                routes.append((path, method, BUILDERS[(path, method)]))
+                routes.extend(
+                    (f"{path}?{'&'.join(f'{key}={value}' for key, value in query.items())}", method,
+                     _with_query(BUILDERS[(path, method)], query))
+                    for query in VARIANTS.get((path, method), [])
+                )
+        else:
+            routes.append((rule.rule, "GET", _fallback_builder(rule.rule)))
+
+    if only:
+        routes = [route for route in routes if any(token in f"{route[1]} {route[0]}" for token in only)]
+    return routes
@@ -0,0 +1,258 @@
+"""
+Endpoint benchmark suite.
+
+Seeds a synthetic dataset (see `benchmarks.seed.SCALES`), then drives every route registered in
+`survey.driver` through the Flask test client and/or a multi-threaded HTTP load generator. For
+each route it reports p50/p95/p99 latency, throughput, SQL queries per request, response bytes
+and status codes; the run also records peak RSS. Results are written as JSON so runs can be compared with
+`benchmarks.compare`.
+
+Usage (from the backend directory):
+    python -m benchmarks.run --scale small --mode both --output results/small.json
+    python -m benchmarks.run --database-url postgresql://... --reset --scale large
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event, make_url
+from sqlalchemy.engine import Engine
+from werkzeug.serving import make_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.routes import BenchmarkContext, discover_routes  # noqa: E402
+from benchmarks.seed import SCALES, dataset_bounds, seed  # noqa: E402
+from survey.app import create_app  # noqa: E402
+from survey.extensions import db  # noqa: E402
+
+
+class QueryCounter:
+    """Counts SQL statements executed by any engine in the process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs) -> None:
+        with self._lock:
+            self.count += 1
+
+    def read(self) -> int:
+        with self._lock:
+            return self.count
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies: List[float], elapsed: float, statuses: Dict[int, int], queries: int,
+              body_bytes: int) -> Dict[str, Any]:
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "queries_per_request": round(queries / len(latencies), 2) if latencies else 0.0,
+        "bytes_per_request": round(body_bytes / len(latencies)) if latencies else 0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_client(app, ctx: BenchmarkContext, builder: Callable, iterations: int, warmup: int,
+               counter: QueryCounter) -> Dict[str, Any]:
+    client = app.test_client()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    queries = 0
+    body_bytes = 0
+    elapsed = 0.0
+
+    for index in range(warmup + iterations):
+        spec = builder(ctx)
+        kwargs: Dict[str, Any] = {"query_string": spec.get("query"), "json": spec.get("json")}
+        if "files" in spec:
+            kwargs.pop("json")
+            kwargs["data"] = dict(spec.get("form", {}), **{
+                name: (io.BytesIO(content), filename, mimetype)
+                for name, (filename, content, mimetype) in spec["files"].items()
+            })
+            kwargs["content_type"] = "multipart/form-data"
+
+        before = counter.read()
+        started = time.perf_counter()
+        response = client.open(spec["path"], method=spec["method"], **kwargs)
+        # Streamed bodies are only produced as they are read
+        size = len(response.get_data())
+        duration = time.perf_counter() - started
+        if index < warmup:
+            continue
+        body_bytes += size
+        queries += counter.read() - before
+        elapsed += duration
+        latencies.append(duration)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    return summarize(latencies, elapsed, statuses, queries, body_bytes)
+
+
+def run_http(base_url: str, ctx: BenchmarkContext, builder: Callable, iterations: int, concurrency: int,
+             counter: QueryCounter) -> Dict[str, Any]:
+    # Build requests up front so fixture inserts (e.g. DELETE targets) stay out of the timing
+    specs = [builder(ctx) for _ in range(iterations)]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    body_bytes = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(spec: Dict[str, Any]) -> None:
+        nonlocal body_bytes
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(base_url=base_url, timeout=60.0)
+        started = time.perf_counter()
+        try:
+            response = local.client.request(
+                spec["method"], spec["path"], params=spec.get("query"), json=spec.get("json"),
+                data=spec.get("form"), files=spec.get("files"),
+            )
+            status, size = response.status_code, len(response.content)
+        except httpx.HTTPError:
+            status, size = 0, 0
+        duration = time.perf_counter() - started
+        with lock:
+            body_bytes += size
+            latencies.append(duration)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    before = counter.read()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, specs))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, statuses, counter.read() - before, body_bytes)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="tiny", help="Preset dataset size")
+    parser.add_argument("--surveys", type=int, help="Override the number of surveys")
+    parser.add_argument("--questions", type=int, help="Override the questions per survey")
+    parser.add_argument("--responses", type=int, help="Override the number of responses")
+    parser.add_argument("--database-url", default=None,
+                        help="Database to benchmark instead of a temporary SQLite file (e.g. Postgres)")
+    parser.add_argument("--reset", action="store_true",
+                        help="Drop and reseed --database-url; without it the existing data is reused")
+    parser.add_argument("--mode", choices=["client", "http", "both"], default="client")
+    parser.add_argument("--iterations", type=int, default=200, help="Requests per route")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per route (client mode)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Load generator threads (http mode)")
+    parser.add_argument("--only", action="append", help="Only routes matching this 'METHOD /path' substring")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in ("surveys", "questions", "responses"):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "RATE_LIMIT_ENABLED": False,
+        "CELERY": {"broker_url": "memory://", "task_ignore_result": True},
+    })
+
+    seeding = None
+    with app.app_context():
+        if args.database_url is None or args.reset:
+            db.drop_all()
+            db.create_all()
+            seeding = seed(scale["surveys"], scale["questions"], scale["responses"])
+        bounds = dataset_bounds()
+
+    counter = QueryCounter()
+    ctx = BenchmarkContext(app, bounds, scale["questions"])
+    routes = discover_routes(app, args.only)
+    modes = ["client", "http"] if args.mode == "both" else [args.mode]
+
+    server = None
+    if "http" in modes:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results: List[Dict[str, Any]] = []
+    try:
+        for rule, method, builder in routes:
+            for mode in modes:
+                if mode == "client":
+                    result = run_client(app, ctx, builder, args.iterations, args.warmup, counter)
+                else:
+                    result = run_http(f"http://127.0.0.1:{server.server_port}", ctx, builder,
+                                      args.iterations, args.concurrency, counter)
+                results.append(dict({"route": f"{method} {rule}", "mode": mode}, **result))
+                print(f"{mode:6} {method:6} {rule:45} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                      f"bytes={result['bytes_per_request']}",
+                      file=sys.stderr)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "database": make_url(database_url).get_backend_name(),
+            "scale": scale,
+            "dataset": {"surveys": bounds["surveys"], "responses": bounds["responses"]},
+            "seeding": seeding,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency if "http" in modes else None,
+            "peak_rss_mb": peak_rss_mb(),
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as handle:
+            handle.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
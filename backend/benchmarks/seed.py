@@ -0,0 +1,162 @@
+"""Synthetic dataset generation for the benchmark suite."""
+import random
+import string
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, literal, select
+
+from survey.extensions import db
+from survey.models.models import Question, Response, Survey, SurveyVersion, SurveyVersionQuestion
+from survey.services.search_service import SearchService
+from survey.utils.utils import get_logger, hash_email
+
+logger = get_logger()
+
+SCALES = {
+    "tiny": {"surveys": 20, "questions": 5, "responses": 1_000},
+    "small": {"surveys": 100, "questions": 10, "responses": 10_000},
+    "medium": {"surveys": 1_000, "questions": 20, "responses": 100_000},
+    "large": {"surveys": 10_000, "questions": 20, "responses": 1_000_000},
+}
+
+BATCH_SIZE = 10_000
+
+QUESTION_KINDS = [
+    ("multiple-choice", ["Yes", "No", "Maybe"]),
+    ("checkbox", ["Apple", "Banana", "Cherry", "Mango"]),
+    ("multiple-choice", ["Male", "Female", "Other"]),
+    ("text", None),
+]
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def _question_rows(survey_id: int, count: int) -> List[Dict[str, Any]]:
+    rows = []
+    for order in range(count):
+        kind, options = QUESTION_KINDS[order % len(QUESTION_KINDS)]
+        rows.append({
+            "survey_id": survey_id,
+            "text": f"Question {order} of survey {survey_id}",
+            "type": kind,
+            "options": options,
+            "required": order % 2 == 0,
+            "order": order,
+        })
+    return rows
+
+
+def _answers(rng: random.Random, survey_id: int, question_count: int) -> List[Dict[str, Any]]:
+    answers = []
+    for order in range(question_count):
+        kind, options = QUESTION_KINDS[order % len(QUESTION_KINDS)]
+        if kind == "checkbox":
+            answer: Any = rng.sample(options, rng.randint(1, len(options)))
+        elif options:
+            answer = rng.choice(options)
+        else:
+            answer = _words(rng, rng.randint(2, 8))
+        answers.append({"question": f"Question {order} of survey {survey_id}", "answer": answer})
+    return answers
+
+
+def seed(surveys: int, questions: int, responses: int, seed_value: int = 42) -> Dict[str, Any]:
+    """
+    Insert a synthetic dataset into the current app's database.
+
+    Must run inside an app context. Responses are spread uniformly over the surveys and over the
+    last 30 days so time-based endpoints have data to bucket.
+
+    Args:
+        surveys (int): Number of surveys.
+        questions (int): Questions per survey.
+        responses (int): Total number of responses.
+        seed_value (int): Random seed, so runs are comparable.
+
+    Returns:
+        dict: Row counts and the seeding duration.
+    """
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    for start in range(0, surveys, BATCH_SIZE):
+        db.session.execute(insert(Survey), [
+            {
+                "title": f"Survey {index} {_words(rng, 3)}",
+                "description": _words(rng, 12),
+                "published": index % 5 != 0,
+            }
+            for index in range(start, min(start + BATCH_SIZE, surveys))
+        ])
+    db.session.commit()
+
+    survey_ids = [row[0] for row in db.session.query(Survey.id).order_by(Survey.id)]
+    batch: List[Dict[str, Any]] = []
+    for survey_id in survey_ids:
+        batch.extend(_question_rows(survey_id, questions))
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(Question), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Question), batch)
+    # Every seeded survey is at version 1 with all of its questions
+    db.session.execute(insert(SurveyVersion).from_select(
+        ["survey_id", "version", "title", "description"],
+        select(Survey.id, literal(1), Survey.title, Survey.description),
+    ))
+    db.session.execute(insert(SurveyVersionQuestion).from_select(
+        ["survey_id", "version", "question_id"],
+        select(Question.survey_id, literal(1), Question.id),
+    ))
+    db.session.commit()
+    SearchService(db.session).reindex_all()
+
+    for start in range(0, responses, BATCH_SIZE):
+        rows = []
+        for _ in range(start, min(start + BATCH_SIZE, responses)):
+            survey_id = rng.choice(survey_ids)
+            email = f"user{rng.randint(1, responses)}@example.com"
+            rows.append({
+                "survey_id": survey_id,
+                "answers": _answers(rng, survey_id, questions),
+                "respondent_email": email,
+                # Core inserts skip the model's validator, so the lookup hash is set here
+                "respondent_email_hash": hash_email(email),
+                "created_at": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+            })
+        db.session.execute(insert(Response), rows)
+        db.session.commit()
+        logger.info("Seeded %s/%s responses", min(start + BATCH_SIZE, responses), responses)
+
+    return {
+        "surveys": surveys,
+        "questions_per_survey": questions,
+        "responses": responses,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def dataset_bounds() -> Dict[str, Any]:
+    """
+    Describe an existing dataset so the route drivers can pick valid ids.
+
+    Returns:
+        dict: Id ranges of surveys and responses.
+    """
+    survey_min, survey_max, survey_count = db.session.query(
+        func.min(Survey.id), func.max(Survey.id), func.count(Survey.id)
+    ).one()
+    response_min, response_max, response_count = db.session.query(
+        func.min(Response.id), func.max(Response.id), func.count(Response.id)
+    ).one()
+    return {
+        "survey_ids": (survey_min, survey_max),
+        "response_ids": (response_min, response_max),
+        "surveys": survey_count,
+        "responses": response_count,
+    }
@@ -0,0 +1,85 @@
+"""
+Startup benchmark: how long a fresh process takes to import the app and serve its first request.
+
+Each run happens in a new interpreter so module caches do not hide import costs. It also reports
+whether Celery or the task modules were imported and whether a database connection was opened
+before the first request, which must stay false for `gunicorn --preload` to be fork safe.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+from survey.wsgi import app
+imported = time.perf_counter()
+from survey.extensions import db
+with app.app_context():
+    pool = db.engine.pool
+    connected_before_request = pool.checkedin() + pool.checkedout() > 0
+client = app.test_client()
+client.get("/survey/ping")
+pinged = time.perf_counter()
+client.get("/surveys")
+listed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (pinged - imported) * 1000,
+    "first_db_request_ms": (listed - pinged) * 1000,
+    "celery_imported": "celery" in sys.modules,
+    "task_modules_imported": any(name.startswith("survey.tasks.") for name in sys.modules),
+    "connected_before_request": connected_before_request,
+}))
+"""
+
+
+SCHEMA = r"""
+from survey.app import create_app
+from survey.extensions import db
+with create_app(register_api=False).app_context():
+    db.create_all()
+"""
+
+
+def run_probe(database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED="false")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs")
+    parser.add_argument("--database-url", default=None, help="Database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = dict(os.environ, DATABASE_URL=database_url)
+    subprocess.run([sys.executable, "-c", SCHEMA], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    runs = [run_probe(database_url) for _ in range(args.runs)]
+
+    report = {
+        metric: round(statistics.median(run[metric] for run in runs), 2)
+        for metric in ("import_ms", "first_request_ms", "first_db_request_ms")
+    }
+    for flag in ("celery_imported", "task_modules_imported", "connected_before_request"):
+        report[flag] = any(run[flag] for run in runs)
+    report["runs"] = args.runs
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Comparative load test of the sync (gunicorn) and async (uvicorn) serving modes.
+
+Starts each server against the same seeded database, drives the respondent path with many
+concurrent clients (a mix of `GET /surveys/<id>` and `POST /surveys/<id>/submit`) and prints
+latency percentiles and throughput as JSON.
+
+Usage (from the backend directory):
+    python -m benchmarks.submit_load --mode both --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database(database_url: str) -> int:
+    """Create the schema and one published survey, returning its id."""
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, BACKEND_DIR)
+    from survey.app import create_app
+    from survey.extensions import db
+    from survey.services.survey_service import SurveyService
+
+    app = create_app(register_api=False)
+
+    with app.app_context():
+        db.create_all()
+        survey = SurveyService(db.session).create_survey(
+            {"title": "Load test", "description": "Seeded by submit_load", "published": True},
+            [
+                {"text": f"Question {order}", "type": "multiple-choice", "options": ["A", "B", "C"], "order": order}
+                for order in range(10)
+            ],
+        )
+        return survey.id
+
+
+def server_command(mode: str, port: int, workers: int, threads: int) -> List[str]:
+    if mode == "sync":
+        return ["gunicorn", "-w", str(workers), "--threads", str(threads),
+                "-b", f"127.0.0.1:{port}", "survey.wsgi:app"]
+    return ["uvicorn", "survey.asgi:app", "--workers", str(workers),
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/survey/ping").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def drive(base_url: str, survey_id: int, concurrency: int, total: int, write_ratio: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def client_loop():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    if random.random() < write_ratio:
+                        answers = [{"question": f"Question {i}", "answer": random.choice("ABC")} for i in range(10)]
+                        response = await client.post(
+                            f"/surveys/{survey_id}/submit",
+                            json={"survey_id": survey_id, "answers": answers},
+                        )
+                    else:
+                        response = await client.get(f"/surveys/{survey_id}")
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+def run_mode(mode: str, args: argparse.Namespace, database_url: str, survey_id: int) -> Dict[str, Any]:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED="false")
+    server = subprocess.Popen(
+        server_command(mode, port, args.workers, args.threads),
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url)
+        result = asyncio.run(drive(base_url, survey_id, args.concurrency, args.requests, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    result.update({"mode": mode, "workers": args.workers, "concurrency": args.concurrency})
+    if mode == "sync":
+        result["threads"] = args.threads
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests per mode")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker (sync mode)")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of requests that submit a response")
+    parser.add_argument("--database-url", default=None, help="Database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+    survey_id = seed_database(database_url)
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    results = [run_mode(mode, args, database_url, survey_id) for mode in modes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Gunicorn settings, loaded automatically when gunicorn runs from the backend directory.
+
+Workers write metrics to mmap-backed files in PROMETHEUS_MULTIPROC_DIR so `/survey/metrics`
+reports totals across all of them. The variable must be set before the app is imported.
+"""
+import glob
+import os
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/survey_metrics")
+
+
+def on_starting(server):
+    # Values left by a previous run would otherwise be summed into the new one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    for name in glob.glob(os.path.join(path, "*.db")):
+        os.remove(name)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    from survey.utils.log import shutdown_logging
+
+    shutdown_logging()
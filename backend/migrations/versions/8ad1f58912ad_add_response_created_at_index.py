@@ -0,0 +1,40 @@
+"""add response (survey_id, created_at) index and server side created_at defaults
+
+Revision ID: 8ad1f58912ad
+Revises: 42fa6b72059c
+Create Date: 2026-10-18 10:12:41.503127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8ad1f58912ad'
+down_revision = '42fa6b72059c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('survey', 'question', 'response'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at',
+                                  existing_type=sa.DateTime(),
+                                  server_default=sa.func.now(),
+                                  existing_nullable=True)
+
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.create_index('ix_response_survey_id_created_at', ['survey_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.drop_index('ix_response_survey_id_created_at')
+
+    for table in ('response', 'question', 'survey'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('created_at',
+                                  existing_type=sa.DateTime(),
+                                  server_default=None,
+                                  existing_nullable=True)
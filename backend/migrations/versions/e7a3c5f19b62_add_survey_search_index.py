@@ -0,0 +1,51 @@
+"""add survey search index
+
+Revision ID: e7a3c5f19b62
+Revises: 9b41f7c2d8e5
+Create Date: 2026-10-18 23:40:18.730194
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c5f19b62'
+down_revision = '9b41f7c2d8e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    # The index only exists on databases with full-text support (survey.models.models.SURVEY_SEARCH_DDL)
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS survey_search "
+            "USING fts5(title, description, questions, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO survey_search (rowid, title, description, questions) "
+            "SELECT s.id, s.title, coalesce(s.description, ''), "
+            "coalesce((SELECT group_concat(q.text, ' ') FROM question q "
+            "WHERE q.survey_id = s.id AND NOT q.retired), '') "
+            "FROM survey s"
+        )
+    elif dialect == 'postgresql':
+        op.execute("CREATE TABLE IF NOT EXISTS survey_search (survey_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)")
+        op.execute(
+            "INSERT INTO survey_search (survey_id, document) "
+            "SELECT s.id, "
+            "setweight(to_tsvector('simple', s.title), 'A') "
+            "|| setweight(to_tsvector('simple', coalesce(s.description, '')), 'B') "
+            "|| setweight(to_tsvector('simple', coalesce((SELECT string_agg(q.text, ' ') FROM question q "
+            "WHERE q.survey_id = s.id AND NOT q.retired), '')), 'C') "
+            "FROM survey s"
+        )
+        # Built after the backfill, which is faster than maintaining it row by row
+        op.execute("CREATE INDEX IF NOT EXISTS ix_survey_search_document ON survey_search USING GIN (document)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        op.execute("DROP TABLE IF EXISTS survey_search")
@@ -0,0 +1,54 @@
+"""store server side timestamp defaults in UTC on Postgres
+
+Revision ID: f2c84b19d3e6
+Revises: d71c4a95e2f3
+Create Date: 2026-10-19 09:20:14.271845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c84b19d3e6'
+down_revision = 'd71c4a95e2f3'
+branch_labels = None
+depends_on = None
+
+# now() is in the session's timezone on `timestamp without time zone`; SQLite's
+# CURRENT_TIMESTAMP is already UTC, so only Postgres defaults change.
+TIMESTAMP_COLUMNS = (
+    ('survey', 'created_at'),
+    ('question', 'created_at'),
+    ('survey_version', 'created_at'),
+    ('response', 'created_at'),
+    ('response_archive', 'archived_at'),
+    ('response_sketch', 'updated_at'),
+    ('outbox_message', 'created_at'),
+    ('survey_shard', 'created_at'),
+    ('bulk_load_checkpoint', 'updated_at'),
+    ('idempotency_key', 'created_at'),
+)
+
+
+def _set_defaults(default):
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    # Shards created by `flask survey init-shards` may lack the default database's tables
+    tables = set(sa.inspect(bind).get_table_names())
+    for table, column in TIMESTAMP_COLUMNS:
+        if table not in tables:
+            continue
+        op.alter_column(table, column,
+                        existing_type=sa.DateTime(),
+                        server_default=sa.text(default),
+                        existing_nullable=True)
+
+
+def upgrade():
+    _set_defaults("timezone('utc', CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    _set_defaults('now()')
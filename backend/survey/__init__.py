@@ -1,3 +1,12 @@
-from .app import app, celery
-
 __all__ = ['celery', 'app']
+
+
+def __getattr__(name):
+    # Resolved lazily so importing a submodule does not build the app or Celery
+    if name == 'app':
+        from survey.wsgi import app
+        return app
+    if name == 'celery':
+        from survey.worker import celery
+        return celery
+    raise AttributeError(f"module 'survey' has no attribute '{name}'")
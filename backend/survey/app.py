@@ -1,61 +1,79 @@
 import os
+from typing import Any, Mapping, Optional
+
 from flask import Flask, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_marshmallow import Marshmallow
-from sqlalchemy.orm import sessionmaker
-from flask_mail import Mail
-from survey.celery_worker import make_celery
 
-from survey.utils.secrets_util import get_db_url
-from survey.utils.exceptions import SurveyException
+from survey.cli import survey_cli
+from survey.config import default_config
+from survey.extensions import db, ma, mail, migrate
+from survey.utils.embedded import EmbeddedSQLite
+from survey.utils.exceptions import SurveyException, error_body
+from survey.utils.log import init_request_ids
+from survey.utils.sharding import ShardRouter
 
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = get_db_url()
-app.config.from_mapping(
-    CELERY=dict(
-        broker_url=os.getenv("REDIS_BROKER_URL", "redis://localhost:6379/0"),
-        result_backend=os.getenv("REDIS_RESULT_BACKEND", "redis://localhost:6379/0"),
-        task_ignore_result=True,
-    ),
-)
 
-db = SQLAlchemy(app)
+def handle_survey_exception(error):
+    response = jsonify(error_body(error.description))
+    response.status_code = error.code if hasattr(error, 'code') else 400
+    if error.retry_after is not None:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
-ma = Marshmallow(app)
 
-Session = None
+def _dispose_engines_after_fork(app: Flask) -> None:
+    """
+    Drop inherited pooled connections in forked children (gunicorn --preload, Celery prefork).
 
-def init_session():
-    global Session
-    Session = sessionmaker(bind=db.engine)
+    The parent never needs to connect before forking, but if it did, children must not share
+    its sockets.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
 
-with app.app_context():
-    init_session()
+    def dispose():
+        for engine in engines:
+            engine.dispose(close=False)
 
-migrate = Migrate(app, db)
+    os.register_at_fork(after_in_child=dispose)
 
 
-app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.mailersend.net')
-app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
-app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() == 'true'
-app.config['MAIL_USE_SSL'] = os.getenv('MAIL_USE_SSL', 'false').lower() == 'true'
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
+def create_app(config: Optional[Mapping[str, Any]] = None, register_api: bool = True) -> Flask:
+    """
+    Create and configure the Flask application.
 
-mail = Mail(app)
-celery = make_celery(app)
+    Nothing here connects to the database or the broker: engines open connections on first use
+    and Celery is only built when a task is first sent (see `survey.celery_worker.get_celery`),
+    so the app can be created before gunicorn forks its workers.
 
-@app.errorhandler(SurveyException)
-def handle_survey_exception(error):
-    response = jsonify({
-        'status': 'error',
-        'message': error.description
-    })
-    response.status_code = error.code if hasattr(error, 'code') else 400
-    return response
+    Args:
+        config (Mapping, optional): Configuration overriding the environment defaults.
+        register_api (bool): Register the REST resources from `survey.driver`.
+
+    Returns:
+        Flask: The configured application.
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    if config:
+        app.config.from_mapping(config)
+
+    # Registers the tables on db.metadata for create_all and migrations
+    import survey.models.models  # noqa: F401
+
+    db.init_app(app)
+    ma.init_app(app)
+    migrate.init_app(app, db)
+    mail.init_app(app)
+    _dispose_engines_after_fork(app)
+    ShardRouter(app)
+    EmbeddedSQLite(app)
+
+    app.register_error_handler(SurveyException, handle_survey_exception)
+    init_request_ids(app)
+    app.cli.add_command(survey_cli)
+
+    if register_api:
+        from survey.driver import register_api as register_resources
+        register_resources(app)
 
-# Importing tasks so they get registered
-import survey.tasks.email_tasks
-import survey.tasks.schedule_publish
+    return app
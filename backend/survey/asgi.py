@@ -0,0 +1,288 @@
+"""
+Optional ASGI serving mode.
+
+The respondent-facing routes `GET /surveys/<id>` and `POST /surveys/<id>/submit` are served natively
+on the event loop with SQLAlchemy's async engine (aiosqlite locally, asyncpg on Postgres), so idle
+connections do not pin a worker thread each. They run the same `SurveyService` methods and
+marshmallow schemas as the Flask resources through `AsyncSession.run_sync`. Every other route is
+forwarded to the Flask app, and so are those two when shards are configured
+(`survey.utils.sharding`), since the async engine only reaches the default database.
+Submissions are also forwarded in embedded SQLite mode (`survey.utils.embedded`), where every
+write goes through one writer thread, and whenever they carry an `Idempotency-Key`, which the
+Flask app records and replays (`survey.utils.idempotency`). Errors have the same body on both
+(`survey.utils.exceptions.error_body`).
+
+The native routes keep the Flask app's route metrics (`survey.utils.metrics`), under the same
+resource labels, and `GET /surveys/<id>` keeps its time budget (`survey.utils.deadlines`), through
+the route middleware below. On-demand profiling (`survey.utils.profiling`) hooks into Flask
+requests only, so it does not see them; profile those routes on the Flask app instead.
+
+Published surveys with a static snapshot (`SNAPSHOT_DIR`) are sent from their file by `GET /surveys/<id>`
+without opening a session.
+
+`GET /surveys/<id>/live` is always served natively: it subscribes and reads its snapshot in the
+thread pool, then the event stream waits on the event loop, so thousands of idle subscribers need
+no thread each.
+
+Run with:
+    uvicorn survey.asgi:app --host 0.0.0.0 --port 5002 --workers 4
+"""
+import contextlib
+import os
+import time
+from typing import Any, Callable, List, Optional
+
+from a2wsgi import WSGIMiddleware
+from marshmallow import ValidationError
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from survey.extensions import db
+from survey.wsgi import app as flask_app
+from survey.endpoints.survey_endpoint import ResponseAPI, SurveyAPI, SurveyLiveAPI
+from survey.models.models import response_schema
+from survey.services.analytics_service import AnalyticsService
+from survey.services.survey_service import SurveyService
+from survey.utils.deadlines import Budget, budget_scope
+from survey.utils.exceptions import RateLimitExceededError, SurveyException, error_body
+from survey.utils.idempotency import IDEMPOTENCY_HEADER
+from survey.utils.live import STREAM_HEADERS
+from survey.utils.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, RESPONSES
+from survey.utils.snapshots import SnapshotStore
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+rate_limiter = flask_app.extensions["rate_limiter"]
+live_results = flask_app.extensions["live_results"]
+deadlines = flask_app.extensions["deadlines"]
+sharded = flask_app.extensions["shard_router"].sharded
+snapshots = SnapshotStore.from_app(flask_app)
+# Submissions must go through the embedded SQLite writer thread
+embedded = "sqlite_writer" in flask_app.extensions
+wsgi_app = WSGIMiddleware(flask_app)
+
+
+def get_async_db_url() -> URL:
+    """
+    Build the async driver URL of the Flask app's database.
+
+    The URL is taken from the Flask-SQLAlchemy engine so relative SQLite paths resolve to the
+    same file as the Flask app.
+
+    Returns:
+        URL: The database URL using the async driver.
+    """
+    with flask_app.app_context():
+        url = db.engine.url
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    global AsyncSessionLocal
+    if sharded:
+        yield
+        return
+    # Created per worker process after fork, never at import time
+    engine = create_async_engine(get_async_db_url(), pool_pre_ping=True)
+    AsyncSessionLocal = async_sessionmaker(engine)
+    yield
+    await engine.dispose()
+
+
+async def run_service(operation: Callable[[SurveyService], Any]) -> Any:
+    """
+    Run a synchronous `SurveyService` operation on an async session.
+
+    Args:
+        operation (Callable): Receives a `SurveyService` bound to the sync facade of the session.
+
+    Returns:
+        Any: The operation's return value.
+    """
+    async with AsyncSessionLocal() as session:
+        return await session.run_sync(lambda sync_session: operation(SurveyService(sync_session)))
+
+
+def submit_rate_limit_keys(request: Request, survey_id: int, data: Any) -> List[str]:
+    """Bucket keys of a submission, matching `survey.utils.rate_limit.survey_submit_keys`."""
+    keys = [f"{ResponseAPI.endpoint}:{survey_id}:ip:{request.client.host if request.client else None}"]
+    email = data.get("respondent_email") if isinstance(data, dict) else None
+    if email:
+        keys.append(f"{ResponseAPI.endpoint}:{survey_id}:email:{str(email).strip().lower()}")
+    return keys
+
+
+async def get_survey(request: Request) -> Response:
+    survey_id = request.path_params["survey_id"]
+    digest = snapshots.current(survey_id) if snapshots else None
+    if digest:
+        accept = parse_accept_header(request.headers.get("accept-encoding"), Accept)
+        path, encoding = snapshots.variant(survey_id, digest, accept)
+        headers = SnapshotStore.headers(survey_id, digest, encoding, None)
+        if headers["ETag"] in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if os.path.exists(path):
+            return FileResponse(path, media_type="application/json", headers=headers)
+    data = await run_service(lambda service: service.get_survey_document(survey_id))
+    return JSONResponse(data)
+
+
+async def submit_response(request: Request) -> JSONResponse:
+    survey_id = request.path_params["survey_id"]
+    try:
+        data = await request.json()
+    except ValueError:
+        raise SurveyException("Request body must be valid JSON")
+    if data is None:
+        raise SurveyException("Request body must be valid JSON")
+
+    policy = rate_limiter.policy_for(ResponseAPI, "POST")
+    if policy is not None and flask_app.config.get("RATE_LIMIT_ENABLED", True):
+        allowed, retry_after = await run_in_threadpool(
+            rate_limiter.hit, submit_rate_limit_keys(request, survey_id, data), policy
+        )
+        if not allowed:
+            raise RateLimitExceededError(retry_after)
+
+    def submit(service: SurveyService) -> tuple:
+        # The app context hands the response's sketches to the Flask app's SketchBuffer
+        with flask_app.app_context():
+            response = service.submit_response(survey_id, data)
+            return response_schema.dump(response), AnalyticsService(service.session).response_delta(response)
+
+    try:
+        response, delta = await run_service(submit)
+        await run_in_threadpool(live_results.publish, delta)
+        return JSONResponse(response, status_code=201)
+    except ValidationError as e:
+        logger.error("Validation Error while adding Response.")
+        raise SurveyException(e.messages)
+    except SurveyException:
+        raise
+    except Exception as e:
+        logger.error("Exception while creating Response. %s", e)
+        raise SurveyException(f"Error creating response: {str(e)}")
+
+
+def read_live_snapshot(survey_id: int) -> dict:
+    with flask_app.app_context():
+        return SurveyLiveAPI.snapshot(survey_id)
+
+
+async def stream_live_results(request: Request) -> StreamingResponse:
+    survey_id = request.path_params["survey_id"]
+    subscription, snapshot = await run_in_threadpool(
+        live_results.follow, survey_id, lambda: read_live_snapshot(survey_id)
+    )
+    return StreamingResponse(
+        live_results.astream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers=STREAM_HEADERS,
+    )
+
+
+async def handle_survey_exception(request: Request, error: SurveyException) -> JSONResponse:
+    headers = {"Retry-After": str(error.retry_after)} if error.retry_after is not None else None
+    return JSONResponse(error_body(error.description), status_code=error.code, headers=headers)
+
+
+class ForwardIdempotentRequests:
+    """Route middleware handing requests that carry `Idempotency-Key` to the Flask app."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if IDEMPOTENCY_HEADER in Headers(scope=scope):
+            await wsgi_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+class RecordRouteMetrics:
+    """Route middleware recording what `survey.utils.metrics.Metrics` does for Flask routes."""
+    def __init__(self, app: ASGIApp, resource: type):
+        self.app = app
+        self.endpoint = resource.endpoint
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        labels = (self.endpoint, scope["method"])
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.labels(*labels).inc()
+
+        async def record_status(message: dict) -> None:
+            # Like Flask's after_request, before a streamed body is sent
+            if message["type"] == "http.response.start":
+                REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - started)
+                RESPONSES.labels(*labels, str(message["status"])).inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, record_status)
+        finally:
+            REQUESTS_IN_FLIGHT.labels(*labels).dec()
+
+
+class ApplyDeadline:
+    """Route middleware giving a native route the time budget of its Flask resource."""
+    def __init__(self, app: ASGIApp, resource: type):
+        self.app = app
+        self.resource = resource
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        seconds = deadlines.budget_for(self.resource, scope["method"])
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+        budget = Budget(time.monotonic() + seconds, self.resource.endpoint, deadlines.retry_after)
+        with budget_scope(budget):
+            await self.app(scope, receive, send)
+
+
+def route_hooks(resource: type) -> List[Middleware]:
+    """Middleware of a native route standing in for `resource`, metrics outermost as in the Flask app."""
+    return [Middleware(RecordRouteMetrics, resource=resource), Middleware(ApplyDeadline, resource=resource)]
+
+
+native_routes = [Route(
+    "/surveys/{survey_id:int}/live", stream_live_results, methods=["GET"], middleware=route_hooks(SurveyLiveAPI),
+)]
+if not sharded:
+    native_routes.append(Route(
+        "/surveys/{survey_id:int}", get_survey, methods=["GET"], middleware=route_hooks(SurveyAPI),
+    ))
+    if not embedded:
+        native_routes.append(Route(
+            "/surveys/{survey_id:int}/submit", submit_response, methods=["POST"],
+            # Forwarded requests are measured by the Flask app's own hooks
+            middleware=[Middleware(ForwardIdempotentRequests), *route_hooks(ResponseAPI)],
+        ))
+
+app = Starlette(
+    routes=native_routes + [Mount("/", app=wsgi_app)],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    exception_handlers={SurveyException: handle_survey_exception},
+    lifespan=lifespan,
+)
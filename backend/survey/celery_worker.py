@@ -1,13 +1,79 @@
-from celery import Celery, Task
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from flask import Flask, current_app
+
+if TYPE_CHECKING:
+    from celery import Celery
+
+# Task names, so the web app can send tasks without importing the task modules
+PUBLISH_SURVEY_TASK = "survey.tasks.schedule_publish.publish_survey_task"
+SEND_EMAIL_TASK = "survey.tasks.email_tasks.send_email_task"
+ARCHIVE_RESPONSES_TASK = "survey.tasks.archive_tasks.archive_old_responses"
+RELAY_OUTBOX_TASK = "survey.tasks.outbox_tasks.relay_outbox"
+
+TASK_MODULES = [
+    "survey.tasks.email_tasks",
+    "survey.tasks.schedule_publish",
+    "survey.tasks.archive_tasks",
+    "survey.tasks.outbox_tasks",
+]
+
 
 def make_celery(app):
+    # Imported here so web workers only pay for Celery when they first send a task
+    from celery import Celery, Task
+    from celery.signals import worker_process_shutdown
+
+    from survey.utils.log import shutdown_logging
+    from survey.utils.metrics import connect_task_signals
+
     class FlaskTask(Task):
         def __call__(self, *args: object, **kwargs: object) -> object:
             with app.app_context():
                 return self.run(*args, **kwargs)
 
-    celery_app = Celery(app.name, task_cls=FlaskTask)
+    celery_app = Celery(app.name, task_cls=FlaskTask, include=TASK_MODULES)
     celery_app.config_from_object(app.config["CELERY"])
     celery_app.set_default()
+    connect_task_signals()
+    # Pool processes exit without running atexit handlers
+    worker_process_shutdown.connect(shutdown_logging, weak=False)
     app.extensions["celery"] = celery_app
     return celery_app
+
+
+def get_celery(app: Optional[Flask] = None) -> "Celery":
+    """
+    Return the Celery app of a Flask app, building it on first use.
+
+    Args:
+        app (Flask, optional): The Flask application. Defaults to `current_app`.
+
+    Returns:
+        Celery: The Celery application.
+    """
+    app = app or current_app._get_current_object()
+    return app.extensions.get("celery") or make_celery(app)
+
+
+def send_task(name: str, args: Optional[List[Any]] = None, kwargs: Optional[Dict[str, Any]] = None,
+              countdown: Optional[float] = None, eta: Optional[datetime] = None, task_id: Optional[str] = None):
+    """
+    Send a task to the broker by name.
+
+    Request handlers should not call this directly: they write tasks to the outbox with
+    `OutboxService.enqueue`, and the relay sends them.
+
+    Args:
+        name (str): Registered task name, e.g. `PUBLISH_SURVEY_TASK`.
+        args (list, optional): Positional task arguments.
+        kwargs (dict, optional): Keyword task arguments.
+        countdown (float, optional): Seconds to wait before the task runs.
+        eta (datetime, optional): Time at which the task runs, instead of `countdown`.
+        task_id (str, optional): Task id, so redelivered tasks can be recognized.
+
+    Returns:
+        AsyncResult: The sent task's result handle.
+    """
+    return get_celery().send_task(name, args=args, kwargs=kwargs, countdown=countdown, eta=eta, task_id=task_id)
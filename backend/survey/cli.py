@@ -0,0 +1,220 @@
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from survey.utils.sharding import get_shard_router
+
+survey_cli = AppGroup("survey", help="Survey maintenance commands.")
+
+
+@survey_cli.command("archive")
+@click.option("--older-than-days", type=int, default=None,
+              help="Archive surveys without responses for this many days (default ARCHIVE_AFTER_DAYS).")
+@click.option("--survey-id", "survey_ids", type=int, multiple=True,
+              help="Archive this survey regardless of age; may be repeated.")
+@click.option("--batch-size", type=int, default=None, help="Rows read and deleted per batch.")
+def archive_command(older_than_days, survey_ids, batch_size):
+    """Move responses of old surveys to compressed cold-storage files."""
+    from survey.services.archive_service import ArchiveService
+
+    router = get_shard_router()
+    groups = router.group_by_shard(survey_ids) if survey_ids else dict.fromkeys(router.shards())
+    results = router.fan_out_grouped(
+        lambda session, shard_survey_ids: ArchiveService(session).archive(
+            older_than_days=older_than_days if older_than_days is not None else current_app.config["ARCHIVE_AFTER_DAYS"],
+            survey_ids=shard_survey_ids,
+            batch_size=batch_size or current_app.config["ARCHIVE_BATCH_SIZE"],
+        ),
+        groups,
+    )
+    click.echo(json.dumps(ArchiveService.merge_results(results)))
+
+
+@survey_cli.command("index-archived-respondents")
+def index_archived_respondents_command():
+    """Record the respondents of existing archive files, so respondent dedupe finds them."""
+    from survey.services.archive_service import ArchiveService
+
+    def index(session):
+        service = ArchiveService(session)
+        read = 0
+        for survey_id in sorted(service.archived_counts()):
+            read += service.index_respondents(survey_id)
+            session.commit()
+        return read
+
+    read = get_shard_router().fan_out(index)
+    click.echo(json.dumps({"responses": sum(read)}))
+
+
+@survey_cli.command("reindex-search")
+def reindex_search_command():
+    """Rebuild the full-text search index of all surveys."""
+    from survey.services.search_service import SearchService
+
+    indexed = get_shard_router().fan_out(lambda session: SearchService(session).reindex_all())
+    click.echo(json.dumps({"indexed": sum(indexed)}))
+
+
+@survey_cli.command("rebuild-sketches")
+@click.option("--survey-id", "survey_ids", type=int, multiple=True,
+              help="Rebuild this survey only; may be repeated (default: every survey).")
+def rebuild_sketches_command(survey_ids):
+    """Recompute the approximate statistics sketches from stored responses."""
+    from survey.models.models import Survey
+    from survey.services.sketch_service import SketchService
+    from survey.utils.exceptions import SurveyException
+
+    def rebuild(session, shard_survey_ids):
+        ids = shard_survey_ids or [row[0] for row in session.query(Survey.id).order_by(Survey.id)]
+        counts = {}
+        for survey_id in ids:
+            counts[survey_id] = SketchService(session).rebuild(survey_id)
+            session.commit()
+        return counts
+
+    router = get_shard_router()
+    groups = router.group_by_shard(survey_ids) if survey_ids else dict.fromkeys(router.shards())
+    responses = {}
+    try:
+        for counts in router.fan_out_grouped(rebuild, groups):
+            responses.update(counts)
+    except SurveyException as e:
+        raise click.ClickException(e.description)
+    click.echo(json.dumps({"surveys": len(responses), "responses": sum(responses.values())}))
+
+
+@survey_cli.command("refresh-snapshots")
+@click.option("--survey-id", "survey_ids", type=int, multiple=True,
+              help="Refresh this survey only; may be repeated (default: every survey).")
+def refresh_snapshots_command(survey_ids):
+    """Write the static snapshots of published surveys and remove those of the others."""
+    from survey.models.models import Survey
+    from survey.services.survey_service import MAX_BULK_SURVEYS, SurveyService
+    from survey.utils.snapshots import SnapshotStore
+
+    if SnapshotStore.from_app() is None:
+        raise click.ClickException("SNAPSHOT_DIR is not set")
+
+    def refresh(session, shard_survey_ids):
+        ids = shard_survey_ids or [row[0] for row in session.query(Survey.id).order_by(Survey.id)]
+        for start in range(0, len(ids), MAX_BULK_SURVEYS):
+            SurveyService(session).refresh_snapshots(ids[start:start + MAX_BULK_SURVEYS])
+        return ids
+
+    router = get_shard_router()
+    groups = router.group_by_shard(survey_ids) if survey_ids else dict.fromkeys(router.shards())
+    refreshed = [survey_id for ids in router.fan_out_grouped(refresh, groups) for survey_id in ids]
+    click.echo(json.dumps({"surveys": len(refreshed)}))
+
+
+@survey_cli.command("relay-outbox")
+@click.option("--loop", is_flag=True, help="Keep relaying until interrupted instead of draining once.")
+@click.option("--interval", type=float, default=1.0, help="Seconds between runs with --loop.")
+def relay_outbox_command(loop, interval):
+    """Send pending outbox messages to the Celery broker."""
+    import time
+
+    from survey.services.outbox_service import OutboxService, task_id_prefix
+
+    router = get_shard_router()
+    prefixes = {shard: task_id_prefix(shard) for shard in router.databases()}
+    while True:
+        results = router.fan_out_grouped(
+            lambda session, prefix: OutboxService(session, prefix).relay_pending(
+                batch_size=current_app.config["OUTBOX_BATCH_SIZE"],
+                max_attempts=current_app.config["OUTBOX_MAX_ATTEMPTS"],
+            ),
+            prefixes,
+        )
+        result = {key: sum(shard_result[key] for shard_result in results) for key in ("sent", "failed")}
+        if not loop:
+            click.echo(json.dumps(result))
+            return
+        time.sleep(interval)
+
+
+@survey_cli.command("bulk-load")
+@click.argument("survey_id", type=int)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default=None,
+              help="Input format (default: from the file extension).")
+@click.option("--map", "mappings", multiple=True, metavar="COLUMN=TARGET",
+              help="Load COLUMN into question id TARGET, respondent_email or created_at; may be repeated. "
+                   "Columns named after a question's text or id are mapped without it.")
+@click.option("--batch-size", type=int, default=None,
+              help="Records validated and committed per transaction (default BULK_LOAD_BATCH_SIZE).")
+@click.option("--timezone", "tz_name", default="UTC", help="Timezone of created_at values without an offset.")
+@click.option("--checkpoint", "checkpoint_name", default=None, help="Checkpoint to resume from (default: the file name).")
+@click.option("--restart", is_flag=True, help="Discard the checkpoint and load from the first record.")
+@click.option("--rejects", type=click.File("a", encoding="utf-8"), default=None,
+              help="Append rejected records to this NDJSON file.")
+def bulk_load_command(survey_id, path, fmt, mappings, batch_size, tz_name, checkpoint_name, restart, rejects):
+    """Load historical responses into a survey from a CSV or NDJSON file."""
+    import os
+
+    from survey.services.bulk_load_service import BulkLoadService, read_records
+    from survey.utils.exceptions import SurveyException
+
+    if fmt is None:
+        extension = os.path.splitext(path)[1].lower()
+        fmt = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(extension)
+        if fmt is None:
+            raise click.ClickException("Cannot tell the input format from the file name; pass --format.")
+    if checkpoint_name is None:
+        if path == "-":
+            raise click.ClickException("Pass --checkpoint when reading from standard input.")
+        checkpoint_name = os.path.basename(path)
+    mapping = {}
+    for entry in mappings:
+        column, separator, target = entry.rpartition("=")
+        if not separator or not column:
+            raise click.ClickException(f"Invalid --map '{entry}'; expected COLUMN=TARGET.")
+        mapping[column] = target
+
+    def write_reject(number, error, record):
+        rejects.write(json.dumps({"record": number, "error": error, "data": record}, default=str) + "\n")
+
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    with click.open_file(path, encoding="utf-8-sig") as stream:
+        try:
+            with get_shard_router().session(survey_id) as session:
+                result = BulkLoadService(session).load(
+                    survey_id,
+                    read_records(stream, fmt),
+                    checkpoint_name,
+                    mapping=mapping,
+                    batch_size=batch_size or current_app.config["BULK_LOAD_BATCH_SIZE"],
+                    tz_name=tz_name,
+                    restart=restart,
+                    on_reject=write_reject if rejects else None,
+                )
+        except SurveyException as e:
+            raise click.ClickException(e.description)
+    click.echo(json.dumps(result))
+
+
+@survey_cli.command("init-shards")
+def init_shards_command():
+    """Create the survey tables on every database in SHARD_DATABASE_URLS."""
+    router = get_shard_router()
+    if not router.sharded:
+        raise click.ClickException("No shards are configured; set SHARD_DATABASE_URLS.")
+    router.init_shards()
+    click.echo(json.dumps({"shards": router.shard_count}))
+
+
+@survey_cli.command("move-survey")
+@click.argument("survey_id", type=int)
+@click.argument("shard", type=int)
+def move_survey_command(survey_id, shard):
+    """Move a survey with its questions, versions and responses to another shard."""
+    from survey.utils.exceptions import SurveyException
+
+    try:
+        result = get_shard_router().move_survey(survey_id, shard)
+    except SurveyException as e:
+        raise click.ClickException(e.description)
+    click.echo(json.dumps(result))
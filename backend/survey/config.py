@@ -0,0 +1,82 @@
+import os
+from typing import Any, Dict
+
+from survey.celery_worker import ARCHIVE_RESPONSES_TASK, RELAY_OUTBOX_TASK
+from survey.utils.secrets_util import get_db_url
+
+
+def default_config() -> Dict[str, Any]:
+    """
+    Build the application configuration from the environment.
+
+    Read when the app is created rather than at import, so tests and tools can set
+    environment variables first.
+
+    Returns:
+        dict: Flask configuration values.
+    """
+    redis_url = os.getenv("REDIS_BROKER_URL", "redis://localhost:6379/0")
+    return {
+        "SQLALCHEMY_DATABASE_URI": get_db_url(),
+        # Single-host SQLite tuning and single-writer queue (survey.utils.embedded)
+        "SQLITE_EMBEDDED": os.getenv("SQLITE_EMBEDDED", "false").lower() == "true",
+        "SQLITE_SYNCHRONOUS": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "SQLITE_MMAP_SIZE": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "SQLITE_CACHE_SIZE": int(os.getenv("SQLITE_CACHE_SIZE", 64 * 1024)),
+        "SQLITE_BUSY_TIMEOUT": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+        "SQLITE_WRITE_BATCH": int(os.getenv("SQLITE_WRITE_BATCH", 256)),
+        "SQLITE_WRITE_QUEUE": int(os.getenv("SQLITE_WRITE_QUEUE", 10000)),
+        # Databases surveys are spread over; the default database then only keeps the shard directory
+        "SHARD_DATABASE_URIS": [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()],
+        "SHARD_ID_BLOCK": int(os.getenv("SHARD_ID_BLOCK", 100_000_000)),
+        "SHARD_DIRECTORY_TTL": float(os.getenv("SHARD_DIRECTORY_TTL", 30)),
+        "CELERY": dict(
+            broker_url=redis_url,
+            result_backend=os.getenv("REDIS_RESULT_BACKEND", "redis://localhost:6379/0"),
+            task_ignore_result=True,
+            beat_schedule={
+                "archive-old-responses": {
+                    "task": ARCHIVE_RESPONSES_TASK,
+                    "schedule": float(os.getenv("ARCHIVE_INTERVAL_SECONDS", 24 * 60 * 60)),
+                },
+                "relay-outbox": {
+                    "task": RELAY_OUTBOX_TASK,
+                    "schedule": float(os.getenv("OUTBOX_RELAY_INTERVAL", 2)),
+                },
+            },
+        ),
+        "RATE_LIMIT_ENABLED": os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+        "RATE_LIMIT_REDIS_URL": os.getenv("REDIS_RATE_LIMIT_URL", redis_url),
+        "DEADLINES_ENABLED": os.getenv("DEADLINES_ENABLED", "true").lower() == "true",
+        "DEADLINE_RETRY_AFTER": int(os.getenv("DEADLINE_RETRY_AFTER", 5)),
+        "IDEMPOTENCY_REDIS_URL": os.getenv("REDIS_IDEMPOTENCY_URL", redis_url),
+        "IDEMPOTENCY_TTL": int(os.getenv("IDEMPOTENCY_TTL", 24 * 60 * 60)),
+        "LIVE_REDIS_URL": os.getenv("REDIS_LIVE_URL", redis_url),
+        "LIVE_UPDATE_INTERVAL": float(os.getenv("LIVE_UPDATE_INTERVAL", 1)),
+        "LIVE_KEEPALIVE": float(os.getenv("LIVE_KEEPALIVE", 15)),
+        "SKETCH_FLUSH_INTERVAL": float(os.getenv("SKETCH_FLUSH_INTERVAL", 1)),
+        "ARCHIVE_DIR": os.getenv("ARCHIVE_DIR"),
+        "SNAPSHOT_DIR": os.getenv("SNAPSHOT_DIR"),
+        "SNAPSHOT_MAX_AGE": int(os.getenv("SNAPSHOT_MAX_AGE", 365 * 24 * 60 * 60)),
+        "USE_X_SENDFILE": os.getenv("USE_X_SENDFILE", "false").lower() == "true",
+        "ARCHIVE_AFTER_DAYS": int(os.getenv("ARCHIVE_AFTER_DAYS", 180)),
+        "ARCHIVE_BATCH_SIZE": int(os.getenv("ARCHIVE_BATCH_SIZE", 5000)),
+        "OUTBOX_BATCH_SIZE": int(os.getenv("OUTBOX_BATCH_SIZE", 100)),
+        "BULK_LOAD_BATCH_SIZE": int(os.getenv("BULK_LOAD_BATCH_SIZE", 10000)),
+        "OUTBOX_MAX_ATTEMPTS": int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10)),
+        "OUTBOX_RETENTION_DAYS": int(os.getenv("OUTBOX_RETENTION_DAYS", 7)),
+        "COMPRESSION_ENABLED": os.getenv("COMPRESSION_ENABLED", "true").lower() == "true",
+        "COMPRESSION_MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+        "PROFILING_TOKEN": os.getenv("PROFILING_TOKEN"),
+        "PROFILING_SAMPLE_RATE": float(os.getenv("PROFILING_SAMPLE_RATE", 0)),
+        "PROFILING_MODE": os.getenv("PROFILING_MODE", "sampling"),
+        "PROFILING_DIR": os.getenv("PROFILING_DIR", "/tmp/survey_profiles"),
+        "PROFILING_MAX_FILES": int(os.getenv("PROFILING_MAX_FILES", 200)),
+        "MAIL_SERVER": os.getenv("MAIL_SERVER", "smtp.mailersend.net"),
+        "MAIL_PORT": int(os.getenv("MAIL_PORT", 587)),
+        "MAIL_USE_TLS": os.getenv("MAIL_USE_TLS", "true").lower() == "true",
+        "MAIL_USE_SSL": os.getenv("MAIL_USE_SSL", "false").lower() == "true",
+        "MAIL_USERNAME": os.getenv("MAIL_USERNAME"),
+        "MAIL_PASSWORD": os.getenv("MAIL_PASSWORD"),
+        "MAIL_DEFAULT_SENDER": os.getenv("MAIL_DEFAULT_SENDER"),
+    }
@@ -1,40 +1,110 @@
+from flask import Flask
 from flask_cors import CORS
 from flask_restful import Api
 
-from survey.app import app
+from survey.endpoints.metrics_endpoint import MetricsEndpoint
 from survey.endpoints.ping_endpoint import PingEndpoint
 from survey.endpoints.survey_endpoint import (
+    RespondentAPI,
     ResponseAPI,
     SurveyAPI,
+    SurveyBulkAPI,
+    SurveySnapshotAPI,
     SurveyStatsAPI,
     SurveyUploadAPI,
+    SurveySearchAPI,
+    SurveyVersionAPI,
     ShareSurveyAPI,
+    SurveyCrosstabAPI,
+    SurveyLiveAPI,
+    SurveyTimeseriesAPI,
 )
+from survey.extensions import Session
+from survey.services.sketch_service import SketchBuffer
+from survey.utils.compression import Compression
+from survey.utils.deadlines import Deadlines
+from survey.utils.idempotency import Idempotency
+from survey.utils.live import LiveResults
+from survey.utils.metrics import Metrics
+from survey.utils.profiling import RequestProfiler
+from survey.utils.rate_limit import RateLimiter
 from survey.utils.utils import get_logger
 
-api = Api(app)
+logger = get_logger(__name__)
 
-logger = get_logger()
 
-# Register API resources
-api.add_resource(PingEndpoint, "/survey/ping")
-api.add_resource(SurveyAPI, 
-    '/surveys',
-    '/surveys/<int:survey_id>'
-)
-api.add_resource(SurveyUploadAPI, '/surveys/upload')
-api.add_resource(ResponseAPI,
-    '/surveys/<int:survey_id>/submit',
-    '/responses/<int:response_id>'
-)
-api.add_resource(SurveyStatsAPI,
-    '/surveys/<int:survey_id>/stats',
-    '/surveys/stats'
-)
-api.add_resource(ShareSurveyAPI, '/surveys/<int:survey_id>/share')
+def register_api(app: Flask) -> Api:
+    """
+    Register the API resources and their per-route policies on an application.
+
+    Args:
+        app (Flask): The Flask application.
+
+    Returns:
+        Api: The Flask-RESTful Api holding the resources.
+    """
+    api = Api(app)
+    # Its after_request hook must run last, so every other hook sees uncompressed bodies
+    Compression(app)
+    # Registered first so their hooks also time requests the other hooks reject or replay
+    RequestProfiler(app)
+    Metrics(app)
+    rate_limiter = RateLimiter(app)
+    deadlines = Deadlines(app)
+    idempotency = Idempotency(app, session_factory=Session)
+    LiveResults(app)
+    SketchBuffer(app)
+
+    # Register API resources
+    api.add_resource(PingEndpoint, "/survey/ping")
+    api.add_resource(MetricsEndpoint, "/survey/metrics")
+    api.add_resource(SurveyAPI,
+        '/surveys',
+        '/surveys/<int:survey_id>'
+    )
+    api.add_resource(SurveySnapshotAPI, '/surveys/<int:survey_id>/snapshots/<string:digest>')
+    api.add_resource(SurveyUploadAPI, '/surveys/upload')
+    api.add_resource(SurveyBulkAPI, '/surveys/bulk')
+    api.add_resource(SurveySearchAPI, '/surveys/search')
+    api.add_resource(SurveyVersionAPI,
+        '/surveys/<int:survey_id>/versions',
+        '/surveys/<int:survey_id>/versions/<int:version>'
+    )
+    api.add_resource(ResponseAPI,
+        '/surveys/<int:survey_id>/submit',
+        '/responses/<int:response_id>'
+    )
+    api.add_resource(SurveyStatsAPI,
+        '/surveys/<int:survey_id>/stats',
+        '/surveys/stats'
+    )
+    api.add_resource(RespondentAPI, '/surveys/<int:survey_id>/respondents/<string:email>')
+    api.add_resource(ShareSurveyAPI, '/surveys/<int:survey_id>/share')
+    api.add_resource(SurveyCrosstabAPI, '/surveys/<int:survey_id>/crosstab')
+    api.add_resource(SurveyTimeseriesAPI, '/surveys/<int:survey_id>/timeseries')
+    api.add_resource(SurveyLiveAPI, '/surveys/<int:survey_id>/live')
+
+    # Admission control, checked before any DB work: burst of `capacity`, then `refill_rate` requests/second
+    rate_limiter.limit(ResponseAPI, ["POST"], capacity=10, refill_rate=0.5)
+    rate_limiter.limit(SurveyAPI, ["POST"], capacity=20, refill_rate=1)
+
+    # Time budgets, from the start of the request: queries still running after them are cancelled (503)
+    deadlines.limit(SurveyAPI, ["GET"], seconds=5)
+    deadlines.limit(SurveySearchAPI, ["GET"], seconds=5)
+    deadlines.limit(SurveyStatsAPI, ["GET"], seconds=15)
+    deadlines.limit(SurveyCrosstabAPI, ["GET"], seconds=15)
+    deadlines.limit(SurveyTimeseriesAPI, ["GET"], seconds=15)
+    deadlines.limit(SurveyBulkAPI, ["POST"], seconds=30)
+
+    # Retries carrying the same Idempotency-Key replay the first result instead of creating duplicates
+    idempotency.protect(ResponseAPI, ["POST"])
+    idempotency.protect(SurveyAPI, ["POST"])
+    idempotency.protect(SurveyBulkAPI, ["POST"])
+
+    CORS(app)
+    return api
 
-CORS(app)
-api_enabled_app = app
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    from survey.app import create_app
+    create_app().run(debug=True, port=5000)
@@ -0,0 +1,10 @@
+from flask import Response
+from flask_restful import Resource
+
+from survey.utils.metrics import render_metrics
+
+
+class MetricsEndpoint(Resource):
+    def get(self):
+        payload, content_type = render_metrics()
+        return Response(payload, content_type=content_type)
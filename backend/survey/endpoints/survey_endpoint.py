@@ -3,23 +3,39 @@ import ast
 from io import TextIOWrapper
 from typing import Optional, List, Any, Dict
 
-from flask import request, jsonify
+from flask import Response as FlaskResponse, current_app, request, jsonify, stream_with_context
+from sqlalchemy import select
 from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import BadRequest, NotFound
 from flask_restful import Resource
 from sqlalchemy.orm import joinedload
 from marshmallow import ValidationError
 
-from survey.app import Session
-from survey.tasks.email_tasks import send_email_task
+from survey.celery_worker import SEND_EMAIL_TASK
+from survey.extensions import Session
 from survey.models.models import Survey, Question, Response
 from survey.models.models import (
-    survey_schema, response_schema
+    ResponseSchema, fieldset_schema, survey_schema, response_schema, responses_schema
 )
-from survey.services.survey_service import SurveyService
-from survey.utils.utils import get_logger
-
-logger = get_logger()
+from survey.services.archive_service import ArchiveService
+from survey.services.outbox_service import OutboxService
+from survey.services.search_service import SearchService
+from survey.services.sketch_service import MAX_SKETCH_DAYS, SketchService
+from survey.services.survey_service import SURVEY_FIELDS, SURVEY_INCLUDES, SurveyService
+from survey.services.analytics_service import AnalyticsService, invalidate_encoded_answers
+from survey.utils.compression import stream_json_array
+from survey.utils.exceptions import SurveyException
+from survey.utils.live import STREAM_HEADERS, get_live_results
+from survey.utils.sharding import get_shard_router, merge_sorted
+from survey.utils.snapshots import SnapshotStore
+from survey.utils.utils import get_logger, parse_fieldset, str_to_bool
+
+logger = get_logger(__name__)
+
+# Live responses serialized per chunk of a streamed response list
+RESPONSE_STREAM_BATCH_SIZE = 1000
+# Response columns selectable with `?fields=`
+RESPONSE_FIELDS = tuple(response_schema.fields)
 
 
 class SurveyAPI(Resource):
@@ -38,38 +54,62 @@ class SurveyAPI(Resource):
             data: dict = request.get_json(force=True)
             questions_data: List[Dict[str, Any]] = data.pop("questions", [])
 
-            with Session() as session:
-                survey_service = SurveyService(session)
-                survey = survey_service.create_survey(data, questions_data)
-                return survey_schema.dump(survey), 201
+            router = get_shard_router()
+            survey_id = router.allocate_survey_id()
+            return router.write(survey_id, lambda session: survey_schema.dump(
+                SurveyService(session).create_survey(data, questions_data, survey_id)
+            )), 201
 
         except ValidationError as e:
             logger.error("Validation Error while creating Survey.")
             raise BadRequest(e.messages)
         except Exception as e:
-            logger.error(f"Exception while creating Survey. {str(e)}")
+            logger.error("Exception while creating Survey. %s", e)
             raise BadRequest(str(e))
 
     def get(self, survey_id: Optional[int] = None) -> tuple[Any, int]:
         """
         Retrieve a specific survey (with questions) or a list of all surveys.
 
+        `?fields=id,title` selects only those columns, and questions are then only returned
+        with `?include=questions`. Without either parameter every column and the questions
+        are returned, straight from the survey's static snapshot once it is published.
+
         Args:
             survey_id (int, optional): ID of the survey to retrieve.
 
         Returns:
             tuple: JSON representation of the survey(s) and HTTP status code 200.
         """
-        with Session() as session:
-            survey_service = SurveyService(session)
-            
-            if survey_id:
-                survey = survey_service.get_survey(survey_id)
-                return survey_schema.dump(survey), 200
-
-            # Get all surveys
-            surveys = survey_service.get_all_surveys()
-            return survey_schema.dump(surveys, many=True), 200
+        fields = parse_fieldset(request.args.get("fields"), SURVEY_FIELDS)
+        include = parse_fieldset(request.args.get("include"), SURVEY_INCLUDES, "include")
+        include_questions = "questions" in include if include is not None else fields is None
+        router = get_shard_router()
+
+        if survey_id:
+            store = SnapshotStore.from_app() if fields is None and include_questions else None
+            digest = store.current(survey_id) if store else None
+            if digest:
+                try:
+                    return store.send(survey_id, digest)
+                except FileNotFoundError:
+                    # Pruned by two edits in a row since `current` was read
+                    logger.info("Snapshot %s of survey id=%s is gone; reading the database", digest, survey_id)
+            with router.session(survey_id) as session:
+                survey_service = SurveyService(session)
+                if fields is None and include_questions:
+                    # Cached serialized and compressed body, returned as is by Flask-RESTful
+                    return survey_service.get_survey_document_body(survey_id).to_response()
+                return survey_service.get_survey_fields(survey_id, fields, include_questions), 200
+
+        # Get all surveys: every shard lists its surveys in id order, merged by id
+        list_fields = fields + ["id"] if router.sharded and fields and "id" not in fields else fields
+        shard_surveys = router.fan_out(lambda session: SurveyService(session).list_surveys(list_fields, include_questions))
+        surveys = merge_sorted(shard_surveys, key=lambda survey: survey["id"]) if router.sharded else shard_surveys[0]
+        if list_fields is not fields:
+            for survey in surveys:
+                del survey["id"]
+        return surveys, 200
 
     def put(self, survey_id: int) -> tuple[dict, int]:
         """
@@ -88,16 +128,15 @@ class SurveyAPI(Resource):
             data = request.get_json()
             questions_data = data.pop("questions", [])
 
-            with Session() as session:
-                survey_service = SurveyService(session)
-                survey = survey_service.update_survey(survey_id, data, questions_data)
-                return survey_schema.dump(survey), 200
+            return get_shard_router().write(survey_id, lambda session: survey_schema.dump(
+                SurveyService(session).update_survey(survey_id, data, questions_data)
+            )), 200
 
         except ValidationError as e:
             logger.error("Validation Error while updating Survey.")
             raise BadRequest(e.messages)
         except Exception as e:
-            logger.error(f"Exception while updating Survey for id: {survey_id}. {str(e)}")
+            logger.error("Exception while updating Survey for id: %s. %s", survey_id, e)
             raise BadRequest(str(e))
 
     def delete(self, survey_id: int) -> tuple[dict, int]:
@@ -110,11 +149,132 @@ class SurveyAPI(Resource):
         Returns:
             tuple: A confirmation message and HTTP status code 200.
         """
+        router = get_shard_router()
+        router.write(survey_id, lambda session: SurveyService(session).delete_survey(survey_id))
+        router.release([survey_id])
+        logger.info("Deleted Survey for id: %s.", survey_id)
+        return {"message": f"Survey {survey_id} deleted"}, 200
+
+
+class SurveyBulkAPI(Resource):
+    """API for applying one action to many surveys at once."""
+    def post(self) -> tuple[dict, int]:
+        """
+        Publish, unpublish, schedule, delete or retitle a set of surveys.
+
+        Expects:
+            - `action` (str): "publish", "unpublish", "schedule", "delete" or "retitle".
+            - `ids` (List[int], optional): Surveys to act on.
+            - `filter` (dict, optional): Selection used when `ids` is absent, e.g.
+              `{"published": false, "created_before": "2025-01-01"}`.
+            - `title` (str): New title for "retitle"; "{title}" stands for the current title.
+            - `scheduled_time` / `timezone` (str): Publishing time for "schedule".
+
+        Returns:
+            tuple: The per-survey outcomes and HTTP status code 200.
+
+        Raises:
+            BadRequest: If the payload is not a JSON object.
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            raise BadRequest("Request body must be a JSON object.")
+
+        router = get_shard_router()
+        survey_ids = data.get("ids")
+        if survey_ids:
+            # Each shard only acts on its own surveys; filters run on every shard
+            SurveyService.check_bulk_ids(survey_ids)
+            groups = router.group_by_shard(survey_ids)
+        else:
+            groups = dict.fromkeys(router.shards())
+        results = router.write_grouped(
+            lambda session, shard_ids: SurveyService(session).bulk_update(
+                data.get("action"),
+                survey_ids=shard_ids,
+                filters=data.get("filter"),
+                params=data,
+            ),
+            groups,
+        )
+        result = SurveyService.merge_bulk_results(results, survey_ids)
+
+        if result["action"] == "delete":
+            router.release(result["affected"])
+            for survey_id in result["affected"]:
+                invalidate_encoded_answers(survey_id)
+        return result, 200
+
+
+class SurveySearchAPI(Resource):
+    """API for full-text search over survey titles, descriptions and questions."""
+    def get(self) -> tuple[dict, int]:
+        """
+        Search surveys, best matches first.
+
+        Query params:
+            - `q` (str): Search words; the last one also matches as a prefix.
+            - `page` (int, optional): 1-based page number. Defaults to 1.
+            - `per_page` (int, optional): Results per page, up to 100. Defaults to 20.
+
+        Returns:
+            tuple: The page of matching surveys with the total count, and HTTP status code 200.
+        """
+        query = request.args.get("q", "")
+        page = request.args.get("page", 1, type=int)
+        per_page = request.args.get("per_page", 20, type=int)
+
+        router = get_shard_router()
+        if router.sharded:
+            return SearchService.search_shards(router.fan_out, query, page=page, per_page=per_page), 200
         with Session() as session:
+            search_service = SearchService(session)
+            return search_service.search(query, page=page, per_page=per_page), 200
+
+
+class SurveyVersionAPI(Resource):
+    """API for reading the immutable versions of a survey."""
+    def get(self, survey_id: int, version: Optional[int] = None) -> tuple[Any, int]:
+        """
+        Retrieve one frozen survey version, or list all versions of a survey.
+
+        Args:
+            survey_id (int): ID of the survey.
+            version (int, optional): Version number to retrieve.
+
+        Returns:
+            tuple: The version definition or the list of versions, and HTTP status code 200.
+        """
+        with get_shard_router().session(survey_id) as session:
             survey_service = SurveyService(session)
-            survey_service.delete_survey(survey_id)
-            logger.info(f"Deleted Survey for id: {survey_id}.")
-            return {"message": f"Survey {survey_id} deleted"}, 200
+            if version:
+                return survey_service.get_survey_version_body(survey_id, version).to_response()
+            return survey_service.list_survey_versions(survey_id), 200
+
+
+class SurveySnapshotAPI(Resource):
+    """API serving the static snapshots of published surveys under immutable URLs."""
+    def get(self, survey_id: int, digest: str) -> FlaskResponse:
+        """
+        Send one snapshot of a survey, cacheable for `SNAPSHOT_MAX_AGE` seconds.
+
+        `GET /surveys/<id>` names the current snapshot in its `Content-Location` header. A
+        snapshot stays available until the survey changes twice more.
+
+        Args:
+            survey_id (int): ID of the survey.
+            digest (str): Digest naming the snapshot.
+
+        Returns:
+            FlaskResponse: The snapshot file.
+
+        Raises:
+            SurveyException: If snapshots are disabled or this one does not exist (404).
+        """
+        store = SnapshotStore.from_app()
+        if store is None or not store.exists(survey_id, digest):
+            raise SurveyException(f"Snapshot {digest} of survey {survey_id} not found", 404)
+        return store.send(survey_id, digest, max_age=current_app.config["SNAPSHOT_MAX_AGE"])
 
 
 class SurveyUploadAPI(Resource):
@@ -153,16 +313,17 @@ class SurveyUploadAPI(Resource):
             raise BadRequest(f"CSV file size exceeds {MAX_FILE_SIZE_MB}MB limit.")
 
         try:
-            with Session() as session:
-                survey_service = SurveyService(session)
-                survey = survey_service.create_survey_from_csv(file, title, description)
-                return survey_schema.dump(survey), 201
+            router = get_shard_router()
+            survey_id = router.allocate_survey_id()
+            return router.write(survey_id, lambda session: survey_schema.dump(
+                SurveyService(session).create_survey_from_csv(file, title, description, survey_id)
+            )), 201
 
         except ValidationError as e:
             logger.error("Validation error during survey CSV upload.")
             raise BadRequest(e.messages)
         except Exception as e:
-            logger.error(f"Error during survey CSV upload: {str(e)}")
+            logger.error("Error during survey CSV upload: %s", e)
             raise BadRequest(f"Error creating survey: {str(e)}")
 
 
@@ -179,35 +340,39 @@ class ResponseAPI(Resource):
             tuple: JSON representation of the created response and HTTP status code 201.
 
         Raises:
-            NotFound: If the survey is not found.
-            BadRequest: If validation fails or another error occurs.
+            SurveyException: If the survey is not found (404), or the body is invalid or another
+                error occurs (400).
         """
+        # Errors are raised as SurveyException so the ASGI route (survey.asgi) answers the same bodies
+        data = request.get_json(silent=True)
+        if data is None:
+            raise SurveyException("Request body must be valid JSON")
         try:
-            data = request.get_json()
-            with Session() as session:
-                # Validate survey exists
-                survey = session.query(Survey).filter(Survey.id == survey_id).first()
-                if not survey:
-                    raise NotFound(f"Survey {survey_id} not found")
-
-                response = response_schema.load(data)
-                response.survey_id = survey_id
-                session.add(response)
-                session.commit()
-                return response_schema.dump(response), 201
+            def submit(session):
+                response = SurveyService(session).submit_response(survey_id, data)
+                return response_schema.dump(response), AnalyticsService(session).response_delta(response)
+
+            body, delta = get_shard_router().write(survey_id, submit)
+            get_live_results().publish(delta)
+            return body, 201
 
         except ValidationError as e:
             logger.error("Validation Error while adding Response.")
-            raise BadRequest(e.messages)
+            raise SurveyException(e.messages)
+        except SurveyException:
+            raise
         except Exception as e:
-            logger.error(f"Exception while creating Response. {str(e)}")
-            raise BadRequest(f"Error creating response: {str(e)}")
+            logger.error("Exception while creating Response. %s", e)
+            raise SurveyException(f"Error creating response: {str(e)}")
 
     def get(self, survey_id: Optional[int] = None, response_id: Optional[int] = None) -> tuple[Any, int]:
         """
         Retrieve responses. If `response_id` is provided, return specific response.
         If only `survey_id` is given, return all responses for that survey.
         If neither is given, return all responses.
+        Archived responses are read from cold storage and returned first.
+        Lists are streamed in batches, and compressed as they are streamed.
+        `?fields=id,answers` selects only those columns.
 
         Args:
             survey_id (int, optional): ID of the survey.
@@ -216,23 +381,54 @@ class ResponseAPI(Resource):
         Returns:
             tuple: JSON list of responses or single response and HTTP status code.
         """
-        with Session() as session:
-            if response_id:
-                response = session.query(Response).get(response_id)
-                if not response:
-                    logger.error(f"Response {response_id} not found")
-                    raise NotFound(f"Response {response_id} not found")
-                return response_schema.dump(response)
-            elif survey_id:
-                responses = (
-                    session.query(Response)
-                    .filter(Response.survey_id == survey_id)
-                    .all()
-                )
-                return response_schema.dump(responses, many=True)
+        fields = parse_fieldset(request.args.get("fields"), RESPONSE_FIELDS)
+        if not response_id:
+            body = stream_json_array(self._response_batches(survey_id, fields))
+            return FlaskResponse(stream_with_context(body), mimetype="application/json")
+
+        router = get_shard_router()
+        for session in router.sessions(router.response_shards(response_id)):
+            if fields:
+                row = session.execute(
+                    select(*(getattr(Response, name) for name in fields)).where(Response.id == response_id)
+                ).first()
+                response = row._mapping if row else None
             else:
-                responses = session.query(Response).all()
-                return response_schema.dump(responses, many=True), 200
+                response = session.get(Response, response_id)
+            if response:
+                return fieldset_schema(ResponseSchema, tuple(fields)).dump(response) if fields else response_schema.dump(response)
+            archived = ArchiveService(session).find_archived_response(response_id)
+            if archived:
+                return {name: archived[name] for name in fields} if fields else archived
+        logger.error("Response %s not found", response_id)
+        raise NotFound(f"Response {response_id} not found")
+
+    @staticmethod
+    def _response_batches(survey_id: Optional[int], fields: Optional[List[str]] = None):
+        """
+        Yield archived responses, then live ones `RESPONSE_STREAM_BATCH_SIZE` rows at a time.
+
+        Responses of all surveys are read one shard after another.
+        """
+        router = get_shard_router()
+        shards = [router.shard_for(survey_id)] if survey_id else router.shards()
+        for session in router.sessions(shards):
+            archive = ArchiveService(session)
+            archived = archive.archived_responses(survey_id) if survey_id else archive.all_archived_responses()
+            yield [{name: row[name] for name in fields} for row in archived] if fields else archived
+
+            if fields:
+                query = select(*(getattr(Response, name) for name in fields))
+                schema = fieldset_schema(ResponseSchema, tuple(fields), many=True)
+            else:
+                query = select(Response)
+                schema = responses_schema
+            query = query.order_by(Response.id)
+            if survey_id:
+                query = query.where(Response.survey_id == survey_id)
+            result = session.execute(query.execution_options(yield_per=RESPONSE_STREAM_BATCH_SIZE))
+            for batch in (result.mappings() if fields else result.scalars()).partitions():
+                yield schema.dump(batch)
 
     def put(self, response_id: int) -> tuple[dict, int]:    
         """
@@ -250,18 +446,27 @@ class ResponseAPI(Resource):
         """
         try:
             data = request.get_json()
-            with Session() as session:
-                response = session.query(Response).get(response_id)
+
+            def update(session):
+                response = session.get(Response, response_id)
                 if not response:
-                    logger.error(f"Response {response_id} not found")
-                    raise NotFound(f"Response {response_id} not found")
+                    return None
 
                 for field in ['answers']:
                     if field in data:
                         setattr(response, field, data[field])
 
                 session.commit()
-                return response_schema.dump(response), 200
+                return response_schema.dump(response)
+
+            router = get_shard_router()
+            for shard in router.response_shards(response_id):
+                updated = router.write_shard(shard, update)
+                if updated is not None:
+                    invalidate_encoded_answers(updated["survey_id"])
+                    return updated, 200
+            logger.error("Response %s not found", response_id)
+            raise NotFound(f"Response {response_id} not found")
 
         except ValidationError as e:
             raise BadRequest(e.messages)
@@ -281,16 +486,41 @@ class ResponseAPI(Resource):
         Raises:
             NotFound: If the response is not found.
         """
-        with Session() as session:
-            response = session.query(Response).get(response_id)
+        def delete(session):
+            response = session.get(Response, response_id)
             if not response:
-                logger.error(f"Response {response_id} not found")
-                raise NotFound(f"Response {response_id} not found")
+                return False
 
             session.delete(response)
             session.commit()
-            logger.debug("Response {response_id} deleted")
-            return {"message": f"Response {response_id} deleted"}, 200
+            return True
+
+        router = get_shard_router()
+        for shard in router.response_shards(response_id):
+            if router.write_shard(shard, delete):
+                logger.debug("Response %s deleted", response_id)
+                return {"message": f"Response {response_id} deleted"}, 200
+        logger.error("Response %s not found", response_id)
+        raise NotFound(f"Response {response_id} not found")
+
+
+class RespondentAPI(Resource):
+    """API for checking whether a respondent has answered a survey."""
+    def get(self, survey_id: int, email: str) -> tuple[dict, int]:
+        """
+        Check whether an email address has already answered a survey.
+
+        Args:
+            survey_id (int): ID of the survey.
+            email (str): Respondent email; case and surrounding spaces are ignored.
+
+        Returns:
+            tuple: Whether the respondent answered, and HTTP status code 200.
+        """
+        with get_shard_router().session(survey_id) as session:
+            survey_service = SurveyService(session)
+            answered = survey_service.has_responded(survey_id, email)
+            return {"survey_id": survey_id, "answered": answered}, 200
 
 
 class SurveyStatsAPI(Resource):
@@ -299,19 +529,142 @@ class SurveyStatsAPI(Resource):
         """
         Retrieve statistics for a specific survey or for all surveys.
 
+        Query params:
+            - `approximate` (bool, optional): Answer from the survey's sketches in constant time,
+              with unique respondents per day and distinct / most frequent free-text answers.
+            - `days` (int, optional): Days reported one by one in approximate mode. Defaults to 30.
+
         Args:
             survey_id (int, optional): ID of the survey to get stats for.
 
         Returns:
             tuple: Survey statistics and HTTP status code 200.
         """
-        with Session() as session:
-            survey_service = SurveyService(session)
-            if survey_id:
-                stats = survey_service.get_survey_stats(survey_id)
-            else:
-                stats = survey_service.get_all_survey_stats()
-            return stats, 200
+        router = get_shard_router()
+        approximate = str_to_bool(request.args.get("approximate"))
+        if approximate and not survey_id:
+            raise SurveyException("Approximate statistics are only available for a single survey")
+        if survey_id:
+            with router.session(survey_id) as session:
+                if approximate:
+                    days = request.args.get("days", "30")
+                    if not days.isdigit() or not 1 <= int(days) <= MAX_SKETCH_DAYS:
+                        raise SurveyException(f"'days' must be between 1 and {MAX_SKETCH_DAYS}")
+                    return SketchService(session).get_approximate_stats(survey_id, days=int(days)), 200
+                return SurveyService(session).get_survey_stats(survey_id), 200
+
+        shard_stats = router.fan_out(lambda session: SurveyService(session).get_all_survey_stats())
+        return merge_sorted(shard_stats, key=lambda stats: stats["survey_id"]), 200
+
+
+class SurveyCrosstabAPI(Resource):
+    """API for cross-tabulating the answers of two choice questions."""
+    def get(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Build the contingency table of two questions of a survey.
+
+        Query params:
+            - `row` (int): ID of the question used for rows.
+            - `col` (int): ID of the question used for columns.
+            - `percentages` (bool, optional): Include row and column percentages.
+            - `chi2` (bool, optional): Include the chi-square statistic.
+
+        Args:
+            survey_id (int): ID of the survey.
+
+        Returns:
+            tuple: The crosstab and HTTP status code 200.
+
+        Raises:
+            BadRequest: If `row` or `col` is missing or not an integer.
+        """
+        row_question_id = request.args.get("row", type=int)
+        col_question_id = request.args.get("col", type=int)
+        if row_question_id is None or col_question_id is None:
+            raise BadRequest("Query parameters 'row' and 'col' must be question ids.")
+
+        with get_shard_router().session(survey_id) as session:
+            analytics_service = AnalyticsService(session)
+            crosstab = analytics_service.get_crosstab(
+                survey_id,
+                row_question_id,
+                col_question_id,
+                percentages=str_to_bool(request.args.get("percentages")),
+                chi_square=str_to_bool(request.args.get("chi2")),
+            )
+            return crosstab, 200
+
+
+class SurveyTimeseriesAPI(Resource):
+    """API for retrieving response counts bucketed over time."""
+    def get(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Count a survey's responses per minute, hour or day.
+
+        Query params:
+            - `bucket` (str, optional): "minute", "hour" (default) or "day".
+            - `tz` (str, optional): Timezone name buckets are aligned to. Defaults to "UTC".
+            - `start` / `end` (str, optional): Local datetime bounds of the series.
+
+        Args:
+            survey_id (int): ID of the survey.
+
+        Returns:
+            tuple: The time series and HTTP status code 200.
+        """
+        with get_shard_router().session(survey_id) as session:
+            analytics_service = AnalyticsService(session)
+            timeseries = analytics_service.get_response_timeseries(
+                survey_id,
+                bucket=request.args.get("bucket", "hour"),
+                tz_name=request.args.get("tz") or "UTC",
+                start=request.args.get("start"),
+                end=request.args.get("end"),
+            )
+            return timeseries, 200
+
+
+class SurveyLiveAPI(Resource):
+    """API streaming a survey's results as they come in."""
+    @staticmethod
+    def snapshot(survey_id: int) -> Dict[str, Any]:
+        """
+        Read the current results a live stream starts from.
+
+        Args:
+            survey_id (int): ID of the survey.
+
+        Returns:
+            dict: The response total and the answer counts of every choice question.
+        """
+        with get_shard_router().session(survey_id) as session:
+            return AnalyticsService(session).get_answer_distribution(survey_id)
+
+    def get(self, survey_id: int) -> FlaskResponse:
+        """
+        Stream a survey's results as Server-Sent Events.
+
+        A `snapshot` event carries the current totals; `update` events then carry what the
+        responses committed since the previous event add to them, at most one per
+        `LIVE_UPDATE_INTERVAL` seconds. The subscription is made before the snapshot is read,
+        so no response falls between the two.
+
+        Args:
+            survey_id (int): ID of the survey.
+
+        Returns:
+            FlaskResponse: The `text/event-stream` response.
+        """
+        live_results = get_live_results()
+        subscription, snapshot = live_results.follow(survey_id, lambda: self.snapshot(survey_id))
+        response = FlaskResponse(
+            live_results.stream(subscription, snapshot),
+            mimetype="text/event-stream",
+            headers=STREAM_HEADERS,
+        )
+        # Also when the stream is closed before it was ever iterated
+        response.call_on_close(lambda: live_results.unsubscribe(subscription))
+        return response
 
 
 class ShareSurveyAPI(Resource):
@@ -338,14 +691,17 @@ class ShareSurveyAPI(Resource):
             return {"error": "Missing required fields"}, 400
 
         try:
-            result = send_email_task.delay(
-                subject="You're Invited to Take a Survey",
-                recipients=emails,
-                body=f"Hi there!\n\nPlease complete the survey at:\n{survey_link}",
-                html=f"<p>Please take the survey <a href='{survey_link}'>here</a>.</p>"
-            )
-            logger.info(f"Email send result: {result}")
+            # Written to the outbox, so a slow or unavailable broker never holds up the request
+            with Session() as session:
+                message = OutboxService(session).enqueue(SEND_EMAIL_TASK, kwargs=dict(
+                    subject="You're Invited to Take a Survey",
+                    recipients=emails,
+                    body=f"Hi there!\n\nPlease complete the survey at:\n{survey_link}",
+                    html=f"<p>Please take the survey <a href='{survey_link}'>here</a>.</p>"
+                ))
+                session.commit()
+                logger.info("Survey %s email queued as outbox message id=%s", survey_id, message.id)
             return {"message": "Survey email(s) sent!"}, 200
         except Exception as e:
-            logger.error(f"Error sending email: {str(e)}")
+            logger.error("Error sending email: %s", e)
             return {"error": f"Failed to send email: {str(e)}"}, 500
@@ -0,0 +1,20 @@
+from flask_marshmallow import Marshmallow
+from flask_mail import Mail
+from flask_migrate import Migrate
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import sessionmaker
+
+db = SQLAlchemy()
+ma = Marshmallow()
+migrate = Migrate()
+mail = Mail()
+
+
+class AppSessionmaker(sessionmaker):
+    """`sessionmaker` whose sessions bind to the current app's engine when they are opened."""
+    def __call__(self, **local_kw):
+        local_kw.setdefault("bind", db.engine)
+        return super().__call__(**local_kw)
+
+
+Session = AppSessionmaker()
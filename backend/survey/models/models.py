@@ -1,15 +1,55 @@
-from datetime import datetime
-from survey.app import db, ma
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+from survey.extensions import db, ma
+from survey.utils.utils import hash_email
+
+
+class utcnow(FunctionElement):
+    """
+    Current UTC time as a naive timestamp, the way every `DateTime` column here is stored.
+
+    `now()` is in the session's timezone on Postgres `timestamp without time zone` columns,
+    while SQLite's CURRENT_TIMESTAMP is already UTC.
+    """
+    type = db.DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _compile_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _compile_utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', CURRENT_TIMESTAMP)"
 
 
 class Survey(db.Model):
     id = db.Column(db.Integer, primary_key=True, index=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    questions = db.relationship('Question', backref='survey', cascade='all, delete-orphan')
+    # Questions of the current version; retired ones are only reachable through older versions
+    questions = db.relationship(
+        'Question',
+        primaryjoin='and_(Survey.id == Question.survey_id, Question.retired == False)',
+        backref='survey',
+        cascade='all, delete-orphan',
+        order_by='Question.order, Question.id',
+    )
     published = db.Column(db.Boolean(), default=True)
     scheduled_time = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    # One response per respondent email; enforced by a partial unique index on `response`
+    dedupe_respondents = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    # Versions are cached by (survey_id, version), so ids must never be reused (SQLite reuses max(id) + 1)
+    __table_args__ = {'sqlite_autoincrement': True}
 
 
 class Question(db.Model):
@@ -20,7 +60,33 @@ class Question(db.Model):
     options = db.Column(db.JSON, nullable=True)
     required = db.Column(db.Boolean, default=False)
     order = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    # Questions are never edited in place: a changed question is retired and replaced by a new row
+    retired = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    # Shards number their questions from their own id range (survey.utils.sharding), which
+    # SQLite only keeps with AUTOINCREMENT
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+# Immutable definition of a survey at one version (survey.services.survey_service)
+class SurveyVersion(db.Model):
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), primary_key=True)
+    version = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+
+# Questions of a survey version; unchanged questions are shared by consecutive versions
+class SurveyVersionQuestion(db.Model):
+    survey_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True)
+
+    __table_args__ = (
+        db.ForeignKeyConstraint(['survey_id', 'version'], ['survey_version.survey_id', 'survey_version.version']),
+    )
 
 
 class Response(db.Model):
@@ -28,7 +94,142 @@ class Response(db.Model):
     survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), nullable=False, index=True)
     answers = db.Column(db.JSON, nullable=False)
     respondent_email = db.Column(db.String(200),nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    # Hex SHA-256 of the trimmed, lowercased email, kept in sync by `_hash_respondent_email`
+    respondent_email_hash = db.Column(db.String(64), nullable=True)
+    # Set on responses to surveys with `dedupe_respondents`; only these rows are unique per email
+    unique_respondent = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Version of the survey the response answered; NULL for responses older than versioning
+    survey_version = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    __table_args__ = (
+        db.Index('ix_response_survey_id_created_at', 'survey_id', 'created_at'),
+        db.Index('ix_response_survey_id_email_hash', 'survey_id', 'respondent_email_hash'),
+        db.Index(
+            'uq_response_survey_id_unique_respondent', 'survey_id', 'respondent_email_hash',
+            unique=True,
+            sqlite_where=db.text('unique_respondent'),
+            postgresql_where=db.text('unique_respondent'),
+        ),
+        # Ids must never be reused once archived rows leave the table (SQLite reuses max(id) + 1)
+        {'sqlite_autoincrement': True},
+    )
+
+    @db.validates('respondent_email')
+    def _hash_respondent_email(self, key, value):
+        self.respondent_email_hash = hash_email(value)
+        return value
+
+
+# Bookkeeping of the responses moved to a survey's cold-storage file (survey.services.archive_service)
+class ResponseArchive(db.Model):
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), primary_key=True)
+    response_count = db.Column(db.Integer, nullable=False, default=0)
+    min_response_id = db.Column(db.Integer, nullable=True)
+    max_response_id = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+
+# Respondents of a survey's archived responses, so respondent dedupe still finds them once their
+# rows have left `response` (survey.services.archive_service)
+class ArchivedRespondent(db.Model):
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), primary_key=True)
+    respondent_email_hash = db.Column(db.String(64), primary_key=True)
+
+
+# Mergeable sketches of a survey's responses, in total and per UTC day (survey.services.sketch_service)
+class ResponseSketch(db.Model):
+    survey_id = db.Column(db.Integer, db.ForeignKey('survey.id'), primary_key=True)
+    # "total", or the day (YYYY-MM-DD) the sketched responses were created on
+    period = db.Column(db.String(10), primary_key=True)
+    # "respondents", or "distinct:<question_id>" / "top:<question_id>" for free-text answers
+    name = db.Column(db.String(50), primary_key=True)
+    # Responses (or answers) added to the sketch
+    count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+
+# Celery tasks written in the transaction of the change that triggers them (survey.services.outbox_service)
+class OutboxMessage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    task_name = db.Column(db.String(200), nullable=False)
+    args = db.Column(db.JSON, nullable=True)
+    kwargs = db.Column(db.JSON, nullable=True)
+    # When the task should run, for tasks sent with a countdown (UTC)
+    eta = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Earliest time of the next publish attempt (UTC); pushed back after broker errors
+    available_at = db.Column(db.DateTime, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    __table_args__ = (
+        db.Index(
+            'ix_outbox_message_pending', 'available_at',
+            sqlite_where=db.text('sent_at IS NULL'),
+            postgresql_where=db.text('sent_at IS NULL'),
+        ),
+    )
+
+
+# Directory of the shard holding each survey, kept in the default database (survey.utils.sharding).
+# Survey ids are allocated here when shards are configured, and never reused.
+class SurveyShard(db.Model):
+    survey_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+    __table_args__ = {'sqlite_autoincrement': True}
+
+
+# Progress of a `flask survey bulk-load` run, committed with each batch it loaded
+# (survey.services.bulk_load_service)
+class BulkLoadCheckpoint(db.Model):
+    survey_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), primary_key=True)
+    # Input records consumed, loaded or rejected; a resumed run skips this many
+    rows_read = db.Column(db.Integer, nullable=False, default=0)
+    loaded = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=utcnow(), onupdate=utcnow())
+
+
+class IdempotencyKey(db.Model):
+    key = db.Column(db.String(300), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, server_default=utcnow())
+
+
+# Full-text index of survey titles, descriptions and question text (survey.services.search_service).
+# Its shape depends on the database, so it is created with DDL rather than declared as a model.
+SURVEY_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS survey_search "
+        "USING fts5(title, description, questions, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS survey_search (survey_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_survey_search_document ON survey_search USING GIN (document)",
+    ],
+}
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_survey_search(target, connection, **kw):
+    for statement in SURVEY_SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_survey_search(target, connection, **kw):
+    if connection.dialect.name in SURVEY_SEARCH_DDL:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS survey_search")
 
 
 class SurveySchema(ma.SQLAlchemyAutoSchema):
@@ -46,6 +247,8 @@ class QuestionSchema(ma.SQLAlchemyAutoSchema):
         include_fk = True
         include_relationships = True
         load_instance = True
+        # Mutable bookkeeping, kept out of the frozen version definitions
+        exclude = ("retired",)
 
 
 class ResponseSchema(ma.SQLAlchemyAutoSchema):
@@ -54,11 +257,21 @@ class ResponseSchema(ma.SQLAlchemyAutoSchema):
         include_fk = True
         include_relationships = True
         load_instance = True
+        # Derived from the email and the survey, never set by clients
+        exclude = ("respondent_email_hash", "unique_respondent")
 
 
 survey_schema = SurveySchema()
 surveys_schema = SurveySchema(many=True)
+# Survey fields without questions, which are served from the version cache or not at all
+survey_fields_schema = SurveySchema(exclude=("questions",))
 question_schema = QuestionSchema()
 questions_schema = QuestionSchema(many=True)
 response_schema = ResponseSchema()
 responses_schema = ResponseSchema(many=True)
+
+
+@lru_cache(maxsize=128)
+def fieldset_schema(schema_class: type, fields: tuple, many: bool = False) -> ma.SQLAlchemyAutoSchema:
+    """Schema dumping only `fields` (sparse fieldsets), built once per field set."""
+    return schema_class(only=fields, many=many)
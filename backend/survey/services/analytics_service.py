@@ -0,0 +1,474 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+import pytz
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from survey.models.models import Question, Response
+from survey.services.archive_service import ArchiveService
+from survey.services.survey_service import SurveyService
+from survey.utils.cache import LRUCache
+from survey.utils.exceptions import SurveyException
+from survey.utils.utils import convert_to_utc, extract_answer, get_logger
+
+logger = get_logger(__name__)
+
+CHOICE_QUESTION_TYPES = ("multiple-choice", "checkbox")
+
+# bucket name -> strftime format used to truncate timestamps on SQLite
+TIMESERIES_BUCKETS = {
+    "minute": "%Y-%m-%d %H:%M:00",
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+# Step between UTC offset probes; a zone changing its offset twice within it would be missed
+OFFSET_PROBE_STEP = timedelta(days=1)
+
+# survey_id -> {"fingerprint": tuple, "columns": {question_id: (categories, indicator matrix)}}
+_encoded_answers_cache = LRUCache(maxsize=64)
+
+
+def offset_changes(zone: ZoneInfo, first: datetime, last: datetime) -> List[datetime]:
+    """
+    Find the UTC times in `(first, last]` at which `zone` changes its UTC offset.
+
+    The range is probed every `OFFSET_PROBE_STEP`, and each step whose offset differs is
+    bisected down to the second the change happens at.
+
+    Args:
+        zone (ZoneInfo): The timezone.
+        first (datetime): Naive UTC start of the range.
+        last (datetime): Naive UTC end of the range.
+
+    Returns:
+        List[datetime]: Naive UTC times of the offset changes, in order.
+    """
+    def offset(utc_time: datetime) -> Optional[timedelta]:
+        return utc_time.replace(tzinfo=timezone.utc).astimezone(zone).utcoffset()
+
+    changes = []
+    low, low_offset = first, offset(first)
+    while low < last:
+        high = min(low + OFFSET_PROBE_STEP, last)
+        if offset(high) == low_offset:
+            low = high
+            continue
+        while high - low > timedelta(seconds=1):
+            middle = low + (high - low) / 2
+            if offset(middle) == low_offset:
+                low = middle
+            else:
+                high = middle
+        # Zones change offset on whole seconds, and exactly one lies in (low, high]
+        low = low.replace(microsecond=0) + timedelta(seconds=1)
+        low_offset = offset(low)
+        changes.append(low)
+    return changes
+
+
+def invalidate_encoded_answers(survey_id: int) -> None:
+    """
+    Drop the cached encoded answer arrays for a survey.
+
+    Args:
+        survey_id (int): The ID of the survey.
+    """
+    _encoded_answers_cache.pop(survey_id)
+
+
+def encode_answers(values: List[Any], options: Optional[List[Any]] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    One-hot encode the answers given to a single choice question.
+
+    Single-choice answers set one column per row; checkbox answers (lists) may set several.
+    Categories follow the question's `options` order, followed by any unexpected values seen.
+
+    Args:
+        values (List[Any]): One answer per response, None when unanswered.
+        options (List[Any], optional): The declared options of the question.
+
+    Returns:
+        tuple: The category labels and a boolean matrix of shape (len(values), len(categories)).
+    """
+    categories: List[str] = []
+    index: Dict[str, int] = {}
+    for option in options or []:
+        label = str(option)
+        if label not in index:
+            index[label] = len(categories)
+            categories.append(label)
+
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            label = str(item)
+            if label not in index:
+                index[label] = len(categories)
+                categories.append(label)
+            rows.append(row)
+            cols.append(index[label])
+
+    matrix = np.zeros((len(values), len(categories)), dtype=bool)
+    matrix[np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)] = True
+    return categories, matrix
+
+
+def build_crosstab(
+    row_matrix: np.ndarray,
+    col_matrix: np.ndarray,
+    percentages: bool = False,
+    chi_square: bool = False,
+) -> Dict[str, Any]:
+    """
+    Build a contingency table from two encoded answer matrices.
+
+    Each cell counts the responses that selected both the row and the column category,
+    so multi-select answers contribute to every combination they cover.
+
+    Args:
+        row_matrix (np.ndarray): Encoded answers of the row question (responses x row categories).
+        col_matrix (np.ndarray): Encoded answers of the column question (responses x column categories).
+        percentages (bool): Include row and column percentages.
+        chi_square (bool): Include Pearson's chi-square statistic and degrees of freedom.
+
+    Returns:
+        dict: Counts, marginal totals and the optional statistics.
+    """
+    counts = row_matrix.T.astype(np.int64) @ col_matrix.astype(np.int64)
+    row_totals = counts.sum(axis=1)
+    col_totals = counts.sum(axis=0)
+    total = int(counts.sum())
+    answered_both = int((row_matrix.any(axis=1) & col_matrix.any(axis=1)).sum())
+
+    result: Dict[str, Any] = {
+        "counts": counts.tolist(),
+        "row_totals": row_totals.tolist(),
+        "column_totals": col_totals.tolist(),
+        "total": total,
+        "respondents": answered_both,
+    }
+
+    if percentages:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            row_pct = np.where(row_totals[:, None] > 0, counts / row_totals[:, None] * 100, 0.0)
+            col_pct = np.where(col_totals[None, :] > 0, counts / col_totals[None, :] * 100, 0.0)
+        result["row_percentages"] = np.round(row_pct, 2).tolist()
+        result["column_percentages"] = np.round(col_pct, 2).tolist()
+
+    if chi_square:
+        statistic = 0.0
+        if total > 0:
+            expected = np.outer(row_totals, col_totals) / total
+            mask = expected > 0
+            statistic = float((((counts - expected) ** 2)[mask] / expected[mask]).sum())
+        dof = max(int((row_totals > 0).sum()) - 1, 0) * max(int((col_totals > 0).sum()) - 1, 0)
+        result["chi_square"] = {"statistic": round(statistic, 6), "dof": dof}
+
+    return result
+
+
+class AnalyticsService:
+    """Service class that computes analytical views over survey responses."""
+    def __init__(self, session: Session):
+        """
+        Initialize the AnalyticsService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+        """
+        self.session = session
+
+    def _get_encoded_columns(self, survey_id: int, questions: List[Question]) -> Dict[int, Tuple[List[str], np.ndarray]]:
+        """
+        Return the encoded answer matrices of every choice question of a survey.
+
+        The matrices are cached per survey and rebuilt only when the survey's responses
+        (count / latest id, live or archived) or question set change.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            questions (List[Question]): The survey's questions.
+
+        Returns:
+            dict: Mapping of question id to (categories, indicator matrix).
+        """
+        count, max_id = (
+            self.session.query(func.count(Response.id), func.max(Response.id))
+            .filter(Response.survey_id == survey_id)
+            .one()
+        )
+        archive = ArchiveService(self.session)
+        fingerprint = (count, max_id, archive.fingerprint(survey_id), tuple(sorted(q.id for q in questions)))
+
+        cached = _encoded_answers_cache.get(survey_id)
+        if cached and cached["fingerprint"] == fingerprint:
+            return cached["columns"]
+
+        choice_questions = [q for q in questions if q.type in CHOICE_QUESTION_TYPES]
+        answers = archive.archived_answers(survey_id) + [
+            row.answers for row in
+            self.session.query(Response.answers)
+            .filter(Response.survey_id == survey_id)
+            .order_by(Response.id)
+        ]
+        columns = {
+            q.id: encode_answers([extract_answer(a, q.id, q.text) for a in answers], q.options)
+            for q in choice_questions
+        }
+        _encoded_answers_cache.set(survey_id, {"fingerprint": fingerprint, "columns": columns})
+        logger.debug("Encoded %s responses for survey id=%s", len(answers), survey_id)
+        return columns
+
+    def get_crosstab(
+        self,
+        survey_id: int,
+        row_question_id: int,
+        col_question_id: int,
+        percentages: bool = False,
+        chi_square: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Cross-tabulate the answers of two choice questions of a survey.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            row_question_id (int): ID of the question used for rows.
+            col_question_id (int): ID of the question used for columns.
+            percentages (bool): Include row and column percentages.
+            chi_square (bool): Include the chi-square statistic.
+
+        Returns:
+            dict: The contingency table with question metadata.
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+            SurveyException: If a question is missing or is not a choice question.
+        """
+        survey = SurveyService(self.session).get_survey(survey_id)
+        questions = {q.id: q for q in survey.questions}
+
+        for question_id in (row_question_id, col_question_id):
+            question = questions.get(question_id)
+            if not question:
+                raise SurveyException(f"Question {question_id} not found in survey {survey_id}", 404)
+            if question.type not in CHOICE_QUESTION_TYPES:
+                raise SurveyException(f"Question {question_id} is not a choice question")
+
+        columns = self._get_encoded_columns(survey_id, list(questions.values()))
+        row_categories, row_matrix = columns[row_question_id]
+        col_categories, col_matrix = columns[col_question_id]
+
+        result = build_crosstab(row_matrix, col_matrix, percentages, chi_square)
+        result.update({
+            "survey_id": survey_id,
+            "row": {
+                "question_id": row_question_id,
+                "text": questions[row_question_id].text,
+                "categories": row_categories,
+            },
+            "column": {
+                "question_id": col_question_id,
+                "text": questions[col_question_id].text,
+                "categories": col_categories,
+            },
+        })
+        return result
+
+    def _bucket_expression(self, bucket: str, tz: pytz.BaseTzInfo,
+                           first: Optional[datetime] = None, last: Optional[datetime] = None):
+        """
+        Build the SQL expression truncating `Response.created_at` (stored in UTC) to a local bucket.
+
+        Postgres converts every row with `AT TIME ZONE`. SQLite has no timezone database: the rows'
+        range `[first, last]` is split at the UTC offset changes of `tz` (see `offset_changes`),
+        and each part is shifted by its own offset, so buckets stay exact across DST transitions.
+
+        Args:
+            bucket (str): One of `TIMESERIES_BUCKETS`.
+            tz (pytz.BaseTzInfo): Timezone the buckets are aligned to.
+            first (datetime, optional): Earliest UTC `created_at` of the rows (SQLite only).
+            last (datetime, optional): Latest UTC `created_at` of the rows (SQLite only).
+
+        Returns:
+            ColumnElement: The bucket expression.
+
+        Raises:
+            SurveyException: If the system timezone database lacks `tz` (SQLite only).
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            local_time = func.timezone(tz.zone, func.timezone("UTC", Response.created_at))
+            return func.date_trunc(bucket, local_time)
+
+        def shifted(utc_time: datetime):
+            offset = pytz.utc.localize(utc_time).astimezone(tz).utcoffset()
+            offset_minutes = int(offset.total_seconds() // 60) if offset else 0
+            return func.strftime(TIMESERIES_BUCKETS[bucket], Response.created_at, f"{offset_minutes:+d} minutes")
+
+        if first is None or last is None:
+            return shifted(datetime.now(timezone.utc).replace(tzinfo=None))
+        try:
+            zone = ZoneInfo(tz.zone)
+        except ZoneInfoNotFoundError:
+            raise SurveyException(f"Timezone '{tz.zone}' is not supported for time series on this database")
+        changes = offset_changes(zone, first, last)
+        if not changes:
+            return shifted(first)
+        starts = [first] + changes
+        return case(
+            *((Response.created_at < end, shifted(start)) for start, end in zip(starts, changes)),
+            else_=shifted(changes[-1]),
+        )
+
+    def get_response_timeseries(
+        self,
+        survey_id: int,
+        bucket: str = "hour",
+        tz_name: str = "UTC",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Count a survey's responses per time bucket.
+
+        The aggregation runs in SQL and is served by the `(survey_id, created_at)` index;
+        archived responses are added from cold storage. Empty buckets are omitted.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            bucket (str): Bucket size, one of "minute", "hour" or "day".
+            tz_name (str): Timezone used to align buckets and interpret `start`/`end`.
+            start (str, optional): Inclusive lower bound as a local datetime string.
+            end (str, optional): Exclusive upper bound as a local datetime string.
+
+        Returns:
+            dict: The bucket points ordered by time.
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+            SurveyException: If the bucket or timezone is invalid.
+        """
+        if bucket not in TIMESERIES_BUCKETS:
+            raise SurveyException(f"Invalid bucket '{bucket}'; expected one of {', '.join(TIMESERIES_BUCKETS)}")
+        try:
+            tz = pytz.timezone(tz_name)
+        except pytz.UnknownTimeZoneError:
+            raise SurveyException(f"Unknown timezone '{tz_name}'")
+
+        SurveyService(self.session).get_survey(survey_id)
+
+        lower = convert_to_utc(start, tz.zone).replace(tzinfo=None) if start else None
+        upper = convert_to_utc(end, tz.zone).replace(tzinfo=None) if end else None
+        filters = [Response.survey_id == survey_id]
+        if lower:
+            filters.append(Response.created_at >= lower)
+        if upper:
+            filters.append(Response.created_at < upper)
+
+        first = last = None
+        if self.session.get_bind().dialect.name != "postgresql":
+            first, last = (
+                self.session.query(func.min(Response.created_at), func.max(Response.created_at))
+                .filter(*filters)
+                .one()
+            )
+        bucket_start = self._bucket_expression(bucket, tz, first, last).label("bucket_start")
+        query = self.session.query(bucket_start, func.count(Response.id)).filter(*filters)
+
+        counts: Dict[datetime, int] = {}
+        for local_start, count in query.group_by(bucket_start):
+            if isinstance(local_start, str):
+                local_start = datetime.strptime(local_start, "%Y-%m-%d %H:%M:%S")
+            counts[local_start.replace(tzinfo=None)] = count
+
+        # Archived responses are not in SQL, so they are bucketed here (with exact per-row offsets)
+        for created_at in ArchiveService(self.session).archived_created_at(survey_id):
+            if created_at is None or (lower and created_at < lower) or (upper and created_at >= upper):
+                continue
+            local = pytz.utc.localize(created_at).astimezone(tz).replace(tzinfo=None)
+            local_start = datetime.strptime(local.strftime(TIMESERIES_BUCKETS[bucket]), "%Y-%m-%d %H:%M:%S")
+            counts[local_start] = counts.get(local_start, 0) + 1
+
+        points = [
+            {"bucket_start": tz.localize(local_start).isoformat(), "count": count}
+            for local_start, count in sorted(counts.items())
+        ]
+
+        return {
+            "survey_id": survey_id,
+            "bucket": bucket,
+            "timezone": tz.zone,
+            "points": points,
+        }
+
+    def get_answer_distribution(self, survey_id: int) -> Dict[str, Any]:
+        """
+        Count a survey's responses and the answers given to each of its choice questions.
+
+        Live and archived responses are both counted; this is the snapshot the live results
+        stream starts from before applying response deltas.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            dict: The total, per choice question id the count of every category, and the highest
+                live response id counted (`last_response_id`).
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+        """
+        survey = SurveyService(self.session).get_survey(survey_id)
+        columns = self._get_encoded_columns(survey_id, survey.questions)
+        live, last_response_id = (
+            self.session.query(func.count(Response.id), func.max(Response.id))
+            .filter(Response.survey_id == survey_id)
+            .one()
+        )
+        answers = {
+            str(question_id): dict(zip(categories, matrix.sum(axis=0).tolist()))
+            for question_id, (categories, matrix) in columns.items()
+        }
+        return {
+            "survey_id": survey_id,
+            "total_responses": live + ArchiveService(self.session).archived_count(survey_id),
+            "answers": answers,
+            "last_response_id": last_response_id,
+        }
+
+    def response_delta(self, response: Response) -> Dict[str, Any]:
+        """
+        Describe what one response adds to its survey's answer distribution.
+
+        Args:
+            response (Response): A committed response.
+
+        Returns:
+            dict: One response, its id and, per answered choice question id, a count of 1 per category.
+        """
+        if response.survey_version is not None:
+            questions = SurveyService(self.session).get_survey_version(
+                response.survey_id, response.survey_version,
+            )["questions"]
+        else:
+            questions = [
+                {"id": q.id, "text": q.text, "type": q.type}
+                for q in SurveyService(self.session).get_survey(response.survey_id).questions
+            ]
+
+        answers: Dict[str, Dict[str, int]] = {}
+        for question in questions:
+            if question["type"] not in CHOICE_QUESTION_TYPES:
+                continue
+            value = extract_answer(response.answers, question["id"], question["text"])
+            if value is None or value == "":
+                continue
+            items = value if isinstance(value, (list, tuple)) else [value]
+            answers[str(question["id"])] = {str(item): 1 for item in items}
+        return {"survey_id": response.survey_id, "response_id": response.id, "responses": 1, "answers": answers}
@@ -0,0 +1,445 @@
+import contextlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from survey.models.models import ArchivedRespondent, Response, ResponseArchive
+from survey.utils.utils import get_logger, hash_email
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = get_logger(__name__)
+
+# Files queued in `Session.info` by `ArchiveService.delete_archive`, removed once the session commits
+PENDING_DELETES_KEY = "archive_files_to_delete"
+
+
+def _arrow():
+    """Import pyarrow on first use, so web workers that never read an archive do not load it."""
+    import pyarrow
+    import pyarrow.compute
+    return pyarrow, pyarrow.compute
+
+
+@lru_cache(maxsize=None)
+def archive_schema() -> "pa.Schema":
+    pa, _ = _arrow()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("survey_id", pa.int64()),
+        # Answers have a per-survey shape, so they are kept as JSON text
+        ("answers", pa.string()),
+        ("respondent_email", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("survey_version", pa.int64()),
+    ])
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_committed_files(session: Session) -> None:
+    for path in session.info.pop(PENDING_DELETES_KEY, ()):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_rolled_back_files(session: Session) -> None:
+    session.info.pop(PENDING_DELETES_KEY, None)
+
+
+class ArchiveStore:
+    """
+    Per-survey Arrow IPC files holding archived responses.
+
+    Files are zstd-compressed and read through a memory map. A file is never modified in place:
+    appends write a new file next to it and atomically replace the old one.
+    """
+    def __init__(self, directory: str, compression: str = "zstd"):
+        self.directory = directory
+        self.compression = compression
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_app(cls, app: Optional[Flask] = None) -> "ArchiveStore":
+        """
+        Build the store configured by `ARCHIVE_DIR`, defaulting to the app's instance folder.
+
+        Args:
+            app (Flask, optional): The Flask application. Defaults to `current_app`.
+
+        Returns:
+            ArchiveStore: The store.
+        """
+        app = app or current_app
+        return cls(app.config.get("ARCHIVE_DIR") or os.path.join(app.instance_path, "archive"))
+
+    def path(self, survey_id: int) -> str:
+        return os.path.join(self.directory, f"survey_{survey_id}.arrow")
+
+    def batches(self, survey_id: int) -> Iterator["pa.RecordBatch"]:
+        """Yield the record batches of a survey's archive, if it has one."""
+        path = self.path(survey_id)
+        if not os.path.exists(path):
+            return
+        pa, _ = _arrow()
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+
+    def read(self, survey_id: int) -> Optional["pa.Table"]:
+        """
+        Read a survey's archive.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            pa.Table or None: The archived rows ordered by id, or None without an archive.
+        """
+        path = self.path(survey_id)
+        if not os.path.exists(path):
+            return None
+        pa, _ = _arrow()
+        return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    def append(self, survey_id: int, new_batches: Iterable["pa.RecordBatch"], keep_up_to: int) -> int:
+        """
+        Write a new archive file made of the existing rows followed by `new_batches`.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            new_batches (Iterable[pa.RecordBatch]): Rows to add, in id order.
+            keep_up_to (int): Highest existing id to keep. Rows above it were written by a run
+                that never recorded them and are about to be written again.
+
+        Returns:
+            int: Number of rows appended.
+        """
+        path = self.path(survey_id)
+        tmp_path = f"{path}.tmp"
+        appended = 0
+        pa, pc = _arrow()
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, archive_schema(), options=options) as writer:
+                for batch in self.batches(survey_id):
+                    batch = _conform(batch)
+                    writer.write_batch(batch.filter(pc.less_equal(batch.column("id"), keep_up_to)))
+                for batch in new_batches:
+                    writer.write_batch(batch)
+                    appended += batch.num_rows
+            os.replace(tmp_path, path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+        return appended
+
+
+def _conform(batch: "pa.RecordBatch") -> "pa.RecordBatch":
+    """Add the columns missing from batches written before they were part of `archive_schema`."""
+    if batch.schema.equals(archive_schema()):
+        return batch
+    pa, _ = _arrow()
+    return pa.RecordBatch.from_arrays([
+        batch.column(field.name) if field.name in batch.schema.names else pa.nulls(batch.num_rows, field.type)
+        for field in archive_schema()
+    ], schema=archive_schema())
+
+
+def _to_batch(rows: List[Response]) -> "pa.RecordBatch":
+    pa, _ = _arrow()
+    return pa.RecordBatch.from_pydict({
+        "id": [row.id for row in rows],
+        "survey_id": [row.survey_id for row in rows],
+        "answers": [json.dumps(row.answers) for row in rows],
+        "respondent_email": [row.respondent_email for row in rows],
+        "created_at": [row.created_at for row in rows],
+        "survey_version": [row.survey_version for row in rows],
+    }, schema=archive_schema())
+
+
+def _to_response_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an archived row like `response_schema.dump` of a live response."""
+    return {
+        "id": row["id"],
+        "survey_id": row["survey_id"],
+        "answers": json.loads(row["answers"]),
+        "respondent_email": row["respondent_email"],
+        "survey_version": row.get("survey_version"),
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+    }
+
+
+class ArchiveService:
+    """Service class that moves old responses to cold storage and reads them back."""
+    def __init__(self, session: Session, store: Optional[ArchiveStore] = None):
+        """
+        Initialize the ArchiveService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+            store (ArchiveStore, optional): Archive files. Defaults to the current app's store.
+        """
+        self.session = session
+        self._store = store
+
+    @property
+    def store(self) -> ArchiveStore:
+        # Built lazily so reads of surveys without archives never touch the filesystem
+        if self._store is None:
+            self._store = ArchiveStore.from_app()
+        return self._store
+
+    def find_candidates(self, older_than_days: int) -> List[int]:
+        """
+        Return the surveys whose most recent response is older than `older_than_days`.
+
+        Args:
+            older_than_days (int): Inactivity threshold in days.
+
+        Returns:
+            List[int]: Survey ids.
+        """
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+        return [
+            row[0] for row in
+            self.session.query(Response.survey_id)
+            .group_by(Response.survey_id)
+            .having(func.max(Response.created_at) < cutoff)
+            .order_by(Response.survey_id)
+        ]
+
+    def archive_survey(self, survey_id: int, batch_size: int = 5000) -> int:
+        """
+        Move a survey's responses to its archive file, then delete them from the hot table.
+
+        The file is written first and recorded in `response_archive` with the highest archived
+        id, along with the rows' respondents in `archived_respondent`. Rows up to that id are then
+        deleted in batches, each in its own transaction. A run that stops half way is completed by
+        the next one without duplicating rows.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            batch_size (int): Rows read and deleted per batch.
+
+        Returns:
+            int: Number of responses newly archived.
+        """
+        record = self.session.get(ResponseArchive, survey_id)
+        after_id = record.max_response_id if record and record.max_response_id else 0
+        bounds = {"min": None, "max": None}
+
+        def new_batches() -> Iterator["pa.RecordBatch"]:
+            last_id = after_id
+            while True:
+                rows = (
+                    self.session.query(Response)
+                    .filter(Response.survey_id == survey_id, Response.id > last_id)
+                    .order_by(Response.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not rows:
+                    return
+                last_id = rows[-1].id
+                bounds["min"] = bounds["min"] or rows[0].id
+                bounds["max"] = last_id
+                self._record_respondents(survey_id, [row.respondent_email_hash for row in rows])
+                yield _to_batch(rows)
+                for row in rows:
+                    self.session.expunge(row)
+
+        archived = self.store.append(survey_id, new_batches(), keep_up_to=after_id)
+        if archived:
+            if record is None:
+                record = ResponseArchive(survey_id=survey_id, response_count=0, min_response_id=bounds["min"])
+                self.session.add(record)
+            record.response_count += archived
+            record.max_response_id = bounds["max"]
+            self.session.commit()
+            logger.info("Archived %s responses of survey id=%s", archived, survey_id)
+
+        if record is not None and record.max_response_id:
+            self._delete_archived(survey_id, record.max_response_id, batch_size)
+        return archived
+
+    def _record_respondents(self, survey_id: int, email_hashes: Iterable[Optional[str]]) -> None:
+        """Keep the respondents of rows leaving `response`, so dedupe still finds them (the caller commits)."""
+        email_hashes = {email_hash for email_hash in email_hashes if email_hash}
+        if not email_hashes:
+            return
+        known = self.archived_respondents(survey_id, list(email_hashes))
+        self.session.add_all(
+            ArchivedRespondent(survey_id=survey_id, respondent_email_hash=email_hash)
+            for email_hash in sorted(email_hashes - known)
+        )
+
+    def index_respondents(self, survey_id: int) -> int:
+        """
+        Record the respondents of a survey's archive file in `archived_respondent` (the caller commits).
+
+        Needed once for archives written before respondents were recorded while archiving.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            int: Number of archived responses read.
+        """
+        read = 0
+        if not self.archived_count(survey_id):
+            return read
+        for batch in self.store.batches(survey_id):
+            emails = batch.column("respondent_email").to_pylist()
+            self._record_respondents(survey_id, [hash_email(email) for email in emails])
+            read += batch.num_rows
+        return read
+
+    def _delete_archived(self, survey_id: int, max_response_id: int, batch_size: int) -> None:
+        while True:
+            ids = [
+                row[0] for row in
+                self.session.query(Response.id)
+                .filter(Response.survey_id == survey_id, Response.id <= max_response_id)
+                .limit(batch_size)
+            ]
+            if not ids:
+                return
+            self.session.query(Response).filter(Response.id.in_(ids)).delete(synchronize_session=False)
+            self.session.commit()
+
+    def archive(self, older_than_days: Optional[int] = None, survey_ids: Optional[List[int]] = None,
+                batch_size: int = 5000) -> Dict[str, Any]:
+        """
+        Archive the given surveys, or every survey inactive for `older_than_days`.
+
+        Args:
+            older_than_days (int, optional): Inactivity threshold used when `survey_ids` is empty.
+            survey_ids (List[int], optional): Surveys to archive regardless of age.
+            batch_size (int): Rows read and deleted per batch.
+
+        Returns:
+            dict: Responses archived per survey and in total.
+        """
+        if not survey_ids:
+            survey_ids = self.find_candidates(older_than_days if older_than_days is not None else 180)
+        archived = {survey_id: self.archive_survey(survey_id, batch_size) for survey_id in survey_ids}
+        return {"surveys": archived, "responses": sum(archived.values())}
+
+    @staticmethod
+    def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine the `archive` results of several shards into one."""
+        archived = {survey_id: count for result in results for survey_id, count in result["surveys"].items()}
+        return {"surveys": archived, "responses": sum(archived.values())}
+
+    def archived_count(self, survey_id: int) -> int:
+        record = self.session.get(ResponseArchive, survey_id)
+        return record.response_count if record else 0
+
+    def archived_counts(self) -> Dict[int, int]:
+        return dict(self.session.query(ResponseArchive.survey_id, ResponseArchive.response_count))
+
+    def fingerprint(self, survey_id: int) -> tuple:
+        """Changes whenever the survey's archive does; used to key caches of its responses."""
+        record = self.session.get(ResponseArchive, survey_id)
+        return (record.response_count, record.max_response_id) if record else (0, None)
+
+    def archived_responses(self, survey_id: int) -> List[Dict[str, Any]]:
+        """
+        Return a survey's archived responses shaped like serialized live responses.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            List[dict]: Archived responses in id order.
+        """
+        if not self.archived_count(survey_id):
+            return []
+        table = self.store.read(survey_id)
+        return [_to_response_dict(row) for row in table.to_pylist()] if table is not None else []
+
+    def all_archived_responses(self) -> List[Dict[str, Any]]:
+        responses = []
+        for survey_id in sorted(self.archived_counts()):
+            responses.extend(self.archived_responses(survey_id))
+        return responses
+
+    def archived_answers(self, survey_id: int) -> List[Any]:
+        if not self.archived_count(survey_id):
+            return []
+        table = self.store.read(survey_id)
+        return [json.loads(answers) for answers in table.column("answers").to_pylist()] if table is not None else []
+
+    def archived_created_at(self, survey_id: int) -> List[datetime]:
+        if not self.archived_count(survey_id):
+            return []
+        table = self.store.read(survey_id)
+        return table.column("created_at").to_pylist() if table is not None else []
+
+    def has_archived_respondent(self, survey_id: int, email_hash: str) -> bool:
+        """Whether an archived response of the survey came from the respondent with `email_hash`."""
+        return self.session.query(
+            self.session.query(ArchivedRespondent)
+            .filter(ArchivedRespondent.survey_id == survey_id, ArchivedRespondent.respondent_email_hash == email_hash)
+            .exists()
+        ).scalar()
+
+    def archived_respondents(self, survey_id: int, email_hashes: List[str]) -> set:
+        """The `email_hashes` found among the respondents of the survey's archived responses."""
+        return {
+            row[0] for row in
+            self.session.query(ArchivedRespondent.respondent_email_hash)
+            .filter(ArchivedRespondent.survey_id == survey_id,
+                    ArchivedRespondent.respondent_email_hash.in_(email_hashes))
+        }
+
+    def find_archived_response(self, response_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Look up an archived response by id.
+
+        Args:
+            response_id (int): The ID of the response.
+
+        Returns:
+            dict or None: The archived response, if any.
+        """
+        records = (
+            self.session.query(ResponseArchive.survey_id)
+            .filter(ResponseArchive.min_response_id <= response_id, ResponseArchive.max_response_id >= response_id)
+        )
+        _, pc = _arrow()
+        for (survey_id,) in records:
+            table = self.store.read(survey_id)
+            if table is None:
+                continue
+            matches = table.filter(pc.equal(table.column("id"), response_id)).to_pylist()
+            if matches:
+                return _to_response_dict(matches[0])
+        return None
+
+    def delete_archive(self, survey_id: int) -> None:
+        """Remove a survey's bookkeeping rows, and its archive file once the caller commits."""
+        self.session.query(ArchivedRespondent).filter(ArchivedRespondent.survey_id == survey_id).delete()
+        if self.session.query(ResponseArchive).filter(ResponseArchive.survey_id == survey_id).delete():
+            self.delete_files_after_commit([survey_id])
+
+    def delete_files_after_commit(self, survey_ids: Iterable[int]) -> None:
+        """
+        Remove the archive files of `survey_ids` when the session's transaction commits.
+
+        A rollback keeps them, so a failed delete never leaves rows pointing at a missing file.
+
+        Args:
+            survey_ids (Iterable[int]): Surveys whose archive rows were deleted in this transaction.
+        """
+        self.session.info.setdefault(PENDING_DELETES_KEY, []).extend(
+            self.store.path(survey_id) for survey_id in survey_ids
+        )
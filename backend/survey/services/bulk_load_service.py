@@ -0,0 +1,386 @@
+import csv
+import io
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from survey.models.models import BulkLoadCheckpoint, Response
+from survey.services.archive_service import ArchiveService
+from survey.services.sketch_service import SketchService
+from survey.services.survey_service import SurveyService
+from survey.utils.exceptions import SurveyException
+from survey.utils.utils import convert_to_utc, get_logger, hash_email
+
+logger = get_logger(__name__)
+
+BULK_LOAD_FORMATS = ("csv", "ndjson")
+# Mapping targets that are response fields rather than question ids
+EMAIL_TARGET = "respondent_email"
+CREATED_AT_TARGET = "created_at"
+DUPLICATE_RESPONDENT = "Respondent has already answered the survey"
+COPY_COLUMNS = (
+    "survey_id", "answers", "respondent_email", "respondent_email_hash",
+    "unique_respondent", "survey_version", "created_at",
+)
+
+
+class RejectedRecord(Exception):
+    """A record that failed validation; it is reported and skipped, never loaded."""
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Any]:
+    """
+    Read input records one at a time.
+
+    CSV rows become dicts keyed by the header. NDJSON lines are decoded on their own; a line
+    that is not valid JSON is yielded as the raw string so it is rejected like any other record.
+    Blank NDJSON lines are skipped.
+
+    Args:
+        stream (TextIO): The open input.
+        fmt (str): One of `BULK_LOAD_FORMATS`.
+
+    Returns:
+        Iterator: The records in input order.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BulkLoadService:
+    """
+    Service class loading historical responses straight into the `response` table.
+
+    Records are validated and inserted in batches, each committed in one transaction together
+    with its `bulk_load_checkpoint` row, so a run that stops resumes after the last committed
+    batch without loading any record twice. Postgres loads batches with `COPY`, other databases
+    with a single `executemany`. Each batch is added to the survey's sketches in the same
+    transaction. Loaded responses are not published to live result streams.
+    """
+    def __init__(self, session: Session):
+        """
+        Initialize the BulkLoadService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+        """
+        self.session = session
+
+    def resolve_columns(self, questions: List[Dict[str, Any]], mapping: Optional[Dict[str, str]] = None) -> Callable[[str], Any]:
+        """
+        Build the lookup of what an input column is loaded into.
+
+        Explicit mappings win; otherwise a column named after a question's id or text, or after
+        `respondent_email` / `created_at`, is mapped to it.
+
+        Args:
+            questions (List[dict]): The survey's current questions.
+            mapping (dict, optional): Column name to question id or response field.
+
+        Returns:
+            Callable: Maps a column name to a question dict, a response field name, or None.
+
+        Raises:
+            SurveyException: If a mapping names a question that is not in the survey.
+        """
+        by_id = {str(question["id"]): question for question in questions}
+        targets: Dict[str, Any] = {}
+        for question in questions:
+            targets[question["text"]] = question
+            targets[str(question["id"])] = question
+        targets[EMAIL_TARGET] = EMAIL_TARGET
+        targets[CREATED_AT_TARGET] = CREATED_AT_TARGET
+        for column, target in (mapping or {}).items():
+            target = str(target).strip()
+            if target in (EMAIL_TARGET, CREATED_AT_TARGET):
+                targets[column] = target
+            elif target in by_id:
+                targets[column] = by_id[target]
+            else:
+                raise SurveyException(f"Column '{column}' is mapped to question {target}, which is not in the survey")
+        return targets.get
+
+    @staticmethod
+    def _answer(question: Dict[str, Any], value: Any) -> Any:
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "" or value == []:
+            if question["required"]:
+                raise RejectedRecord(f"Question {question['id']} is required")
+            return None
+
+        if question["type"] == "checkbox":
+            if isinstance(value, str):
+                # CSV cells hold a JSON list or options separated by ";"
+                value = json.loads(value) if value.startswith("[") else [item.strip() for item in value.split(";")]
+            if not isinstance(value, list):
+                value = [value]
+        options = question["options"]
+        if question["type"] in ("multiple-choice", "checkbox") and options:
+            allowed = {str(option) for option in options}
+            for item in value if isinstance(value, list) else [value]:
+                if str(item) not in allowed:
+                    raise RejectedRecord(f"'{item}' is not an option of question {question['id']}")
+        return value
+
+    def prepare_record(self, record: Any, target_of: Callable[[str], Any], questions: List[Dict[str, Any]],
+                       survey: Dict[str, Any], tz_name: str, ignored: set) -> Dict[str, Any]:
+        """
+        Validate one input record and turn it into a `response` row.
+
+        Args:
+            record (Any): A record from `read_records`.
+            target_of (Callable): Column lookup from `resolve_columns`.
+            questions (List[dict]): The survey's current questions.
+            survey (dict): Id, version and `dedupe_respondents` of the survey.
+            tz_name (str): Timezone of `created_at` values without an offset.
+            ignored (set): Collects the columns that are not loaded.
+
+        Returns:
+            dict: Column values of the `response` row.
+
+        Raises:
+            RejectedRecord: If the record is invalid.
+        """
+        if not isinstance(record, dict):
+            raise RejectedRecord("Record must be a JSON object")
+
+        if None in record:
+            raise RejectedRecord("Row has more fields than the header")
+
+        values: Dict[Any, Any] = {}
+        for column, value in record.items():
+            target = target_of(column)
+            if target is None:
+                ignored.add(column)
+            elif isinstance(target, str):
+                values[target] = value
+            else:
+                values[target["id"]] = value
+
+        answers = []
+        for question in questions:
+            try:
+                answer = self._answer(question, values.get(question["id"]))
+            except ValueError:
+                raise RejectedRecord(f"Answer to question {question['id']} is not a valid JSON list")
+            if answer is not None:
+                answers.append({"question_id": question["id"], "question": question["text"], "answer": answer})
+
+        email = str(values.get(EMAIL_TARGET) or "").strip() or None
+        if email and len(email) > Response.respondent_email.type.length:
+            raise RejectedRecord("respondent_email is too long")
+        created_at = values.get(CREATED_AT_TARGET)
+        if created_at:
+            try:
+                created_at = convert_to_utc(str(created_at), tz_name).replace(tzinfo=None)
+            except (ValueError, OverflowError):
+                raise RejectedRecord(f"Invalid created_at '{created_at}'")
+        else:
+            created_at = _utcnow()
+
+        email_hash = hash_email(email)
+        return {
+            "survey_id": survey["id"],
+            "answers": answers,
+            "respondent_email": email,
+            "respondent_email_hash": email_hash,
+            "unique_respondent": bool(survey["dedupe_respondents"] and email_hash),
+            "survey_version": survey["version"],
+            "created_at": created_at,
+        }
+
+    def _known_respondents(self, survey_id: int, hashes: List[str]) -> set:
+        live = {
+            row[0] for row in
+            self.session.query(Response.respondent_email_hash)
+            .filter(
+                Response.survey_id == survey_id,
+                Response.unique_respondent.is_(True),
+                Response.respondent_email_hash.in_(hashes),
+            )
+        }
+        # The same respondents `submit_response` rejects, including archived ones
+        return live | ArchiveService(self.session).archived_respondents(survey_id, hashes)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        if self.session.get_bind().dialect.name != "postgresql":
+            self.session.execute(insert(Response.__table__), rows)
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # Unquoted empty fields are read back as NULL
+            writer.writerow([
+                row["survey_id"],
+                json.dumps(row["answers"]),
+                row["respondent_email"],
+                row["respondent_email_hash"],
+                "t" if row["unique_respondent"] else "f",
+                row["survey_version"],
+                row["created_at"].isoformat(sep=" "),
+            ])
+        buffer.seek(0)
+        # Runs on the session's connection, so the rows commit with the checkpoint
+        cursor = self.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY response ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+    def load(
+        self,
+        survey_id: int,
+        records: Iterable[Any],
+        name: str,
+        mapping: Optional[Dict[str, str]] = None,
+        batch_size: int = 10000,
+        tz_name: str = "UTC",
+        restart: bool = False,
+        on_reject: Optional[Callable[[int, str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Load responses into a survey from input records, resuming from the named checkpoint.
+
+        Answers are stored against the survey's current questions and version. A resumed run
+        must read the same input: it skips as many records as the checkpoint has read. On
+        surveys that dedupe respondents, rows of an email that has already answered, or that
+        appears earlier in the same load, are rejected.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            records (Iterable): Records from `read_records`.
+            name (str): Checkpoint name, usually the input file name.
+            mapping (dict, optional): Column name to question id, `respondent_email` or `created_at`.
+            batch_size (int): Records validated and committed per transaction.
+            tz_name (str): Timezone of `created_at` values without an offset.
+            restart (bool): Discard the checkpoint and load from the first record.
+            on_reject (Callable, optional): Called with the 1-based record number, the error and
+                the record for every rejected record.
+
+        Returns:
+            dict: Records loaded and rejected by this run, checkpoint totals and throughput.
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+            SurveyException: If a mapping names an unknown question.
+        """
+        started = time.perf_counter()
+        survey_model = SurveyService(self.session).get_survey(survey_id)
+        survey = {
+            "id": survey_id,
+            "version": survey_model.version,
+            "dedupe_respondents": survey_model.dedupe_respondents,
+        }
+        # Plain dicts, so committing a batch does not expire what every record is checked against
+        questions = [
+            {"id": q.id, "text": q.text, "type": q.type, "options": q.options, "required": bool(q.required)}
+            for q in survey_model.questions
+        ]
+        target_of = self.resolve_columns(questions, mapping)
+
+        checkpoint = self.session.get(BulkLoadCheckpoint, (survey_id, name))
+        if checkpoint is None:
+            checkpoint = BulkLoadCheckpoint(survey_id=survey_id, name=name, rows_read=0, loaded=0, rejected=0)
+            self.session.add(checkpoint)
+        elif restart:
+            checkpoint.rows_read = checkpoint.loaded = checkpoint.rejected = 0
+        resumed_from = checkpoint.rows_read
+
+        records = iter(records)
+        for _ in itertools.islice(records, resumed_from):
+            pass
+
+        ignored: set = set()
+        loaded = rejected = 0
+        row_number = resumed_from
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            # (record number, record, row) of the records that passed validation
+            prepared: List[Tuple[int, Any, Dict[str, Any]]] = []
+            failures: List[Tuple[int, str, Any]] = []
+            seen: set = set()
+            for record in batch:
+                row_number += 1
+                try:
+                    row = self.prepare_record(record, target_of, questions, survey, tz_name, ignored)
+                except RejectedRecord as e:
+                    failures.append((row_number, str(e), record))
+                    continue
+                if row["unique_respondent"]:
+                    if row["respondent_email_hash"] in seen:
+                        failures.append((row_number, DUPLICATE_RESPONDENT, record))
+                        continue
+                    seen.add(row["respondent_email_hash"])
+                prepared.append((row_number, record, row))
+
+            answered = self._known_respondents(survey_id, list(seen)) if seen else set()
+            rows = []
+            for number, record, row in prepared:
+                if row["unique_respondent"] and row["respondent_email_hash"] in answered:
+                    failures.append((number, DUPLICATE_RESPONDENT, record))
+                else:
+                    rows.append(row)
+            failures.sort(key=lambda failure: failure[0])
+
+            if rows:
+                self._insert(rows)
+                SketchService(self.session).record(
+                    survey_id,
+                    [(row["created_at"], row["respondent_email_hash"], row["answers"]) for row in rows],
+                    questions,
+                )
+            checkpoint.rows_read += len(batch)
+            checkpoint.loaded += len(rows)
+            checkpoint.rejected += len(failures)
+            self.session.commit()
+
+            loaded += len(rows)
+            rejected += len(failures)
+            if on_reject is not None:
+                for failure in failures:
+                    on_reject(*failure)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                "Bulk load of survey id=%s: %s records read, %s loaded, %s rejected (%.0f records/s)",
+                survey_id, checkpoint.rows_read, checkpoint.loaded, checkpoint.rejected,
+                (loaded + rejected) / elapsed if elapsed else 0,
+            )
+
+        # Keeps a new or restarted checkpoint even when there was nothing left to read
+        self.session.commit()
+        elapsed = time.perf_counter() - started
+        return {
+            "survey_id": survey_id,
+            "checkpoint": name,
+            "resumed_from": resumed_from,
+            "loaded": loaded,
+            "rejected": rejected,
+            "total_loaded": checkpoint.loaded,
+            "total_rejected": checkpoint.rejected,
+            "ignored_columns": sorted(ignored),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round((loaded + rejected) / elapsed, 1) if elapsed else None,
+        }
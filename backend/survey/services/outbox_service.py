@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from survey.celery_worker import send_task
+from survey.models.models import OutboxMessage
+from survey.utils.metrics import OUTBOX_MESSAGES
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+MAX_BACKOFF_SECONDS = 300
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def task_id_prefix(shard: Optional[int]) -> str:
+    """Task id prefix of the messages relayed from a shard's outbox, as each database numbers its own."""
+    return "outbox" if shard is None else f"outbox-shard{shard}"
+
+
+class OutboxService:
+    """
+    Service class for the transactional outbox of Celery tasks.
+
+    Tasks are written to `outbox_message` in the transaction of the change that triggers them,
+    so the HTTP request never waits on the broker and a committed change never loses its task.
+    A relay (the `relay_outbox` beat task or `flask survey relay-outbox`) sends pending rows.
+    Delivery is at least once: a relay that stops between sending and committing sends the row
+    again, with the same `outbox-<id>` task id.
+    """
+    def __init__(self, session: Session, task_id_prefix: str = "outbox"):
+        """
+        Initialize the OutboxService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+            task_id_prefix (str): Prefix of the task ids sent, unique per database (see `task_id_prefix`).
+        """
+        self.session = session
+        self.task_id_prefix = task_id_prefix
+
+    def enqueue(self, name: str, args: Optional[List[Any]] = None, kwargs: Optional[Dict[str, Any]] = None,
+                countdown: Optional[float] = None) -> OutboxMessage:
+        """
+        Add a task to the outbox (the caller commits).
+
+        Args:
+            name (str): Registered task name, e.g. `PUBLISH_SURVEY_TASK`.
+            args (list, optional): Positional task arguments; must be JSON serializable.
+            kwargs (dict, optional): Keyword task arguments; must be JSON serializable.
+            countdown (float, optional): Seconds from now before the task runs.
+
+        Returns:
+            OutboxMessage: The pending message.
+        """
+        now = _utcnow()
+        message = OutboxMessage(
+            task_name=name,
+            args=args,
+            kwargs=kwargs,
+            eta=now + timedelta(seconds=countdown) if countdown else None,
+            attempts=0,
+            available_at=now,
+        )
+        self.session.add(message)
+        return message
+
+    def enqueue_many(self, name: str, args_list: List[List[Any]], countdown: Optional[float] = None) -> None:
+        """
+        Add one task per argument list to the outbox with a single multi-row INSERT (the caller commits).
+
+        Args:
+            name (str): Registered task name.
+            args_list (List[list]): Positional arguments of each task.
+            countdown (float, optional): Seconds from now before the tasks run.
+        """
+        now = _utcnow()
+        eta = now + timedelta(seconds=countdown) if countdown else None
+        self.session.execute(insert(OutboxMessage), [
+            {"task_name": name, "args": args, "kwargs": None, "eta": eta, "attempts": 0, "available_at": now}
+            for args in args_list
+        ])
+
+    def relay(self, batch_size: int = 100, max_attempts: int = 10) -> Dict[str, int]:
+        """
+        Send one batch of pending messages to the broker, oldest first.
+
+        Rows are locked with `SKIP LOCKED` on Postgres, so several relays can run at once. The
+        first broker error ends the batch: the failing row is retried after an exponential
+        backoff, and the rest wait for the next run. Rows that reach `max_attempts` stay in the
+        table for inspection and are no longer sent.
+
+        Args:
+            batch_size (int): Maximum number of messages sent.
+            max_attempts (int): Attempts before a message is given up on.
+
+        Returns:
+            dict: Number of messages sent and failed.
+        """
+        now = _utcnow()
+        messages = (
+            self.session.query(OutboxMessage)
+            .filter(
+                OutboxMessage.sent_at.is_(None),
+                OutboxMessage.available_at <= now,
+                OutboxMessage.attempts < max_attempts,
+            )
+            .order_by(OutboxMessage.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        sent = failed = 0
+        for message in messages:
+            try:
+                send_task(
+                    message.task_name,
+                    args=message.args,
+                    kwargs=message.kwargs,
+                    eta=message.eta.replace(tzinfo=timezone.utc) if message.eta else None,
+                    task_id=f"{self.task_id_prefix}-{message.id}",
+                )
+            except Exception as e:
+                message.attempts += 1
+                message.last_error = str(e)[:1000]
+                message.available_at = now + timedelta(seconds=min(2 ** message.attempts, MAX_BACKOFF_SECONDS))
+                failed += 1
+                logger.warning("Outbox message id=%s (%s) failed, attempt %s: %s",
+                               message.id, message.task_name, message.attempts, e)
+                break
+            message.sent_at = _utcnow()
+            sent += 1
+        # One commit per batch keeps the rows locked until all of them are marked
+        self.session.commit()
+
+        OUTBOX_MESSAGES.labels("sent").inc(sent)
+        OUTBOX_MESSAGES.labels("failed").inc(failed)
+        if sent or failed:
+            logger.info("Outbox relay sent %s messages, %s failed", sent, failed)
+        return {"sent": sent, "failed": failed}
+
+    def relay_pending(self, batch_size: int = 100, max_attempts: int = 10) -> Dict[str, int]:
+        """
+        Relay batches until no message is ready or the broker fails.
+
+        Args:
+            batch_size (int): Messages per batch.
+            max_attempts (int): Attempts before a message is given up on.
+
+        Returns:
+            dict: Number of messages sent and failed.
+        """
+        totals = {"sent": 0, "failed": 0}
+        while True:
+            result = self.relay(batch_size, max_attempts)
+            totals["sent"] += result["sent"]
+            totals["failed"] += result["failed"]
+            if result["failed"] or result["sent"] < batch_size:
+                return totals
+
+    def purge(self, older_than_days: int = 7) -> int:
+        """
+        Delete messages sent more than `older_than_days` ago.
+
+        Args:
+            older_than_days (int): Retention of sent messages in days.
+
+        Returns:
+            int: Number of messages deleted.
+        """
+        cutoff = _utcnow() - timedelta(days=older_than_days)
+        deleted = (
+            self.session.query(OutboxMessage)
+            .filter(OutboxMessage.sent_at.isnot(None), OutboxMessage.sent_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        self.session.commit()
+        return deleted
@@ -0,0 +1,246 @@
+import heapq
+import itertools
+import re
+from typing import Any, Callable, Dict, Iterable, List
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+from survey.models.models import SURVEY_SEARCH_DDL, Survey, survey_fields_schema
+from survey.utils.exceptions import SurveyException
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+MAX_PER_PAGE = 100
+
+# Rebuild the index rows of the given surveys from their current title, description and questions
+_INDEX_SQL = {
+    "sqlite": """
+        INSERT INTO survey_search (rowid, title, description, questions)
+        SELECT s.id, s.title, coalesce(s.description, ''),
+               coalesce((SELECT group_concat(q.text, ' ') FROM question q
+                         WHERE q.survey_id = s.id AND NOT q.retired), '')
+        FROM survey s WHERE s.id IN :survey_ids
+    """,
+    "postgresql": """
+        INSERT INTO survey_search (survey_id, document)
+        SELECT s.id,
+               setweight(to_tsvector('simple', s.title), 'A')
+               || setweight(to_tsvector('simple', coalesce(s.description, '')), 'B')
+               || setweight(to_tsvector('simple', coalesce((SELECT string_agg(q.text, ' ') FROM question q
+                                                             WHERE q.survey_id = s.id AND NOT q.retired), '')), 'C')
+        FROM survey s WHERE s.id IN :survey_ids
+        ON CONFLICT (survey_id) DO UPDATE SET document = EXCLUDED.document
+    """,
+}
+
+_REMOVE_SQL = {
+    "sqlite": "DELETE FROM survey_search WHERE rowid IN :survey_ids",
+    "postgresql": "DELETE FROM survey_search WHERE survey_id IN :survey_ids",
+}
+
+# Matching survey ids, best first, with a rank that is lower for better matches so the results
+# of several shards can be merged. bm25 weights title > description > questions.
+_SEARCH_SQL = {
+    "sqlite": """
+        SELECT rowid AS survey_id, bm25(survey_search, 10.0, 5.0, 1.0) AS rank FROM survey_search
+        WHERE survey_search MATCH :query
+        ORDER BY rank, rowid
+        LIMIT :limit OFFSET :offset
+    """,
+    "postgresql": """
+        SELECT survey_id, -ts_rank_cd(document, to_tsquery('simple', :query)) AS rank FROM survey_search
+        WHERE document @@ to_tsquery('simple', :query)
+        ORDER BY rank, survey_id
+        LIMIT :limit OFFSET :offset
+    """,
+}
+
+_COUNT_SQL = {
+    "sqlite": "SELECT count(*) FROM survey_search WHERE survey_search MATCH :query",
+    "postgresql": "SELECT count(*) FROM survey_search WHERE document @@ to_tsquery('simple', :query)",
+}
+
+
+def build_query(dialect: str, terms: List[str]) -> str:
+    """
+    Turn search terms into the database's query syntax.
+
+    Every term must match, and the last one also matches as a prefix, so results follow the
+    admin UI's search box as it is typed into. Words are not stemmed, since a stemmed index
+    does not match most prefixes of a word.
+
+    Args:
+        dialect (str): "sqlite" or "postgresql".
+        terms (List[str]): Words of the search string.
+
+    Returns:
+        str: An FTS5 MATCH expression or a `to_tsquery` string.
+    """
+    if dialect == "sqlite":
+        # Quoted so FTS5 operators in user input are matched literally
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+class SearchService:
+    """Service class that maintains and queries the full-text index of surveys."""
+    def __init__(self, session: Session):
+        """
+        Initialize the SearchService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+        """
+        self.session = session
+
+    @property
+    def dialect(self) -> str:
+        return self.session.get_bind().dialect.name
+
+    def _execute(self, statements: Dict[str, str], survey_ids: Iterable[int]) -> None:
+        survey_ids = list(survey_ids)
+        sql = statements.get(self.dialect)
+        if not survey_ids or sql is None:
+            return
+        statement = text(sql).bindparams(bindparam("survey_ids", expanding=True))
+        self.session.execute(statement, {"survey_ids": survey_ids})
+
+    def index_surveys(self, survey_ids: Iterable[int]) -> None:
+        """
+        Rebuild the index entries of surveys from their current state (the caller commits).
+
+        Pending changes are flushed first, so this can run in the transaction that made them.
+
+        Args:
+            survey_ids (Iterable[int]): Surveys to index.
+        """
+        survey_ids = list(survey_ids)
+        self.session.flush()
+        # FTS5 tables have no upsert, so SQLite rows are deleted and inserted again
+        if self.dialect == "sqlite":
+            self._execute(_REMOVE_SQL, survey_ids)
+        self._execute(_INDEX_SQL, survey_ids)
+
+    def remove_surveys(self, survey_ids: Iterable[int]) -> None:
+        """
+        Drop the index entries of deleted surveys (the caller commits).
+
+        Args:
+            survey_ids (Iterable[int]): Surveys to remove.
+        """
+        self._execute(_REMOVE_SQL, survey_ids)
+
+    def reindex_all(self) -> int:
+        """
+        Rebuild the whole index, e.g. after a restore.
+
+        Returns:
+            int: Number of surveys indexed.
+        """
+        survey_ids = [row[0] for row in self.session.query(Survey.id)]
+        if self.dialect in SURVEY_SEARCH_DDL:
+            self.session.execute(text("DELETE FROM survey_search"))
+        self.index_surveys(survey_ids)
+        self.session.commit()
+        return len(survey_ids)
+
+    def search(self, query: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+        """
+        Rank surveys whose title, description or questions match `query`.
+
+        Args:
+            query (str): Search string; punctuation is ignored.
+            page (int): 1-based page number.
+            per_page (int): Results per page, at most `MAX_PER_PAGE`.
+
+        Returns:
+            dict: The query, paging details, total number of matches and the page of surveys.
+
+        Raises:
+            SurveyException: If the query has no words, the paging is invalid or the
+                database has no full-text index.
+        """
+        matches = self.match(query, page, per_page, (page - 1) * per_page)
+        return {
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": matches["total"],
+            "results": [survey for _, survey in matches["results"]],
+        }
+
+    def match(self, query: str, page: int, per_page: int, offset: int) -> Dict[str, Any]:
+        """
+        Find up to `per_page` ranked matches of `query`, skipping the first `offset`.
+
+        Args:
+            query (str): Search string; punctuation is ignored.
+            page (int): 1-based page number, validated with `per_page`.
+            per_page (int): Results per page, at most `MAX_PER_PAGE`.
+            offset (int): Matches skipped.
+
+        Returns:
+            dict: The total number of matches and `(rank, survey)` pairs, best (lowest rank) first.
+
+        Raises:
+            SurveyException: If the query has no words, the paging is invalid or the
+                database has no full-text index.
+        """
+        terms = re.findall(r"\w+", query or "")
+        if not terms:
+            raise SurveyException("Query parameter 'q' must contain at least one word.")
+        if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+            raise SurveyException(f"'page' must be positive and 'per_page' between 1 and {MAX_PER_PAGE}.")
+        if self.dialect not in _SEARCH_SQL:
+            raise SurveyException(f"Search is not supported on {self.dialect}", 501)
+
+        expression = build_query(self.dialect, terms)
+        limit = page * per_page - offset
+        ranked = self.session.execute(
+            text(_SEARCH_SQL[self.dialect]), {"query": expression, "limit": limit, "offset": offset}
+        ).all()
+        total = self.session.execute(text(_COUNT_SQL[self.dialect]), {"query": expression}).scalar()
+
+        survey_ids = [row.survey_id for row in ranked]
+        surveys = {survey.id: survey for survey in self.session.query(Survey).filter(Survey.id.in_(survey_ids))}
+        logger.debug("Search %r matched %s surveys", expression, total)
+        return {
+            "total": total,
+            "results": [
+                (row.rank, survey_fields_schema.dump(surveys[row.survey_id]))
+                for row in ranked if row.survey_id in surveys
+            ],
+        }
+
+    @staticmethod
+    def search_shards(fan_out: Callable[[Callable[[Session], Any]], List[Any]], query: str,
+                      page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+        """
+        Search every shard and merge their matches by rank.
+
+        Each shard returns its best `page * per_page` matches, so deep pages cost more. Ranks are
+        computed from each shard's own index statistics, so the merged order is approximate.
+
+        Args:
+            fan_out (Callable): Runs a function on a session of every shard, e.g. `ShardRouter.fan_out`.
+            query (str): Search string; punctuation is ignored.
+            page (int): 1-based page number.
+            per_page (int): Results per page, at most `MAX_PER_PAGE`.
+
+        Returns:
+            dict: Same shape as `search`.
+        """
+        matches = fan_out(lambda session: SearchService(session).match(query, page, per_page, 0))
+        ranked = heapq.merge(*(shard["results"] for shard in matches), key=lambda match: (match[0], match[1]["id"]))
+        start = (page - 1) * per_page
+        return {
+            "query": query,
+            "page": page,
+            "per_page": per_page,
+            "total": sum(shard["total"] for shard in matches),
+            "results": [survey for _, survey in itertools.islice(ranked, start, start + per_page)],
+        }
@@ -0,0 +1,414 @@
+import atexit
+import json
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from survey.models.models import Response, ResponseSketch, Survey
+from survey.services.archive_service import ArchiveService
+from survey.utils.exceptions import SurveyNotFoundError
+from survey.utils.sharding import get_shard_router
+from survey.utils.sketches import CountMinSketch, HyperLogLog, merged_estimate
+from survey.utils.utils import extract_answer, get_logger, hash_email
+
+logger = get_logger(__name__)
+
+# Questions whose answers are sketched; choice answers have exact distributions already
+SKETCHED_QUESTION_TYPES = ("text",)
+TOTAL_PERIOD = "total"
+RESPONDENTS = "respondents"
+# Longest normalized answer kept as a heavy hitter candidate
+MAX_ANSWER_LENGTH = 200
+REBUILD_BATCH_SIZE = 5000
+# Most days of daily sketches read by one request
+MAX_SKETCH_DAYS = 366
+
+INSERT_IGNORE = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+# Sketches queued in `Session.info` by `SketchService.record_after_commit`
+PENDING_SKETCHES_KEY = "pending_sketch_updates"
+
+Sketch = Union[HyperLogLog, CountMinSketch]
+# (created_at, respondent_email_hash, answers) of one response
+SketchEntry = Tuple[Optional[datetime], Optional[str], Any]
+# (period, name) -> [responses added, sketch of them]
+SketchUpdates = Dict[Tuple[str, str], List[Any]]
+
+
+def normalize_answer(value: Any) -> Optional[str]:
+    """Free-text answer as counted by the sketches: whitespace collapsed, case folded, truncated."""
+    if value is None:
+        return None
+    text = " ".join(str(value).split()).casefold()[:MAX_ANSWER_LENGTH]
+    return text or None
+
+
+def _new_sketch(name: str) -> Sketch:
+    return CountMinSketch() if name.startswith("top:") else HyperLogLog()
+
+
+def _load_sketch(name: str, data: bytes) -> Sketch:
+    return CountMinSketch.from_bytes(data) if name.startswith("top:") else HyperLogLog.from_bytes(data)
+
+
+def combine_updates(target: SketchUpdates, updates: SketchUpdates) -> None:
+    """Add `updates` into `target`, merging the sketches of rows both have."""
+    for key, (count, sketch) in updates.items():
+        pending = target.get(key)
+        if pending is None:
+            target[key] = [count, sketch]
+        else:
+            pending[0] += count
+            pending[1].merge(sketch)
+
+
+class SketchService:
+    """
+    Service class maintaining approximate statistics of survey responses.
+
+    Every response is added to HyperLogLog sketches of its respondent (in total and for its UTC
+    day) and to HyperLogLog / Count-Min sketches of each free-text answer. Submissions hand theirs
+    to the `SketchBuffer` once they commit; bulk loads and rebuilds merge in their own transaction.
+    Reads then cost a handful of rows per survey, whatever its response count. Sketches only
+    grow: deleted or edited responses stay counted until `rebuild` runs.
+    """
+    def __init__(self, session: Session):
+        """
+        Initialize the SketchService with a SQLAlchemy session.
+
+        Args:
+            session (Session): SQLAlchemy session for database operations.
+        """
+        self.session = session
+
+    @staticmethod
+    def sketched_questions(questions: Iterable[Any]) -> List[Tuple[int, str]]:
+        """Id and text of the free-text questions among ORM questions or question dicts."""
+        sketched = []
+        for question in questions:
+            if isinstance(question, dict):
+                question_id, text, kind = question["id"], question["text"], question["type"]
+            else:
+                question_id, text, kind = question.id, question.text, question.type
+            if kind in SKETCHED_QUESTION_TYPES:
+                sketched.append((question_id, text))
+        return sketched
+
+    def record(self, survey_id: int, entries: Iterable[SketchEntry], questions: Iterable[Any]) -> None:
+        """
+        Add responses to a survey's sketches (the caller commits).
+
+        The entries are sketched in memory first, so a batch costs one read and one write per
+        sketch row however many responses it holds.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            entries (Iterable): `(created_at, respondent_email_hash, answers)` per response; a
+                missing `created_at` means now.
+            questions (Iterable): The survey's questions, as ORM objects or dicts.
+        """
+        self.merge(survey_id, self.sketch(entries, questions))
+
+    def record_after_commit(self, survey_id: int, entries: Iterable[SketchEntry], questions: Iterable[Any]) -> None:
+        """
+        Add responses to a survey's sketches through the app's `SketchBuffer`, once the session commits.
+
+        The shared sketch rows are then never locked by the caller's transaction, and a rollback
+        drops the entries. Without an app context the entries are merged right away, as `record` does.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            entries (Iterable): See `record`.
+            questions (Iterable): The survey's questions, as ORM objects or dicts.
+        """
+        buffer = current_app.extensions.get("sketch_buffer") if has_app_context() else None
+        if buffer is None:
+            self.record(survey_id, entries, questions)
+            return
+        self.session.info.setdefault(PENDING_SKETCHES_KEY, []).append(
+            (buffer, survey_id, self.sketch(entries, questions))
+        )
+
+    def sketch(self, entries: Iterable[SketchEntry], questions: Iterable[Any]) -> SketchUpdates:
+        """Sketch responses in memory, per sketch row; see `record` for the arguments."""
+        sketched = self.sketched_questions(questions)
+        updates: SketchUpdates = {}
+
+        def add(period: str, name: str, value: Optional[str]) -> None:
+            update = updates.get((period, name))
+            if update is None:
+                update = updates[(period, name)] = [0, _new_sketch(name)]
+            update[0] += 1
+            if value is not None:
+                update[1].add(value)
+
+        for created_at, email_hash, answers in entries:
+            day = (created_at or datetime.now(timezone.utc)).date().isoformat()
+            for period in (TOTAL_PERIOD, day):
+                add(period, RESPONDENTS, email_hash)
+            for question_id, text in sketched:
+                answer = normalize_answer(extract_answer(answers, question_id, text))
+                if answer is not None:
+                    add(TOTAL_PERIOD, f"distinct:{question_id}", answer)
+                    add(TOTAL_PERIOD, f"top:{question_id}", answer)
+
+        return updates
+
+    def merge(self, survey_id: int, updates: SketchUpdates) -> None:
+        """Merge in-memory sketches into a survey's sketch rows (the caller commits)."""
+        # Rows are locked in a fixed order, so concurrent writers cannot deadlock
+        for (period, name), (count, sketch) in sorted(updates.items()):
+            self._merge_row(survey_id, period, name, count, sketch)
+
+    def _merge_row(self, survey_id: int, period: str, name: str, count: int, sketch: Sketch) -> None:
+        key = {"survey_id": survey_id, "period": period, "name": name}
+        row = self.session.query(ResponseSketch).filter_by(**key).with_for_update().one_or_none()
+        if row is None:
+            insert = INSERT_IGNORE.get(self.session.get_bind().dialect.name)
+            if insert is None:
+                self.session.add(ResponseSketch(**key, count=count, data=sketch.to_bytes()))
+                return
+            # A concurrent first write of the same row is merged into below instead of failing
+            inserted = self.session.execute(
+                insert(ResponseSketch).values(**key, count=count, data=sketch.to_bytes()).on_conflict_do_nothing()
+            ).rowcount
+            if inserted:
+                return
+            row = self.session.query(ResponseSketch).filter_by(**key).with_for_update().populate_existing().one()
+
+        stored = _load_sketch(name, row.data)
+        stored.merge(sketch)
+        row.data = stored.to_bytes()
+        row.count += count
+
+    def get_approximate_stats(self, survey_id: int, days: int = 30) -> Dict[str, Any]:
+        """
+        Read a survey's approximate statistics from its sketches.
+
+        Reads one row per sketch, so the cost does not depend on the number of responses.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            days (int): Number of recent UTC days reported day by day.
+
+        Returns:
+            dict: Response and unique respondent counts in total and per day, distinct and most
+            frequent free-text answers, and the error bounds of the estimates.
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+        """
+        survey = self.session.get(Survey, survey_id)
+        if survey is None:
+            raise SurveyNotFoundError(survey_id)
+
+        first_day = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+        rows = (
+            self.session.query(ResponseSketch)
+            .filter(ResponseSketch.survey_id == survey_id)
+            .filter((ResponseSketch.period == TOTAL_PERIOD) | (ResponseSketch.period >= first_day))
+            .all()
+        )
+        totals = {row.name: row for row in rows if row.period == TOTAL_PERIOD}
+        daily = sorted((row for row in rows if row.period != TOTAL_PERIOD and row.name == RESPONDENTS),
+                       key=lambda row: row.period)
+        daily_sketches = [HyperLogLog.from_bytes(row.data) for row in daily]
+
+        respondents = totals.get(RESPONDENTS)
+        hll = HyperLogLog.from_bytes(respondents.data) if respondents else HyperLogLog()
+        questions: Dict[str, Dict[str, Any]] = {}
+        for question_id, _ in self.sketched_questions(survey.questions):
+            distinct, top = totals.get(f"distinct:{question_id}"), totals.get(f"top:{question_id}")
+            cms = CountMinSketch.from_bytes(top.data) if top else CountMinSketch()
+            questions[str(question_id)] = {
+                "answers": distinct.count if distinct else 0,
+                "distinct_answers": HyperLogLog.from_bytes(distinct.data).estimate() if distinct else 0,
+                "top_answers": [{"answer": answer, "count": count} for answer, count in cms.heavy_hitters()],
+                # Each top answer count is at most this much too high, with the stated confidence
+                "top_answers_max_overcount": math.ceil(cms.epsilon * cms.total),
+            }
+
+        return {
+            "survey_id": survey_id,
+            "title": survey.title,
+            "approximate": True,
+            "total_responses": respondents.count if respondents else 0,
+            "unique_respondents": hll.estimate(),
+            "daily": [
+                {"day": row.period, "responses": row.count, "unique_respondents": sketch.estimate()}
+                for row, sketch in zip(daily, daily_sketches)
+            ],
+            "recent": {"days": days, "unique_respondents": merged_estimate(daily_sketches)},
+            "questions": questions,
+            "error_bounds": {
+                # One standard error; about 95% of estimates are within twice this
+                "unique_relative_error": round(hll.relative_error, 4),
+                "top_answers_confidence": round(1 - CountMinSketch().delta, 4),
+            },
+        }
+
+    def rebuild(self, survey_id: int, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+        """
+        Recompute a survey's sketches from its live and archived responses (the caller commits).
+
+        Submissions still buffered by a `SketchBuffer` are merged on top when it next flushes.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            batch_size (int): Responses read and sketched at a time.
+
+        Returns:
+            int: Number of responses sketched.
+        """
+        survey = self.session.get(Survey, survey_id)
+        if survey is None:
+            raise SurveyNotFoundError(survey_id)
+        questions = [{"id": q.id, "text": q.text, "type": q.type} for q in survey.questions]
+        self.session.query(ResponseSketch).filter(ResponseSketch.survey_id == survey_id).delete()
+
+        count = 0
+        archive = ArchiveService(self.session)
+        if archive.archived_count(survey_id):
+            for batch in archive.store.batches(survey_id):
+                columns = batch.to_pydict()
+                entries = [
+                    (created_at, hash_email(email), json.loads(answers))
+                    for created_at, email, answers in zip(
+                        columns["created_at"], columns["respondent_email"], columns["answers"],
+                    )
+                ]
+                self.record(survey_id, entries, questions)
+                count += len(entries)
+
+        last_id = 0
+        while True:
+            rows = (
+                self.session.query(Response.id, Response.created_at, Response.respondent_email_hash, Response.answers)
+                .filter(Response.survey_id == survey_id, Response.id > last_id)
+                .order_by(Response.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            self.record(survey_id, [(row.created_at, row.respondent_email_hash, row.answers) for row in rows], questions)
+            count += len(rows)
+        logger.info("Rebuilt sketches of survey id=%s from %s responses", survey_id, count)
+        return count
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_committed_sketches(session: Session) -> None:
+    for buffer, survey_id, updates in session.info.pop(PENDING_SKETCHES_KEY, ()):
+        buffer.add(survey_id, updates)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_sketches(session: Session) -> None:
+    session.info.pop(PENDING_SKETCHES_KEY, None)
+
+
+class SketchBuffer:
+    """
+    Merges the sketches of submitted responses into `response_sketch` in the background.
+
+    Submissions sketch their response in memory and hand it over once their transaction commits
+    (`SketchService.record_after_commit`). A flusher thread merges what each survey accumulated
+    every `SKETCH_FLUSH_INTERVAL` seconds, in one short transaction per survey, so submissions
+    never wait on the sketch rows every other submission of the survey updates. A failed merge
+    is retried on the next flush; what a process had not merged when it died is only counted
+    again by `flask survey rebuild-sketches`.
+
+    The thread starts with the first submission, so the app can be created before gunicorn forks.
+    """
+    def __init__(self, app: Optional[Flask] = None):
+        self.app = app
+        self.interval = 1.0
+        self._pending: Dict[int, SketchUpdates] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the buffer on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["sketch_buffer"] = self
+        self.app = app
+        self.interval = app.config.get("SKETCH_FLUSH_INTERVAL", 1.0)
+        os.register_at_fork(after_in_child=self._after_fork)
+        atexit.register(self._flush_at_exit)
+
+    def _after_fork(self) -> None:
+        # Threads are not inherited, and the parent merges what it buffered itself
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}
+        self._started = False
+
+    def add(self, survey_id: int, updates: SketchUpdates) -> None:
+        """Queue the sketches of committed responses for the next flush."""
+        with self._lock:
+            combine_updates(self._pending.setdefault(survey_id, {}), updates)
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._flush_loop, name="sketch-buffer-flush", daemon=True).start()
+
+    def flush(self) -> int:
+        """
+        Merge the buffered sketches of every survey into its rows.
+
+        Returns:
+            int: Number of surveys merged.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        merged = 0
+        with self.app.app_context():
+            router = get_shard_router()
+            for survey_id, updates in pending.items():
+                def merge(session: Session, survey_id: int = survey_id, updates: SketchUpdates = updates) -> bool:
+                    # Sketches of a survey deleted since are dropped
+                    if session.get(Survey, survey_id) is None:
+                        return False
+                    SketchService(session).merge(survey_id, updates)
+                    session.commit()
+                    return True
+
+                try:
+                    merged += router.write(survey_id, merge)
+                except Exception:
+                    logger.exception("Merging buffered sketches of survey id=%s failed; retrying later", survey_id)
+                    self.add(survey_id, updates)
+        return merged
+
+    def _flush_loop(self) -> None:
+        while True:
+            # Not time.sleep(), which tests of slow paths patch out
+            self._wakeup.wait(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Sketch buffer flush failed")
+
+    def _flush_at_exit(self) -> None:
+        if not self._pending:
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Sketch buffer flush at exit failed")
@@ -1,15 +1,54 @@
 import csv
 import ast
+import json
 from io import TextIOWrapper
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from survey.models.models import Survey, Question, Response
-from survey.utils.exceptions import SurveyNotFoundError
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from survey.models.models import (
+    Survey, SurveySchema, SurveyVersion, SurveyVersionQuestion, Question, Response, ResponseArchive,
+    ResponseSketch, ArchivedRespondent,
+    fieldset_schema, questions_schema, response_schema, survey_fields_schema,
+)
+from survey.services.archive_service import ArchiveService
+from survey.services.outbox_service import OutboxService
+from survey.services.search_service import SearchService
+from survey.services.sketch_service import SketchService
+from survey.utils.cache import LRUCache
+from survey.utils.compression import CachedBody
+from survey.utils.exceptions import SurveyException, SurveyNotFoundError
+from survey.utils.snapshots import SnapshotStore
 from datetime import datetime, timezone
-from survey.tasks.schedule_publish import publish_survey_task
-from survey.utils.utils import convert_to_utc, get_logger
-
-logger = get_logger()
+from survey.celery_worker import PUBLISH_SURVEY_TASK
+from survey.utils.utils import convert_to_utc, get_logger, hash_email
+
+logger = get_logger(__name__)
+
+BULK_ACTIONS = ("publish", "unpublish", "schedule", "delete", "retitle")
+BULK_FILTERS = ("published", "scheduled", "title_contains", "created_before", "created_after")
+MAX_BULK_SURVEYS = 1000
+
+QUESTION_FIELDS = ("text", "type", "options", "required", "order")
+# Survey columns selectable with `?fields=`; questions are only loaded with `?include=questions`
+SURVEY_FIELDS = tuple(survey_fields_schema.fields)
+SURVEY_INCLUDES = ("questions",)
+# (survey_id, version) -> serialized definition. Versions are immutable, so entries never go stale.
+_survey_version_cache = LRUCache(maxsize=1024)
+# Serialized bodies of version definitions and survey documents, with their compressed variants.
+# Document keys include every survey field, so an edited survey simply misses the cache.
+_survey_body_cache = LRUCache(maxsize=1024)
+
+
+def _question_key(data: Dict[str, Any]) -> tuple:
+    """Identify a question by its content, so unchanged questions are shared between versions."""
+    return (
+        data.get("text"),
+        data.get("type"),
+        json.dumps(data.get("options"), sort_keys=True),
+        bool(data.get("required", False)),
+        data.get("order") or 0,
+    )
 
 class SurveyService:
     """Service class that handles business logic related to surveys, questions, and responses."""
@@ -22,7 +61,8 @@ class SurveyService:
         """
         self.session = session
 
-    def create_survey(self, data: Dict[str, Any], questions_data: List[Dict[str, Any]]) -> Survey:
+    def create_survey(self, data: Dict[str, Any], questions_data: List[Dict[str, Any]],
+                      survey_id: Optional[int] = None) -> Survey:
         """
         Create a new survey with associated questions.
 
@@ -33,6 +73,7 @@ class SurveyService:
         Args:
             data (dict): Survey data including title, description, published flag, etc.
             questions_data (List[dict]): List of question data dictionaries.
+            survey_id (int, optional): Id allocated by the shard directory; assigned by the database when None.
 
         Returns:
             Survey: The created Survey object.
@@ -49,11 +90,19 @@ class SurveyService:
             # If published is False and no scheduled_time, keep both
             data["scheduled_time"] = None
             logger.debug("Survey is not published and no scheduled_time provided; setting scheduled_time to None")
+        else:
+            # Stored in UTC, like bulk scheduling, so the publish task can tell whether it is still current
+            scheduled_time_utc = convert_to_utc(scheduled_time_str, timezone_name)
+            data["scheduled_time"] = scheduled_time_utc.replace(tzinfo=None)
 
-        survey = Survey(**data)
+        data.pop("version", None)
+        if survey_id is not None:
+            data["id"] = survey_id
+        survey = Survey(version=1, **data)
         self.session.add(survey)
         self.session.flush()
 
+        questions = []
         for q_data in questions_data:
             question = Question(
                 survey_id=survey.id,
@@ -64,20 +113,26 @@ class SurveyService:
                 order=q_data.get("order", 0),
             )
             self.session.add(question)
+            questions.append(question)
+        self._record_version(survey, questions)
+        SearchService(self.session).index_surveys([survey.id])
 
-        self.session.commit()
-        self.session.refresh(survey)
         if not published and scheduled_time_str:
-            scheduled_time_utc = convert_to_utc(scheduled_time_str, timezone_name)
             delay = (scheduled_time_utc - datetime.now().replace(tzinfo=timezone.utc)).total_seconds()
             if delay > 0:
-                publish_survey_task.apply_async(args=[survey.id], countdown=delay)
-                logger.info(f"Survey id={survey.id} scheduled for publishing in {delay} seconds (UTC time: {scheduled_time_utc})")
+                # Sent by the outbox relay once this transaction commits
+                OutboxService(self.session).enqueue(
+                    PUBLISH_SURVEY_TASK, args=[survey.id, survey.scheduled_time.isoformat()], countdown=delay,
+                )
+                logger.info("Survey id=%s scheduled for publishing in %s seconds (UTC time: %s)", survey.id, delay, scheduled_time_utc)
             else:
-                logger.warning(f"Scheduled time for survey id={survey.id} is in the past; skipping scheduling and and publishing it")
+                logger.warning("Scheduled time for survey id=%s is in the past; skipping scheduling and and publishing it", survey.id)
                 survey.published = True
                 survey.scheduled_time = None
-                self.session.commit()
+
+        self.session.commit()
+        self.session.refresh(survey)
+        self.refresh_snapshots([survey.id])
         return survey
 
     def get_survey(self, survey_id: int) -> Survey:
@@ -95,10 +150,268 @@ class SurveyService:
         """
         survey = self.session.query(Survey).filter(Survey.id == survey_id).first()
         if not survey:
-            logger.warning(f"Survey not found for id={survey_id}")
+            logger.warning("Survey not found for id=%s", survey_id)
             raise SurveyNotFoundError(survey_id)
         return survey
 
+    def _set_unique_respondents(self, survey_id: int, enabled: bool) -> None:
+        """
+        Mark the first response of each email as unique when dedupe is turned on, or unmark all.
+
+        Later duplicates that already exist stay unmarked, so enabling dedupe never fails.
+        """
+        if not enabled:
+            self.session.query(Response).filter(Response.survey_id == survey_id).update(
+                {Response.unique_respondent: False}, synchronize_session=False
+            )
+            return
+        first_responses = (
+            select(func.min(Response.id))
+            .where(Response.survey_id == survey_id, Response.respondent_email_hash.isnot(None))
+            .group_by(Response.respondent_email_hash)
+        )
+        self.session.query(Response).filter(Response.id.in_(first_responses)).update(
+            {Response.unique_respondent: True}, synchronize_session=False
+        )
+
+    def _record_version(self, survey: Survey, questions: List[Question]) -> None:
+        """Write the immutable definition of `survey` at its current version (the caller commits)."""
+        self.session.flush()
+        self.session.add(SurveyVersion(
+            survey_id=survey.id, version=survey.version, title=survey.title, description=survey.description,
+        ))
+        self.session.flush()
+        self.session.add_all(
+            SurveyVersionQuestion(survey_id=survey.id, version=survey.version, question_id=question.id)
+            for question in questions
+        )
+
+    def get_survey_version(self, survey_id: int, version: int) -> Dict[str, Any]:
+        """
+        Return the frozen definition of a survey version.
+
+        Definitions never change once written, so they are cached by `(survey_id, version)`
+        without invalidation.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            version (int): The version number.
+
+        Returns:
+            dict: Title, description and questions of the version.
+
+        Raises:
+            SurveyException: If the version does not exist.
+        """
+        cached = _survey_version_cache.get((survey_id, version))
+        if cached is not None:
+            return cached
+
+        record = self.session.get(SurveyVersion, (survey_id, version))
+        if record is None:
+            raise SurveyException(f"Version {version} of survey {survey_id} not found", 404)
+        questions = (
+            self.session.query(Question)
+            .join(SurveyVersionQuestion, SurveyVersionQuestion.question_id == Question.id)
+            .filter(SurveyVersionQuestion.survey_id == survey_id, SurveyVersionQuestion.version == version)
+            .order_by(Question.order, Question.id)
+            .all()
+        )
+        definition = {
+            "survey_id": survey_id,
+            "version": version,
+            "title": record.title,
+            "description": record.description,
+            "questions": questions_schema.dump(questions),
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+        }
+        _survey_version_cache.set((survey_id, version), definition)
+        return definition
+
+    def get_survey_document(self, survey_id: int) -> Dict[str, Any]:
+        """
+        Serialize a survey like `survey_schema.dump`, with its questions read from the version cache.
+
+        Only the survey row is queried; questions are loaded once per version.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            dict: The serialized survey.
+        """
+        survey = self.get_survey(survey_id)
+        definition = self.get_survey_version(survey_id, survey.version)
+        return {"questions": definition["questions"], **survey_fields_schema.dump(survey)}
+
+    def get_survey_version_body(self, survey_id: int, version: int) -> CachedBody:
+        """
+        Return the serialized definition of a survey version, cached like the definition itself.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            version (int): The version number.
+
+        Returns:
+            CachedBody: The JSON body and its compressed variants.
+        """
+        key = ("version", survey_id, version)
+        body = _survey_body_cache.get(key)
+        if body is None:
+            body = CachedBody.from_json(self.get_survey_version(survey_id, version))
+            _survey_body_cache.set(key, body)
+        return body
+
+    def get_survey_document_body(self, survey_id: int) -> CachedBody:
+        """
+        Return the serialized `get_survey_document` of a survey.
+
+        Only the survey row is queried. Questions are neither serialized nor compressed again
+        until the survey changes.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            CachedBody: The JSON body and its compressed variants.
+        """
+        survey = self.get_survey(survey_id)
+        fields = survey_fields_schema.dump(survey)
+        key = ("survey", survey_id, tuple(sorted(fields.items())))
+        body = _survey_body_cache.get(key)
+        if body is None:
+            definition = self.get_survey_version(survey_id, survey.version)
+            body = CachedBody.from_json({"questions": definition["questions"], **fields})
+            _survey_body_cache.set(key, body)
+        return body
+
+    def refresh_snapshots(self, survey_ids: List[int]) -> None:
+        """
+        Bring the static snapshots of surveys in line with their committed state.
+
+        Published surveys are rendered to a new snapshot; unpublished and deleted ones lose
+        theirs. Does nothing unless `SNAPSHOT_DIR` is set. A snapshot that cannot be written is
+        removed instead, so a stale definition is never served.
+
+        Args:
+            survey_ids (List[int]): Surveys changed by the last commit.
+        """
+        store = SnapshotStore.from_app()
+        if store is None or not survey_ids:
+            return
+        published = {
+            survey.id for survey in self.session.query(Survey).filter(Survey.id.in_(survey_ids))
+            if survey.published
+        }
+        for survey_id in survey_ids:
+            if survey_id not in published:
+                store.remove(survey_id)
+                continue
+            try:
+                store.write(survey_id, self.get_survey_document_body(survey_id))
+            except OSError:
+                logger.exception("Could not write the snapshot of survey id=%s", survey_id)
+                store.remove(survey_id)
+
+    def list_survey_versions(self, survey_id: int) -> List[Dict[str, Any]]:
+        """
+        List the versions of a survey, oldest first.
+
+        Args:
+            survey_id (int): The ID of the survey.
+
+        Returns:
+            List[dict]: Version number, title and creation time of each version.
+        """
+        self.get_survey(survey_id)
+        records = (
+            self.session.query(SurveyVersion)
+            .filter(SurveyVersion.survey_id == survey_id)
+            .order_by(SurveyVersion.version)
+        )
+        return [
+            {
+                "version": record.version,
+                "title": record.title,
+                "created_at": record.created_at.isoformat() if record.created_at else None,
+            }
+            for record in records
+        ]
+
+    def submit_response(self, survey_id: int, data: Dict[str, Any]) -> Response:
+        """
+        Validate and store a new response for a survey.
+
+        Args:
+            survey_id (int): The ID of the survey being answered.
+            data (dict): Response payload, including `answers` and optional `respondent_email`.
+
+        Returns:
+            Response: The created Response object.
+
+        Raises:
+            SurveyNotFoundError: If the survey with the given ID does not exist.
+            ValidationError: If the payload does not match the response schema.
+            SurveyException: With status 409 if the survey dedupes respondents and this email
+                has already answered.
+        """
+        survey = self.get_survey(survey_id)
+
+        response = response_schema.load(data, session=self.session)
+        response.survey_id = survey_id
+        response.survey_version = survey.version
+        # Duplicates are rejected by the partial unique index, without reading earlier responses;
+        # respondents whose response was archived are kept in `archived_respondent`
+        response.unique_respondent = bool(survey.dedupe_respondents and response.respondent_email_hash)
+        if response.unique_respondent and ArchiveService(self.session).has_archived_respondent(
+                survey_id, response.respondent_email_hash):
+            logger.info("Duplicate response to survey id=%s rejected", survey_id)
+            raise SurveyException("This respondent has already answered the survey", 409)
+        self.session.add(response)
+        try:
+            # Merged into the shared sketch rows by the app's SketchBuffer once this commits
+            SketchService(self.session).record_after_commit(
+                survey_id, [(None, response.respondent_email_hash, response.answers)],
+                self.get_survey_version(survey_id, survey.version)["questions"],
+            )
+            self.session.commit()
+        except IntegrityError as e:
+            self.session.rollback()
+            # SQLite names the columns, Postgres the index
+            message = str(e.orig)
+            if response.unique_respondent and (
+                "respondent_email_hash" in message or "uq_response_survey_id_unique_respondent" in message
+            ):
+                logger.info("Duplicate response to survey id=%s rejected", survey_id)
+                raise SurveyException("This respondent has already answered the survey", 409)
+            raise
+        return response
+
+    def has_responded(self, survey_id: int, email: str) -> bool:
+        """
+        Check whether an email address has answered a survey, including archived responses.
+
+        Live responses are found through the `(survey_id, respondent_email_hash)` index, archived
+        ones through `archived_respondent`.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            email (str): The respondent's email; case and surrounding spaces are ignored.
+
+        Returns:
+            bool: True if a response from this email exists.
+        """
+        self.get_survey(survey_id)
+        email_hash = hash_email(email)
+        if email_hash is None:
+            return False
+        answered = self.session.query(
+            self.session.query(Response.id)
+            .filter(Response.survey_id == survey_id, Response.respondent_email_hash == email_hash)
+            .exists()
+        ).scalar()
+        return answered or ArchiveService(self.session).has_archived_respondent(survey_id, email_hash)
+
     def get_all_surveys(self) -> List[Survey]:
         """
         Retrieve all surveys from the database.
@@ -108,12 +421,85 @@ class SurveyService:
         """
         return self.session.query(Survey).all()
 
+    def list_surveys(self, fields: Optional[List[str]] = None, include_questions: bool = True) -> List[Dict[str, Any]]:
+        """
+        Serialize all surveys, selecting only the requested columns.
+
+        Questions of all listed surveys are read with one query, and not at all when
+        `include_questions` is False.
+
+        Args:
+            fields (List[str], optional): Columns from `SURVEY_FIELDS`; all of them when None.
+            include_questions (bool): Add each survey's current questions.
+
+        Returns:
+            List[dict]: Serialized surveys in id order.
+        """
+        fields = tuple(fields or SURVEY_FIELDS)
+        selected = dict.fromkeys(("id",) + fields)
+        rows = self.session.execute(
+            select(*(getattr(Survey, name) for name in selected)).order_by(Survey.id)
+        ).all()
+        documents = fieldset_schema(SurveySchema, fields, many=True).dump([row._mapping for row in rows])
+        if include_questions:
+            questions = self._current_questions()
+            for row, document in zip(rows, documents):
+                document["questions"] = questions.get(row.id, [])
+        return documents
+
+    def get_survey_fields(self, survey_id: int, fields: Optional[List[str]] = None,
+                          include_questions: bool = True) -> Dict[str, Any]:
+        """
+        Serialize one survey, selecting only the requested columns.
+
+        Questions come from the version cache, like `get_survey_document`.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            fields (List[str], optional): Columns from `SURVEY_FIELDS`; all of them when None.
+            include_questions (bool): Add the survey's current questions.
+
+        Returns:
+            dict: The serialized survey.
+
+        Raises:
+            SurveyNotFoundError: If the survey does not exist.
+        """
+        fields = tuple(fields or SURVEY_FIELDS)
+        selected = dict.fromkeys(("version",) + fields)
+        row = self.session.execute(
+            select(*(getattr(Survey, name) for name in selected)).where(Survey.id == survey_id)
+        ).first()
+        if row is None:
+            logger.warning("Survey not found for id=%s", survey_id)
+            raise SurveyNotFoundError(survey_id)
+        document = fieldset_schema(SurveySchema, fields).dump(row._mapping)
+        if include_questions:
+            document["questions"] = self.get_survey_version(survey_id, row.version)["questions"]
+        return document
+
+    def _current_questions(self) -> Dict[int, List[Dict[str, Any]]]:
+        """Serialized current questions of every survey, by survey id, in display order."""
+        questions = self.session.execute(
+            select(Question)
+            .where(Question.retired == False)
+            .order_by(Question.survey_id, Question.order, Question.id)
+            # The schema dumps `survey` as its id; load just the ids instead of one query per question
+            .options(selectinload(Question.survey).load_only(Survey.id))
+        ).scalars().all()
+        by_survey: Dict[int, List[Dict[str, Any]]] = {}
+        for question, document in zip(questions, questions_schema.dump(questions)):
+            by_survey.setdefault(question.survey_id, []).append(document)
+        return by_survey
+
     def update_survey(self, survey_id: int, data: Dict[str, Any], questions_data: List[Dict[str, Any]]) -> Survey:
         """
         Update a survey and replace its questions.
 
         If the survey is unpublished and `scheduled_time` is provided, it will be scheduled.
-        All existing questions will be deleted and replaced with the new ones.
+        Questions are copy-on-write: unchanged questions are kept, changed and removed ones are
+        retired, and new rows are added. If the title, description or questions changed, a new
+        version is recorded; older versions keep their own questions.
 
         Args:
             survey_id (int): The ID of the survey to update.
@@ -133,30 +519,44 @@ class SurveyService:
             survey.scheduled_time = None
         elif not published and scheduled_time_str:
             survey.published = False
-            survey.scheduled_time = scheduled_time_str
             scheduled_time_utc = convert_to_utc(scheduled_time_str, timezone_name)
+            survey.scheduled_time = scheduled_time_utc.replace(tzinfo=None)
             delay = (scheduled_time_utc - datetime.now().replace(tzinfo=timezone.utc)).total_seconds()
             if delay > 0:
-                publish_survey_task.apply_async(args=[survey.id], countdown=delay)
-                logger.info(f"Survey id={survey.id} scheduled for publishing in {delay} seconds (UTC time: {scheduled_time_utc})")
+                OutboxService(self.session).enqueue(
+                    PUBLISH_SURVEY_TASK, args=[survey.id, survey.scheduled_time.isoformat()], countdown=delay,
+                )
+                logger.info("Survey id=%s scheduled for publishing in %s seconds (UTC time: %s)", survey.id, delay, scheduled_time_utc)
             else:
-                logger.info(f"Scheduled time for survey id={survey.id} is in the past; skipping scheduling and publishing it")
+                logger.info("Scheduled time for survey id=%s is in the past; skipping scheduling and publishing it", survey.id)
                 survey.published = True
                 survey.scheduled_time = None
         else:
             survey.published = False
             survey.scheduled_time = None
 
-        # Update survey fields
+        # Update survey fields; the version is only ever bumped below, and publishing was settled above
+        for key in ("version", "published", "scheduled_time"):
+            data.pop(key, None)
+        previous_definition = (survey.title, survey.description)
+        previous_dedupe = bool(survey.dedupe_respondents)
         for key, value in data.items():
             if hasattr(survey, key):
                 setattr(survey, key, value)
-
-        # Delete old questions
-        self.session.query(Question).filter(Question.survey_id == survey.id).delete()
-
-        # Add new questions
+        if bool(survey.dedupe_respondents) != previous_dedupe:
+            self._set_unique_respondents(survey.id, bool(survey.dedupe_respondents))
+
+        # Keep unchanged questions, add new rows for changed ones
+        available: Dict[tuple, List[Question]] = {}
+        for question in survey.questions:
+            available.setdefault(_question_key({field: getattr(question, field) for field in QUESTION_FIELDS}), []).append(question)
+        questions = []
+        added = False
         for q_data in questions_data:
+            matches = available.get(_question_key(q_data))
+            if matches:
+                questions.append(matches.pop(0))
+                continue
             question = Question(
                 survey_id=survey.id,
                 text=q_data.get("text"),
@@ -166,8 +566,22 @@ class SurveyService:
                 order=q_data.get("order", 0),
             )
             self.session.add(question)
+            questions.append(question)
+            added = True
+
+        # Questions left over are retired: older versions still reference them
+        retired = [question for matches in available.values() for question in matches]
+        for question in retired:
+            question.retired = True
+
+        if added or retired or previous_definition != (survey.title, survey.description):
+            survey.version += 1
+            self._record_version(survey, questions)
+            logger.info("Survey id=%s is now at version %s", survey.id, survey.version)
+            SearchService(self.session).index_surveys([survey.id])
 
         self.session.commit()
+        self.refresh_snapshots([survey.id])
         return survey
 
     def delete_survey(self, survey_id: int) -> None:
@@ -179,19 +593,209 @@ class SurveyService:
         """
         survey = self.get_survey(survey_id)
         
-        # Delete related questions and responses
+        # Delete versions, related questions and responses, including archived ones
+        self.session.query(SurveyVersionQuestion).filter(SurveyVersionQuestion.survey_id == survey.id).delete()
+        self.session.query(SurveyVersion).filter(SurveyVersion.survey_id == survey.id).delete()
         self.session.query(Question).filter(Question.survey_id == survey.id).delete()
         self.session.query(Response).filter(Response.survey_id == survey.id).delete()
+        self.session.query(ResponseSketch).filter(ResponseSketch.survey_id == survey.id).delete()
+        ArchiveService(self.session).delete_archive(survey.id)
+        SearchService(self.session).remove_surveys([survey.id])
         
         self.session.delete(survey)
-        logger.info(f"Deleted survey object with id={survey_id}")
+        logger.info("Deleted survey object with id=%s", survey_id)
         self.session.commit()
+        self.refresh_snapshots([survey_id])
+
+    def bulk_update(self, action: str, survey_ids: Optional[List[int]] = None,
+                    filters: Optional[Dict[str, Any]] = None,
+                    params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Apply one action to many surveys with a single set-based UPDATE or DELETE.
+
+        Surveys are selected by `survey_ids` or, when no ids are given, by `filters`. Questions
+        are never reloaded: `delete` removes questions, responses and archives with one DELETE
+        per table, and "retitle" records the new versions with two INSERT ... SELECT statements.
+        Pending publish tasks are not revoked; `publish_survey_task` skips surveys
+        that were published, unscheduled or rescheduled since the task was sent.
+
+        Args:
+            action (str): One of `BULK_ACTIONS`.
+            survey_ids (List[int], optional): Surveys to act on.
+            filters (dict, optional): Any of `BULK_FILTERS`, used when `survey_ids` is empty.
+            params (dict, optional): `title` for "retitle" ("{title}" stands for the current title),
+                `scheduled_time` and `timezone` for "schedule".
+
+        Returns:
+            dict: The action, the affected survey ids and a per-survey outcome.
+
+        Raises:
+            SurveyException: If the action, selection or parameters are invalid.
+        """
+        if action not in BULK_ACTIONS:
+            raise SurveyException(f"Unknown action '{action}', expected one of {', '.join(BULK_ACTIONS)}")
+        params = params or {}
+        criteria = self._bulk_criteria(survey_ids, filters)
+
+        scheduled_time_utc = None
+        if action == "delete":
+            affected = self._bulk_delete(criteria)
+            status = "deleted"
+        else:
+            values, status = self._bulk_values(action, params)
+            if action == "schedule" and "scheduled_time" in values:
+                scheduled_time_utc = values["scheduled_time"]
+            statement = (
+                update(Survey).where(*criteria).values(**values)
+                .returning(Survey.id)
+                .execution_options(synchronize_session=False)
+            )
+            affected = sorted(self.session.execute(statement).scalars())
+            if action == "retitle" and affected:
+                self._bulk_record_versions(affected)
+                SearchService(self.session).index_surveys(affected)
+            if scheduled_time_utc is not None and affected:
+                delay = (scheduled_time_utc.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+                OutboxService(self.session).enqueue_many(
+                    PUBLISH_SURVEY_TASK,
+                    [[survey_id, scheduled_time_utc.isoformat()] for survey_id in affected],
+                    countdown=delay,
+                )
+        self.session.commit()
+        self.refresh_snapshots(affected)
+
+        logger.info("Bulk %s affected %s surveys", action, len(affected))
+        found = set(affected)
+        requested = survey_ids if survey_ids else affected
+        return {
+            "action": action,
+            "affected": affected,
+            "results": [
+                {"id": survey_id, "status": status if survey_id in found else "not_found"}
+                for survey_id in requested
+            ],
+        }
+
+    @staticmethod
+    def check_bulk_ids(survey_ids: Any) -> None:
+        """Reject an `ids` selection that is not a list of at most `MAX_BULK_SURVEYS` survey ids."""
+        # JSON true/false load as bool, a subclass of int
+        if not isinstance(survey_ids, list) or not all(type(survey_id) is int for survey_id in survey_ids):
+            raise SurveyException("'ids' must be a list of survey ids")
+        if len(survey_ids) > MAX_BULK_SURVEYS:
+            raise SurveyException(f"At most {MAX_BULK_SURVEYS} surveys can be changed at once")
+
+    @staticmethod
+    def merge_bulk_results(results: List[Dict[str, Any]], survey_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Combine the `bulk_update` results of several shards into one.
+
+        Args:
+            results (List[dict]): Per-shard results of the same action.
+            survey_ids (List[int], optional): The requested ids, whose order the outcomes follow.
+
+        Returns:
+            dict: The action, the affected survey ids and a per-survey outcome.
+        """
+        affected = sorted(survey_id for result in results for survey_id in result["affected"])
+        statuses = {entry["id"]: entry["status"] for result in results for entry in result["results"]}
+        return {
+            "action": results[0]["action"],
+            "affected": affected,
+            "results": [
+                {"id": survey_id, "status": statuses.get(survey_id, "not_found")}
+                for survey_id in (survey_ids if survey_ids else affected)
+            ],
+        }
+
+    def _bulk_criteria(self, survey_ids: Optional[List[int]], filters: Optional[Dict[str, Any]]) -> list:
+        if survey_ids:
+            self.check_bulk_ids(survey_ids)
+            return [Survey.id.in_(survey_ids)]
+        if not filters:
+            raise SurveyException("Provide a non-empty 'ids' list or a 'filter'")
+
+        unknown = set(filters) - set(BULK_FILTERS)
+        if unknown:
+            raise SurveyException(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        criteria = []
+        if "published" in filters:
+            criteria.append(Survey.published.is_(bool(filters["published"])))
+        if "scheduled" in filters:
+            scheduled = Survey.scheduled_time.isnot(None)
+            criteria.append(scheduled if filters["scheduled"] else ~scheduled)
+        if filters.get("title_contains"):
+            criteria.append(Survey.title.contains(filters["title_contains"], autoescape=True))
+        if filters.get("created_before"):
+            criteria.append(Survey.created_at < convert_to_utc(filters["created_before"]).replace(tzinfo=None))
+        if filters.get("created_after"):
+            criteria.append(Survey.created_at >= convert_to_utc(filters["created_after"]).replace(tzinfo=None))
+        return criteria
+
+    def _bulk_values(self, action: str, params: Dict[str, Any]) -> tuple:
+        if action == "publish":
+            return {"published": True, "scheduled_time": None}, "published"
+        if action == "unpublish":
+            return {"published": False, "scheduled_time": None}, "unpublished"
+        if action == "retitle":
+            title = params.get("title")
+            if not title:
+                raise SurveyException("'title' is required to retitle surveys")
+            if "{title}" not in title:
+                return {"title": title[:200], "version": Survey.version + 1}, "retitled"
+            prefix, _, suffix = title.partition("{title}")
+            # Computed in SQL so every row keeps its own title; truncated to the column length
+            new_title = func.substr(literal(prefix) + Survey.title + literal(suffix), 1, 200)
+            return {"title": new_title, "version": Survey.version + 1}, "retitled"
+
+        scheduled_time_str = params.get("scheduled_time")
+        if not scheduled_time_str:
+            raise SurveyException("'scheduled_time' is required to schedule surveys")
+        scheduled_time_utc = convert_to_utc(scheduled_time_str, params.get("timezone") or "UTC")
+        if scheduled_time_utc <= datetime.now(timezone.utc):
+            logger.info("Bulk scheduled time %s is in the past; publishing instead", scheduled_time_utc)
+            return {"published": True, "scheduled_time": None}, "published"
+        return {"published": False, "scheduled_time": scheduled_time_utc.replace(tzinfo=None)}, "scheduled"
+
+    def _bulk_record_versions(self, survey_ids: List[int]) -> None:
+        """Record the new version of retitled surveys, sharing the questions of the previous one."""
+        self.session.execute(insert(SurveyVersion).from_select(
+            ["survey_id", "version", "title", "description"],
+            select(Survey.id, Survey.version, Survey.title, Survey.description).where(Survey.id.in_(survey_ids)),
+        ))
+        previous = SurveyVersionQuestion
+        self.session.execute(insert(SurveyVersionQuestion).from_select(
+            ["survey_id", "version", "question_id"],
+            select(previous.survey_id, previous.version + 1, previous.question_id)
+            .join(Survey, Survey.id == previous.survey_id)
+            .where(Survey.id.in_(survey_ids), previous.version == Survey.version - 1),
+        ))
+
+    def _bulk_delete(self, criteria: list) -> List[int]:
+        selected = select(Survey.id).where(*criteria)
+        for model in (SurveyVersionQuestion, SurveyVersion, Question, Response, ResponseSketch, ArchivedRespondent):
+            self.session.execute(
+                delete(model).where(model.survey_id.in_(selected)).execution_options(synchronize_session=False)
+            )
+        archived = self.session.execute(
+            delete(ResponseArchive).where(ResponseArchive.survey_id.in_(selected))
+            .returning(ResponseArchive.survey_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        affected = sorted(self.session.execute(
+            delete(Survey).where(*criteria).returning(Survey.id).execution_options(synchronize_session=False)
+        ).scalars())
+        SearchService(self.session).remove_surveys(affected)
+        if archived:
+            ArchiveService(self.session).delete_files_after_commit(archived)
+        return affected
 
     def get_survey_stats(self, survey_id: int) -> Dict[str, Any]:
         """
         Retrieve statistics for a single survey.
 
         Statistics include total number of questions, responses, and creation time.
+        Archived responses are included in the response total.
 
         Args:
             survey_id (int): The ID of the survey.
@@ -202,12 +806,14 @@ class SurveyService:
         survey = self.get_survey(survey_id)
         
         response_count = self.session.query(Response).filter(Response.survey_id == survey_id).count()
-        question_count = self.session.query(Question).filter(Question.survey_id == survey_id).count()
+        question_count = self.session.query(Question).filter(Question.survey_id == survey_id, Question.retired == False).count()
+        archived_count = ArchiveService(self.session).archived_count(survey_id)
         
         return {
             'survey_id': survey_id,
             'title': survey.title,
-            'total_responses': response_count,
+            'total_responses': response_count + archived_count,
+            'archived_responses': archived_count,
             'total_questions': question_count,
             'created_at': survey.created_at.isoformat() if survey.created_at else None
         }
@@ -217,26 +823,29 @@ class SurveyService:
         Retrieve statistics for all published surveys.
 
         Returns:
-            List[dict]: A list of dictionaries containing survey stats.
+            List[dict]: A list of dictionaries containing survey stats, in survey id order.
         """
-        surveys = self.session.query(Survey).filter(Survey.published==True)
+        surveys = self.session.query(Survey).filter(Survey.published==True).order_by(Survey.id)
+        archived_counts = ArchiveService(self.session).archived_counts()
         stats = []
 
         for survey in surveys:
             response_count = self.session.query(Response).filter(Response.survey_id == survey.id).count()
-            question_count = self.session.query(Question).filter(Question.survey_id == survey.id).count()
+            question_count = self.session.query(Question).filter(Question.survey_id == survey.id, Question.retired == False).count()
+            archived_count = archived_counts.get(survey.id, 0)
 
             stats.append({
                 "survey_id": survey.id,
                 "title": survey.title,
-                "total_responses": response_count,
+                "total_responses": response_count + archived_count,
+                "archived_responses": archived_count,
                 "total_questions": question_count,
                 "created_at": survey.created_at.isoformat() if survey.created_at else None
             })
 
         return stats
     
-    def create_survey_from_csv(self, file, title: str, description: str) -> Survey:
+    def create_survey_from_csv(self, file, title: str, description: str, survey_id: Optional[int] = None) -> Survey:
         """
         Parse a CSV file and create a new survey and its questions.
 
@@ -247,16 +856,18 @@ class SurveyService:
             file (FileStorage): Uploaded CSV file containing question data.
             title (str): Title for the new survey.
             description (str): Description of the survey.
+            survey_id (int, optional): Id allocated by the shard directory; assigned by the database when None.
 
         Returns:
             Survey: The created Survey object.
         """
-        survey_data = {"title": title, "description": description}
+        survey_data = {"id": survey_id, "title": title, "description": description, "version": 1}
         survey = Survey(**survey_data)
 
         self.session.add(survey)
         self.session.flush()
 
+        questions = []
         reader = csv.DictReader(TextIOWrapper(file, encoding='utf-8'))
         for row in reader:
             options = row.get('options')
@@ -274,7 +885,11 @@ class SurveyService:
                 order=int(row.get('order', 0)) if row.get('order') else 0
             )
             self.session.add(question)
+            questions.append(question)
+        self._record_version(survey, questions)
+        SearchService(self.session).index_surveys([survey.id])
 
         self.session.commit()
         self.session.refresh(survey)
+        self.refresh_snapshots([survey.id])
         return survey
@@ -0,0 +1,29 @@
+from celery import shared_task
+from flask import current_app
+
+from survey.services.archive_service import ArchiveService
+from survey.utils.sharding import get_shard_router
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@shared_task
+def archive_old_responses():
+    """
+    Celery beat task moving the responses of inactive surveys to cold storage.
+
+    Surveys qualify when their latest response is older than `ARCHIVE_AFTER_DAYS`. Shards are
+    archived in parallel.
+
+    Returns:
+        dict: Responses archived per survey and in total.
+    """
+    config = current_app.config
+    results = get_shard_router().fan_out(lambda session: ArchiveService(session).archive(
+        older_than_days=config["ARCHIVE_AFTER_DAYS"],
+        batch_size=config["ARCHIVE_BATCH_SIZE"],
+    ))
+    result = ArchiveService.merge_results(results)
+    logger.info("Archived %s responses from %s surveys", result["responses"], len(result["surveys"]))
+    return result
@@ -1,11 +1,12 @@
+from celery import shared_task
 from flask_mail import Message
-from survey.app import mail, celery, app
+from survey.extensions import mail
 from survey.utils.utils import get_logger
 
-logger = get_logger()
+logger = get_logger(__name__)
 
 
-@celery.task(bind=True, max_retries=5, default_retry_delay=60)
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
 def send_email_task(self, subject, recipients, body, html=None):
     """
     Celery task to send an email with retry logic.
@@ -26,10 +27,9 @@ def send_email_task(self, subject, recipients, body, html=None):
         Retry: Retries the task up to 5 times with exponential backoff if sending fails.
     """
     try:
-        with app.app_context():
-            msg = Message(subject, recipients=[recipients], body=body, html=html)
-            mail.send(msg)
-            logger.info(f"Email sent successfully to {recipients}")
+        msg = Message(subject, recipients=[recipients], body=body, html=html)
+        mail.send(msg)
+        logger.info("Email sent successfully to %s", recipients)
     except Exception as e:
-        logger.error(f"Error sending email: {e}, retrying...")
+        logger.error("Error sending email: %s, retrying...", e)
         raise self.retry(exc=e, countdown=2 ** self.request.retries * 60)
\ No newline at end of file
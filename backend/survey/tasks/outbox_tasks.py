@@ -0,0 +1,34 @@
+from celery import shared_task
+from flask import current_app
+
+from survey.services.outbox_service import OutboxService, task_id_prefix
+from survey.utils.sharding import get_shard_router
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+@shared_task
+def relay_outbox():
+    """
+    Celery beat task sending pending outbox messages to the broker.
+
+    Runs every `OUTBOX_RELAY_INTERVAL` seconds over the default database and every shard, and
+    also deletes messages sent more than `OUTBOX_RETENTION_DAYS` ago.
+
+    Returns:
+        dict: Number of messages sent and failed.
+    """
+    config = current_app.config
+
+    def relay(session, prefix):
+        outbox = OutboxService(session, prefix)
+        result = outbox.relay_pending(batch_size=config["OUTBOX_BATCH_SIZE"], max_attempts=config["OUTBOX_MAX_ATTEMPTS"])
+        purged = outbox.purge(config["OUTBOX_RETENTION_DAYS"])
+        if purged:
+            logger.info("Purged %s sent outbox messages", purged)
+        return result
+
+    router = get_shard_router()
+    results = router.fan_out_grouped(relay, {shard: task_id_prefix(shard) for shard in router.databases()})
+    return {key: sum(result[key] for result in results) for key in ("sent", "failed")}
@@ -1,32 +1,43 @@
-from survey.app import db, celery
-from survey.models.models import Survey
+from celery import shared_task
 
+from survey.models.models import Survey
+from survey.services.survey_service import SurveyService
+from survey.utils.sharding import get_shard_router
 from survey.utils.utils import get_logger
 
-logger = get_logger()
+logger = get_logger(__name__)
 
 
-@celery.task
-def publish_survey_task(survey_id):
+@shared_task
+def publish_survey_task(survey_id, scheduled_time=None):
     """
     Celery task to publish a scheduled survey.
 
-    This task is typically scheduled using `apply_async` with a `countdown` delay
-    from the survey creation or update logic.
+    This task is written to the outbox with a `countdown` delay by the survey creation,
+    update and bulk logic, and sent with an `eta` once that transaction commits.
 
-    It checks if the survey exists, is unpublished, and has a scheduled time.
-    If so, it marks the survey as published and clears the scheduled time.
+    It checks if the survey exists, is unpublished, and is still scheduled for the time the
+    task was sent for. If so, it marks the survey as published, clears the scheduled time and
+    writes the survey's static snapshot.
 
     Args:
         survey_id (int): The ID of the survey to publish.
+        scheduled_time (str): ISO UTC time the task was scheduled for. The task is skipped when it
+            is missing or the survey has since been rescheduled to another time, so every
+            rescheduling leaves earlier tasks as no-ops.
     """
-    survey = Survey.query.get(survey_id)
-
-    if survey and not survey.published and survey.scheduled_time:
-        survey.published = True
-        survey.scheduled_time = None
-        db.session.commit()
-        logger.info(f"Survey {survey_id} has been published.")
-    else:
-        logger.error(
-            f"Survey {survey_id} was already published or unscheduled before task ran.")
+    with get_shard_router().session(survey_id) as session:
+        survey = session.get(Survey, survey_id)
+
+        if survey and survey.scheduled_time and (
+                not scheduled_time or survey.scheduled_time.isoformat() != scheduled_time):
+            logger.info("Survey %s is scheduled for %s, not %s; skipping stale task.",
+                        survey_id, survey.scheduled_time, scheduled_time)
+        elif survey and not survey.published and survey.scheduled_time:
+            survey.published = True
+            survey.scheduled_time = None
+            session.commit()
+            SurveyService(session).refresh_snapshots([survey_id])
+            logger.info("Survey %s has been published.", survey_id)
+        else:
+            logger.error("Survey %s was already published or unscheduled before task ran.", survey_id)
@@ -0,0 +1,34 @@
+import pytest
+
+from survey.app import create_app
+from survey.extensions import db
+from survey.services import analytics_service as analytics_service_module
+from survey.services import survey_service as survey_service_module
+
+
+@pytest.fixture(autouse=True)
+def reset_module_caches():
+    """Module-level caches are keyed by survey id, which every test database starts again from"""
+    survey_service_module._survey_version_cache.clear()
+    survey_service_module._survey_body_cache.clear()
+    analytics_service_module._encoded_answers_cache.clear()
+
+
+@pytest.fixture
+def app_config():
+    """Settings added to the `app` fixture's; override in a test module to change them"""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    """App on a fresh SQLite file with its tables created, without rate limits or Redis pub/sub"""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'survey.db'}",
+        "RATE_LIMIT_ENABLED": False,
+        "LIVE_REDIS_URL": None,
+        **app_config,
+    })
+    with app.app_context():
+        db.create_all()
+    return app
@@ -0,0 +1,160 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from unittest.mock import Mock
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from survey.extensions import db
+from survey.models.models import Response, Survey
+from survey.services.analytics_service import (
+    AnalyticsService,
+    build_crosstab,
+    encode_answers,
+    offset_changes,
+)
+from survey.utils.exceptions import SurveyException
+
+
+@pytest.fixture
+def mock_db_session():
+    """Mock database session"""
+    session = Mock()
+    session.query.return_value.filter.return_value.first = Mock()
+    return session
+
+
+def test_encode_answers_single_and_multi_select():
+    """Single answers set one column, checkbox answers set several, unknown values are appended"""
+    categories, matrix = encode_answers(
+        ["Male", ["Apple", "Banana"], None, "Other"],
+        options=["Male", "Apple", "Banana"],
+    )
+
+    assert categories == ["Male", "Apple", "Banana", "Other"]
+    assert matrix.tolist() == [
+        [True, False, False, False],
+        [False, True, True, False],
+        [False, False, False, False],
+        [False, False, False, True],
+    ]
+
+
+def test_build_crosstab_counts_percentages_and_chi_square():
+    """Crosstab counts every selected combination and reports optional statistics"""
+    _, gender = encode_answers(["M", "F", "F", "M"], ["M", "F"])
+    _, fruit = encode_answers([["Apple"], ["Apple", "Banana"], ["Banana"], []], ["Apple", "Banana"])
+
+    result = build_crosstab(gender, fruit, percentages=True, chi_square=True)
+
+    assert result["counts"] == [[1, 0], [1, 2]]
+    assert result["row_totals"] == [1, 3]
+    assert result["column_totals"] == [2, 2]
+    assert result["total"] == 4
+    assert result["respondents"] == 3
+    assert result["row_percentages"] == [[100.0, 0.0], [33.33, 66.67]]
+    assert result["column_percentages"] == [[50.0, 0.0], [50.0, 100.0]]
+    assert result["chi_square"] == {"statistic": pytest.approx(1.333333), "dof": 1}
+
+
+def test_build_crosstab_empty_survey():
+    """An empty survey yields zero counts and a zero statistic"""
+    _, rows = encode_answers([], ["A", "B"])
+    _, cols = encode_answers([], ["X"])
+
+    result = build_crosstab(rows, cols, percentages=True, chi_square=True)
+
+    assert result["counts"] == [[0], [0]]
+    assert result["chi_square"] == {"statistic": 0.0, "dof": 0}
+
+
+def test_get_crosstab_rejects_text_question(mock_db_session):
+    """Only choice questions can be cross-tabulated"""
+    text_question = Mock(id=1, type="text", text="Name?")
+    choice_question = Mock(id=2, type="checkbox", text="Fruit")
+    survey = Mock(id=1, questions=[text_question, choice_question])
+    mock_db_session.query.return_value.filter.return_value.first.return_value = survey
+
+    with pytest.raises(SurveyException):
+        AnalyticsService(mock_db_session).get_crosstab(1, 1, 2)
+
+
+@pytest.mark.parametrize("bucket,tz_name", [("week", "UTC"), ("hour", "Mars/Olympus")])
+def test_get_response_timeseries_rejects_invalid_arguments(mock_db_session, bucket, tz_name):
+    """Unknown buckets and timezones are rejected before querying"""
+    with pytest.raises(SurveyException):
+        AnalyticsService(mock_db_session).get_response_timeseries(1, bucket=bucket, tz_name=tz_name)
+
+    mock_db_session.query.assert_not_called()
+
+
+@pytest.fixture
+def sqlite_session(app):
+    """SQLite-backed session with one survey"""
+    with app.app_context():
+        db.session.add(Survey(title="Pizza"))
+        db.session.commit()
+        yield db.session
+
+
+def add_responses(session, *created_at):
+    session.add_all(Response(survey_id=1, answers=[], created_at=when) for when in created_at)
+    session.commit()
+
+
+def points(session, bucket, tz_name, **bounds):
+    result = AnalyticsService(session).get_response_timeseries(1, bucket=bucket, tz_name=tz_name, **bounds)
+    return [(point["bucket_start"], point["count"]) for point in result["points"]]
+
+
+def test_get_response_timeseries_counts_utc_buckets(sqlite_session):
+    """Rows are counted in their UTC hour and day; empty buckets are omitted"""
+    add_responses(
+        sqlite_session,
+        datetime(2026, 1, 10, 9, 5), datetime(2026, 1, 10, 9, 40), datetime(2026, 1, 10, 11, 0),
+        datetime(2026, 1, 11, 1, 0),
+    )
+
+    assert points(sqlite_session, "hour", "UTC") == [
+        ("2026-01-10T09:00:00+00:00", 2), ("2026-01-10T11:00:00+00:00", 1), ("2026-01-11T01:00:00+00:00", 1),
+    ]
+    assert points(sqlite_session, "day", "UTC") == [("2026-01-10T00:00:00+00:00", 3), ("2026-01-11T00:00:00+00:00", 1)]
+
+
+def test_get_response_timeseries_uses_each_rows_offset_across_dst(sqlite_session):
+    """Winter rows get EST and summer rows EDT, whatever the current offset of the zone"""
+    add_responses(
+        sqlite_session,
+        datetime(2026, 1, 10, 4, 30),  # 23:30 EST on January 9
+        datetime(2026, 7, 10, 3, 30),  # 23:30 EDT on July 9
+        datetime(2026, 7, 10, 4, 30),  # 00:30 EDT on July 10
+    )
+
+    assert points(sqlite_session, "day", "America/New_York") == [
+        ("2026-01-09T00:00:00-05:00", 1), ("2026-07-09T00:00:00-04:00", 1), ("2026-07-10T00:00:00-04:00", 1),
+    ]
+    assert points(sqlite_session, "hour", "America/New_York", start="2026-07-01 00:00") == [
+        ("2026-07-09T23:00:00-04:00", 1), ("2026-07-10T00:00:00-04:00", 1),
+    ]
+
+
+def test_offset_changes_finds_transitions_to_the_second():
+    """Changes of the zone's UTC offset are found without pytz's private transition list"""
+    changes = offset_changes(ZoneInfo("America/New_York"), datetime(2026, 1, 1), datetime(2026, 12, 31))
+
+    assert changes == [datetime(2026, 3, 8, 7), datetime(2026, 11, 1, 6)]
+    assert offset_changes(ZoneInfo("America/New_York"), datetime(2026, 4, 1), datetime(2026, 10, 1)) == []
+    assert offset_changes(ZoneInfo("UTC"), datetime(2020, 1, 1), datetime(2026, 1, 1)) == []
+
+
+def test_created_at_defaults_to_utc(sqlite_session):
+    """The server default stores UTC, also on Postgres where now() is in the session's timezone"""
+    before = datetime.utcnow().replace(microsecond=0)
+    add_responses(sqlite_session, None)
+
+    created_at = sqlite_session.query(Response.created_at).scalar()
+    ddl = str(CreateTable(Response.__table__).compile(dialect=postgresql.dialect()))
+
+    assert before <= created_at <= datetime.utcnow()
+    assert "created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', CURRENT_TIMESTAMP)" in ddl
@@ -0,0 +1,50 @@
+import pytest
+
+from survey.app import create_app
+from survey.celery_worker import get_celery
+from survey.extensions import Session
+from survey.utils.exceptions import SurveyException
+
+
+@pytest.fixture
+def app():
+    return create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "RATE_LIMIT_ENABLED": False})
+
+
+def test_create_app_applies_config_and_registers_routes(app):
+    """The factory applies overrides and registers the API without building Celery"""
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == "sqlite://"
+    assert "/surveys/<int:survey_id>/submit" in rules
+    assert "celery" not in app.extensions
+
+
+def test_celery_is_built_lazily(app):
+    """Celery is created on first use and reused afterwards"""
+    celery_app = get_celery(app)
+
+    assert app.extensions["celery"] is celery_app
+    assert get_celery(app) is celery_app
+
+
+def test_session_binds_to_current_app_engine(app):
+    """Sessions bind to the engine of the app in context"""
+    from survey.extensions import db
+
+    with app.app_context():
+        with Session() as session:
+            assert session.get_bind() is db.engine
+
+
+def test_survey_exception_handler_sets_retry_after(app):
+    """SurveyException outside Flask-RESTful resources is rendered by the app error handler"""
+    @app.route("/busy")
+    def busy():
+        raise SurveyException("Busy", 503, retry_after=3)
+
+    response = app.test_client().get("/busy")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.get_json() == {"status": "error", "message": "Busy"}
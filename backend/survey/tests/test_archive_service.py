@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from survey.extensions import db
+from survey.models.models import Question, Response, ResponseArchive, Survey
+from survey.services.archive_service import ArchiveService, ArchiveStore, _to_batch
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"ARCHIVE_DIR": str(tmp_path / "archive")}
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        survey = Survey(title="Old campaign", published=True)
+        db.session.add(survey)
+        db.session.flush()
+        db.session.add(Question(survey_id=survey.id, text="Color", type="multiple-choice",
+                                options=["Red", "Blue"], order=0))
+        db.session.add(Question(survey_id=survey.id, text="Size", type="multiple-choice",
+                                options=["S", "L"], order=1))
+        old = datetime(2024, 1, 1, 12, 0)
+        for index in range(5):
+            db.session.add(Response(
+                survey_id=survey.id,
+                answers=[{"question": "Color", "answer": "Red" if index % 2 else "Blue"},
+                         {"question": "Size", "answer": "S"}],
+                respondent_email=f"user{index}@example.com",
+                created_at=old + timedelta(hours=index),
+            ))
+        db.session.commit()
+    return app
+
+
+def test_archive_moves_old_responses_in_batches(app, tmp_path):
+    """Inactive surveys are written to an Arrow file and removed from the hot table"""
+    with app.app_context():
+        result = ArchiveService(db.session).archive(older_than_days=30, batch_size=2)
+
+        assert result == {"surveys": {1: 5}, "responses": 5}
+        assert db.session.query(Response).count() == 0
+        record = db.session.get(ResponseArchive, 1)
+        assert (record.response_count, record.min_response_id, record.max_response_id) == (5, 1, 5)
+        assert ArchiveStore(str(tmp_path / "archive")).read(1).num_rows == 5
+
+        # Nothing new to archive: a second run is a no-op
+        assert ArchiveService(db.session).archive(survey_ids=[1])["responses"] == 0
+        assert db.session.get(ResponseArchive, 1).response_count == 5
+
+
+def test_interrupted_run_does_not_duplicate_rows(app, tmp_path):
+    """Rows written to the file but never recorded are replaced, not duplicated, on the next run"""
+    store = ArchiveStore(str(tmp_path / "archive"))
+    with app.app_context():
+        service = ArchiveService(db.session, store)
+        rows = db.session.query(Response).order_by(Response.id).all()
+        store.append(1, [_to_batch(rows[:3])], keep_up_to=0)
+
+        assert service.archive_survey(1, batch_size=2) == 5
+        assert store.read(1).column("id").to_pylist() == [1, 2, 3, 4, 5]
+
+
+def test_archived_responses_are_read_transparently(app):
+    """Stats, response listings, lookups, crosstabs and timeseries include archived rows"""
+    client = app.test_client()
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[1])
+        db.session.add(Response(survey_id=1, answers=[{"question": "Color", "answer": "Red"},
+                                                      {"question": "Size", "answer": "L"}]))
+        db.session.commit()
+
+    stats = client.get("/surveys/1/stats").get_json()
+    responses = client.get("/surveys/1/submit").get_json()
+    archived = client.get("/responses/2").get_json()
+    crosstab = client.get("/surveys/1/crosstab?row=1&col=2").get_json()
+    timeseries = client.get("/surveys/1/timeseries?bucket=day").get_json()
+
+    assert stats["total_responses"] == 6
+    assert stats["archived_responses"] == 5
+    assert [response["id"] for response in responses] == [1, 2, 3, 4, 5, 6]
+    assert archived["respondent_email"] == "user1@example.com"
+    assert archived["answers"][0] == {"question": "Color", "answer": "Red"}
+    assert crosstab["total"] == 6
+    assert timeseries["points"][0] == {"bucket_start": "2024-01-01T00:00:00+00:00", "count": 5}
+
+
+def test_deleting_survey_removes_archive(app, tmp_path):
+    """Deleting a survey drops its archive file and bookkeeping row"""
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[1])
+
+    assert app.test_client().delete("/surveys/1").status_code == 200
+    with app.app_context():
+        assert db.session.get(ResponseArchive, 1) is None
+    assert not (tmp_path / "archive" / "survey_1.arrow").exists()
+
+
+def test_archive_file_is_only_removed_once_the_delete_commits(app, tmp_path):
+    """A rolled back delete keeps the file its surviving row points at"""
+    path = tmp_path / "archive" / "survey_1.arrow"
+    with app.app_context():
+        service = ArchiveService(db.session)
+        service.archive(survey_ids=[1])
+        service.delete_archive(1)
+        assert path.exists()
+        db.session.rollback()
+        assert path.exists() and service.archived_count(1) == 5
+
+        service.delete_archive(1)
+        db.session.commit()
+        assert not path.exists()
+
+
+def test_pyarrow_is_imported_on_first_archive_read():
+    """Building the web app leaves pyarrow unloaded until an archive is touched"""
+    code = (
+        "import sys\n"
+        "from survey.app import create_app\n"
+        "create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'LIVE_REDIS_URL': None})\n"
+        "print('pyarrow' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    assert result.stdout.strip().splitlines()[-1] == "False"
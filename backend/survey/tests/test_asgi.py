@@ -0,0 +1,127 @@
+import importlib
+import sys
+
+import pytest
+from starlette.testclient import TestClient
+
+from survey.extensions import db
+from survey.models.models import Response
+from survey.utils.metrics import QUERIES_CANCELLED, REQUESTS_IN_FLIGHT, RESPONSES
+
+QUESTIONS = [{"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "required": True, "order": 0}]
+
+
+@pytest.fixture
+def asgi(tmp_path, monkeypatch):
+    """A fresh `survey.asgi`, since it builds its Flask app from the environment on import"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'asgi.db'}")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    for name in ("REDIS_RATE_LIMIT_URL", "REDIS_IDEMPOTENCY_URL", "REDIS_LIVE_URL"):
+        monkeypatch.setenv(name, "")
+    for name in ("survey.wsgi", "survey.asgi"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module("survey.asgi")
+    with module.flask_app.app_context():
+        db.create_all()
+    yield module
+    for name in ("survey.wsgi", "survey.asgi"):
+        sys.modules.pop(name, None)
+
+
+def answers(color):
+    return {"survey_id": 1, "answers": [{"question": "Color", "answer": color}]}
+
+
+def test_native_survey_document_matches_flask(asgi):
+    """Snapshot or database, the native route answers what the Flask resource does"""
+    flask_client = asgi.flask_app.test_client()
+    flask_client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    flask_client.post("/surveys", json={"title": "Draft", "published": False, "questions": QUESTIONS})
+
+    with TestClient(asgi.app) as client:
+        published = client.get("/surveys/1")
+        revalidated = client.get("/surveys/1", headers={"If-None-Match": published.headers["ETag"]})
+        draft = client.get("/surveys/2")
+        missing = client.get("/surveys/9")
+        listed = client.get("/surveys")
+
+    assert published.json() == flask_client.get("/surveys/1").get_json()
+    assert published.headers["Content-Location"].startswith("/surveys/1/snapshots/")
+    assert revalidated.status_code == 304
+    assert draft.json() == flask_client.get("/surveys/2").get_json()
+    assert (missing.status_code, missing.json()) == (404, flask_client.get("/surveys/9").get_json())
+    # Everything else falls through to the Flask app
+    assert [survey["title"] for survey in listed.json()] == ["Pizza", "Draft"]
+
+
+def test_native_submissions_answer_like_flask(asgi):
+    """Created, invalid, unknown and rate-limited submissions get the Flask statuses and bodies"""
+    flask_client = asgi.flask_app.test_client()
+    flask_client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+
+    with TestClient(asgi.app) as client:
+        created = client.post("/surveys/1/submit", json=answers("Red"))
+        invalid = [
+            client.post("/surveys/1/submit", content="{", headers={"Content-Type": "application/json"}),
+            client.post("/surveys/1/submit", json={"survey_id": 1, "answers": [], "score": 5}),
+            client.post("/surveys/9/submit", json=answers("Red")),
+        ]
+        flask_invalid = [
+            flask_client.post("/surveys/1/submit", data="{", content_type="application/json"),
+            flask_client.post("/surveys/1/submit", json={"survey_id": 1, "answers": [], "score": 5}),
+            flask_client.post("/surveys/9/submit", json=answers("Red")),
+        ]
+        statuses = [client.post("/surveys/1/submit", json=answers("Blue")).status_code for _ in range(12)]
+        limited = client.post("/surveys/1/submit", json=answers("Blue"))
+
+    assert created.status_code == 201
+    assert created.json()["answers"] == [{"question": "Color", "answer": "Red"}]
+    assert [response.status_code for response in invalid] == [400, 400, 404]
+    assert [response.json() for response in invalid] == [response.get_json() for response in flask_invalid]
+    assert invalid[0].json() == {"status": "error", "message": "Request body must be valid JSON"}
+    assert 429 in statuses
+    assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1
+    assert limited.json() == {"status": "error", "message": "Too many requests, please retry later"}
+
+
+def test_idempotent_submissions_are_replayed(asgi):
+    """Submissions carrying Idempotency-Key go through the Flask app's idempotency records"""
+    asgi.flask_app.config["RATE_LIMIT_ENABLED"] = False
+    asgi.flask_app.test_client().post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    headers = {"Idempotency-Key": "retry-1"}
+
+    with TestClient(asgi.app) as client:
+        first = client.post("/surveys/1/submit", json=answers("Red"), headers=headers)
+        retried = client.post("/surveys/1/submit", json=answers("Red"), headers=headers)
+        reused = client.post("/surveys/1/submit", json=answers("Blue"), headers=headers)
+
+    assert (first.status_code, retried.status_code) == (201, 201)
+    assert retried.json() == first.json()
+    assert retried.headers["Idempotent-Replayed"] == "true"
+    assert reused.status_code == 422
+    assert reused.json()["status"] == "error"
+    with asgi.flask_app.app_context():
+        assert Response.query.count() == 1
+
+
+def test_native_routes_keep_route_metrics_and_deadlines(asgi):
+    """Native routes are counted under their Flask resource and bounded by its time budget"""
+    asgi.flask_app.config["RATE_LIMIT_ENABLED"] = False
+    asgi.flask_app.test_client().post("/surveys", json={"title": "Draft", "published": False, "questions": QUESTIONS})
+    served = RESPONSES.labels("surveyapi", "GET", "200")._value.get()
+    timed_out = RESPONSES.labels("surveyapi", "GET", "503")._value.get()
+    created = RESPONSES.labels("responseapi", "POST", "201")._value.get()
+    cancelled = QUERIES_CANCELLED.labels("surveyapi")._value.get()
+
+    with TestClient(asgi.app) as client:
+        client.get("/surveys/1")
+        client.post("/surveys/1/submit", json=answers("Red"))
+        asgi.deadlines.limit(asgi.SurveyAPI, ["GET"], seconds=0)
+        late = client.get("/surveys/1")
+
+    assert RESPONSES.labels("surveyapi", "GET", "200")._value.get() == served + 1
+    assert RESPONSES.labels("responseapi", "POST", "201")._value.get() == created + 1
+    assert RESPONSES.labels("surveyapi", "GET", "503")._value.get() == timed_out + 1
+    assert late.status_code == 503 and late.headers["Retry-After"]
+    assert QUERIES_CANCELLED.labels("surveyapi")._value.get() == cancelled + 1
+    assert REQUESTS_IN_FLIGHT.labels("surveyapi", "GET")._value.get() == 0
@@ -0,0 +1,146 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from survey.extensions import db
+from survey.models.models import BulkLoadCheckpoint, Response
+from survey.services.archive_service import ArchiveService
+from survey.services.bulk_load_service import BulkLoadService
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "required": True, "order": 0},
+    {"text": "Toppings", "type": "checkbox", "options": ["Ham", "Olives"], "order": 1},
+    {"text": "Comment", "type": "text", "order": 2},
+]
+
+CSV_INPUT = """﻿Favourite colour,Toppings,Comment,Email,Submitted,Legacy id
+Red,Ham;Olives,Great,ann@example.com,2024-03-01 09:30,a1
+Blue,,,,2024-03-02 10:00,a2
+Green,Ham,,,2024-03-03 11:00,a3
+Blue,"[""Olives""]",Fine,bob@example.com,not a date,a4
+Red,Olives,,carl@example.com,,a5
+"""
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"ARCHIVE_DIR": str(tmp_path / "archive")}
+
+
+@pytest.fixture
+def app(app):
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    client.post("/surveys", json={"title": "One each", "dedupe_respondents": True, "questions": QUESTIONS[2:]})
+    return app
+
+
+def bulk_load(app, *args):
+    result = app.test_cli_runner().invoke(args=["survey", "bulk-load", *map(str, args)])
+    assert result.exit_code == 0, result.output
+    return json.loads(result.output.splitlines()[-1])  # log lines come first
+
+
+def loaded_responses(app, survey_id):
+    with app.app_context():
+        return db.session.query(Response).filter(Response.survey_id == survey_id).order_by(Response.id).all()
+
+
+def test_csv_is_mapped_validated_and_loaded(app, tmp_path):
+    """Mapped columns become answers; invalid records go to the rejects file"""
+    source = tmp_path / "export.csv"
+    source.write_text(CSV_INPUT, encoding="utf-8")
+    rejects = tmp_path / "rejects.ndjson"
+
+    result = bulk_load(
+        app, 1, source, "--map", "Favourite colour=1", "--map", "Email=respondent_email",
+        "--map", "Submitted=created_at", "--timezone", "Europe/Paris", "--rejects", rejects,
+    )
+
+    assert (result["loaded"], result["rejected"], result["resumed_from"]) == (3, 2, 0)
+    assert result["ignored_columns"] == ["Legacy id"]
+    assert result["rows_per_second"] > 0
+    assert [(entry["record"], entry["error"]) for entry in map(json.loads, rejects.read_text().splitlines())] == [
+        (3, "'Green' is not an option of question 1"),
+        (4, "Invalid created_at 'not a date'"),
+    ]
+    first, second, third = loaded_responses(app, 1)
+    assert first.answers == [
+        {"question_id": 1, "question": "Color", "answer": "Red"},
+        {"question_id": 2, "question": "Toppings", "answer": ["Ham", "Olives"]},
+        {"question_id": 3, "question": "Comment", "answer": "Great"},
+    ]
+    assert first.created_at.isoformat() == "2024-03-01T08:30:00"
+    assert first.respondent_email_hash is not None and first.survey_version == 1
+    assert second.answers == [{"question_id": 1, "question": "Color", "answer": "Blue"}]
+    assert third.respondent_email == "carl@example.com"
+    crosstab = app.test_client().get("/surveys/1/crosstab?row=1&col=2").get_json()
+    assert crosstab["counts"] == [[1, 2], [0, 0]]
+
+
+def test_interrupted_load_resumes_after_the_last_committed_batch(app, tmp_path):
+    """Each batch commits with its checkpoint, so a rerun loads every record exactly once"""
+    source = tmp_path / "history.ndjson"
+    source.write_text("\n".join(
+        json.dumps({"Color": "Red" if index % 2 else "Blue", "Comment": f"#{index}"}) for index in range(10)
+    ) + "\n\nnot json\n")
+    insert = BulkLoadService._insert
+    calls = []
+
+    def failing_insert(self, rows):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        insert(self, rows)
+
+    with patch.object(BulkLoadService, "_insert", failing_insert):
+        failed = app.test_cli_runner().invoke(args=["survey", "bulk-load", "1", str(source), "--batch-size", "4"])
+    assert isinstance(failed.exception, RuntimeError)
+    assert len(loaded_responses(app, 1)) == 8
+
+    result = bulk_load(app, 1, source, "--batch-size", "4")
+
+    assert (result["resumed_from"], result["loaded"], result["rejected"]) == (8, 2, 1)
+    assert (result["total_loaded"], result["total_rejected"]) == (10, 1)
+    assert [response.answers[1]["answer"] for response in loaded_responses(app, 1)] == [f"#{index}" for index in range(10)]
+    with app.app_context():
+        assert db.session.get(BulkLoadCheckpoint, (1, "history.ndjson")).rows_read == 11
+
+    assert bulk_load(app, 1, source)["loaded"] == 0
+    assert bulk_load(app, 1, source, "--restart")["loaded"] == 10
+
+
+def test_dedupe_surveys_reject_known_and_repeated_respondents(app, tmp_path):
+    """Emails that answered already, archived or live, or earlier in the file, are rejected instead of failing the batch"""
+    client = app.test_client()
+    client.post("/surveys/2/submit", json={"survey_id": 2, "answers": [], "respondent_email": "ann@example.com"})
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[2])
+    client.post("/surveys/2/submit", json={"survey_id": 2, "answers": [], "respondent_email": "carl@example.com"})
+    source = tmp_path / "respondents.jsonl"
+    source.write_text("\n".join(json.dumps(record) for record in [
+        {"respondent_email": "ANN@example.com", "Comment": "again"},
+        {"respondent_email": "Carl@example.com", "Comment": "again"},
+        {"respondent_email": "bob@example.com", "Comment": "first"},
+        {"respondent_email": " bob@example.com", "Comment": "second"},
+        {"Comment": "anonymous"},
+    ]))
+
+    result = bulk_load(app, 2, source)
+
+    assert (result["loaded"], result["rejected"]) == (2, 3)
+    assert [response.respondent_email for response in loaded_responses(app, 2)] == ["carl@example.com", "bob@example.com", None]
+
+
+def test_bad_arguments_are_reported(app, tmp_path):
+    """Unknown surveys, questions and formats fail before anything is loaded"""
+    source = tmp_path / "export.txt"
+    source.write_text("Color\nRed\n")
+    runner = app.test_cli_runner()
+
+    assert "pass --format" in runner.invoke(args=["survey", "bulk-load", "1", str(source)]).output
+    assert "not found" in runner.invoke(args=["survey", "bulk-load", "9", str(source), "--format", "csv"]).output
+    unknown = runner.invoke(args=["survey", "bulk-load", "1", str(source), "--format", "csv", "--map", "Color=7"])
+    assert "not in the survey" in unknown.output
+    assert loaded_responses(app, 1) == []
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+import pytest
+
+from survey.extensions import db
+from survey.models.models import OutboxMessage, Question, Response, ResponseArchive, Survey
+from survey.services.archive_service import ArchiveService
+from survey.tasks.schedule_publish import publish_survey_task
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"ARCHIVE_DIR": str(tmp_path / "archive")}
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        for index in range(3):
+            survey = Survey(title=f"Survey {index}", published=index != 2)
+            db.session.add(survey)
+            db.session.flush()
+            db.session.add(Question(survey_id=survey.id, text="Color", type="text", order=0))
+            db.session.add(Response(survey_id=survey.id, answers=[{"question": "Color", "answer": "Red"}],
+                                    created_at=datetime(2024, 1, 1)))
+        db.session.commit()
+    return app
+
+
+def test_publish_and_retitle_report_per_id_outcomes(app):
+    """Actions run over the requested ids and report the ones that do not exist"""
+    client = app.test_client()
+
+    published = client.post("/surveys/bulk", json={"action": "unpublish", "ids": [1, 2, 99]}).get_json()
+    retitled = client.post("/surveys/bulk", json={
+        "action": "retitle", "title": "[Old] {title}", "filter": {"published": False},
+    }).get_json()
+
+    assert published["results"] == [
+        {"id": 1, "status": "unpublished"},
+        {"id": 2, "status": "unpublished"},
+        {"id": 99, "status": "not_found"},
+    ]
+    assert retitled["affected"] == [1, 2, 3]
+    with app.app_context():
+        assert [survey.title for survey in Survey.query.order_by(Survey.id)] == [
+            "[Old] Survey 0", "[Old] Survey 1", "[Old] Survey 2",
+        ]
+
+
+def test_schedule_sends_one_task_per_survey_and_stale_tasks_are_skipped(app):
+    """Rescheduling makes earlier publish tasks no-ops"""
+    client = app.test_client()
+    later = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    result = client.post("/surveys/bulk", json={
+        "action": "schedule", "ids": [1, 3], "scheduled_time": later.isoformat(),
+    }).get_json()
+
+    assert [entry["status"] for entry in result["results"]] == ["scheduled", "scheduled"]
+    with app.app_context():
+        messages = OutboxMessage.query.order_by(OutboxMessage.id).all()
+        assert [message.args for message in messages] == [[1, later.isoformat()], [3, later.isoformat()]]
+        assert abs((messages[0].eta - later).total_seconds()) < 5
+        publish_survey_task.run(1, (later - timedelta(minutes=5)).isoformat())
+        assert db.session.get(Survey, 1).published is False
+        publish_survey_task.run(1, later.isoformat())
+        assert db.session.get(Survey, 1).published is True
+
+
+def test_bulk_reschedule_makes_the_created_surveys_task_stale(app):
+    """Tasks queued by create_survey and update_survey carry their time, so a bulk reschedule supersedes them"""
+    client = app.test_client()
+    first = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    later = first + timedelta(hours=1)
+    survey_id = client.post("/surveys", json={
+        "title": "Launch", "published": False, "scheduled_time": first.isoformat(),
+        "questions": [{"text": "Color", "type": "text", "order": 0}],
+    }).get_json()["id"]
+    client.put(f"/surveys/{survey_id}", json={
+        "title": "Launch", "published": False, "scheduled_time": first.isoformat(),
+        "questions": [{"text": "Color", "type": "text", "order": 0}],
+    })
+    client.post("/surveys/bulk", json={"action": "schedule", "ids": [survey_id], "scheduled_time": later.isoformat()})
+
+    with app.app_context():
+        messages = OutboxMessage.query.order_by(OutboxMessage.id).all()
+        assert [message.args for message in messages] == [
+            [survey_id, first.isoformat()], [survey_id, first.isoformat()], [survey_id, later.isoformat()],
+        ]
+        for args in ([survey_id], messages[0].args, messages[1].args):
+            publish_survey_task.run(*args)
+            assert db.session.get(Survey, survey_id).published is False
+        publish_survey_task.run(*messages[2].args)
+        assert db.session.get(Survey, survey_id).published is True
+
+
+def test_delete_cascades_to_questions_responses_and_archives(app, tmp_path):
+    """Bulk delete removes every dependent row and archive file"""
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[1])
+
+    result = app.test_client().post("/surveys/bulk", json={"action": "delete", "ids": [1, 2]}).get_json()
+
+    assert result["affected"] == [1, 2]
+    with app.app_context():
+        assert [survey.id for survey in Survey.query.all()] == [3]
+        assert {question.survey_id for question in Question.query.all()} == {3}
+        assert {response.survey_id for response in Response.query.all()} == {3}
+        assert ResponseArchive.query.count() == 0
+    assert not (tmp_path / "archive" / "survey_1.arrow").exists()
+
+
+def test_invalid_requests_are_rejected(app):
+    client = app.test_client()
+    assert client.post("/surveys/bulk", json={"action": "explode", "ids": [1]}).status_code == 400
+    assert client.post("/surveys/bulk", json={"action": "publish"}).status_code == 400
+    assert client.post("/surveys/bulk", json={"action": "publish", "filter": {"owner": 1}}).status_code == 400
+    assert client.post("/surveys/bulk", json={"action": "retitle", "ids": [1]}).status_code == 400
+    assert client.post("/surveys/bulk", json={"action": "publish", "ids": [True]}).status_code == 400
+    assert client.post("/surveys/bulk", json={"action": "publish", "ids": [1, "2"]}).status_code == 400
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+from survey.extensions import db
+from survey.models.models import Response
+from survey.utils import compression
+
+QUESTIONS = [
+    {"text": f"Question {index}", "type": "text", "order": index} for index in range(30)
+]
+
+
+def test_large_bodies_are_compressed_in_negotiated_encoding(app):
+    """Only large bodies are compressed, and only in encodings the client accepts"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Long", "questions": QUESTIONS})
+
+    compressed = client.get("/surveys", headers={"Accept-Encoding": "gzip"})
+    refused = client.get("/surveys", headers={"Accept-Encoding": "gzip;q=0"})
+    small = client.get("/survey/ping", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(compressed.data))[0]["title"] == "Long"
+    assert "Content-Encoding" not in refused.headers
+    assert refused.get_json()[0]["title"] == "Long"
+    assert "Content-Encoding" not in small.headers
+
+
+def test_survey_document_body_is_cached_with_compressed_variants(app, monkeypatch):
+    """Hot reads reuse the serialized and compressed body until the survey changes"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Long", "questions": QUESTIONS})
+    calls = []
+    gzip_codec = compression.CODECS["gzip"]
+    monkeypatch.setitem(compression.CODECS, "gzip", (lambda data: calls.append(1) or gzip_codec[0](data), gzip_codec[1]))
+
+    first = client.get("/surveys/1", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/surveys/1", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/surveys/1")
+
+    assert len(calls) == 1
+    assert first.data == second.data
+    assert json.loads(gzip.decompress(first.data)) == plain.get_json()
+    assert len(plain.get_json()["questions"]) == 30
+
+    client.put("/surveys/1", json={"title": "Renamed", "questions": QUESTIONS})
+    renamed = client.get("/surveys/1", headers={"Accept-Encoding": "gzip"})
+    assert json.loads(gzip.decompress(renamed.data))["title"] == "Renamed"
+    assert len(calls) == 2
+
+
+def test_response_lists_are_streamed_and_compressed(app):
+    """Response dumps are sent in batches and compressed as they stream"""
+    with app.app_context():
+        db.session.add_all(
+            Response(survey_id=1, answers=[{"question": "Q", "answer": "A" * 50}]) for _ in range(2500)
+        )
+        db.session.commit()
+
+    response = app.test_client().get("/surveys/1/submit", headers={"Accept-Encoding": "gzip"})
+
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = json.loads(gzip.decompress(response.data))
+    assert [row["id"] for row in body] == list(range(1, 2501))
@@ -0,0 +1,63 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import text
+
+from survey.endpoints.survey_endpoint import SurveyStatsAPI
+from survey.extensions import Session
+from survey.utils.deadlines import Budget, _apply_budget, budget_scope
+from survey.utils.exceptions import DeadlineExceededError
+from survey.utils.metrics import QUERIES_CANCELLED
+
+# Counts to a hundred million: seconds of work for SQLite
+SLOW_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT count(*) FROM c"
+
+
+def test_sqlite_queries_are_interrupted_at_the_deadline(app):
+    """The progress handler cancels the statement, and the pooled connection is usable afterwards"""
+    cancelled = QUERIES_CANCELLED.labels("slow")._value.get()
+    started = time.monotonic()
+
+    with app.app_context():
+        with pytest.raises(DeadlineExceededError) as raised:
+            with budget_scope(Budget(time.monotonic() + 0.05, "slow", 7)), Session() as session:
+                session.execute(text(SLOW_QUERY))
+        with Session() as session:
+            assert session.execute(text("SELECT count(*) FROM (SELECT 1 UNION ALL SELECT 2)")).scalar() == 2
+
+    assert time.monotonic() - started < 2
+    assert (raised.value.code, raised.value.retry_after) == (503, 7)
+    assert QUERIES_CANCELLED.labels("slow")._value.get() == cancelled + 1
+
+
+def test_routes_past_their_budget_answer_503_with_retry_after(app):
+    """Budgets are configured per resource and method next to the resource registration"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": []})
+    deadlines = app.extensions["deadlines"]
+    assert deadlines.budget_for(SurveyStatsAPI, "GET") == 15
+    deadlines.limit(SurveyStatsAPI, ["GET"], seconds=0)
+
+    response = client.get("/surveys/1/stats")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert response.get_json()["message"] == "The request ran out of time, please retry later"
+    # Unbudgeted routes, and later requests on the same thread, are not affected
+    assert client.get("/surveys/1/versions").status_code == 200
+
+
+def test_postgres_transactions_get_the_remaining_time_as_statement_timeout():
+    """SET LOCAL scopes the timeout to the transaction the session just began"""
+    connection = MagicMock()
+    connection.dialect.name = "postgresql"
+
+    with budget_scope(Budget(time.monotonic() + 2, "surveystatsapi", 5)):
+        _apply_budget(None, None, connection)
+    _apply_budget(None, None, connection)
+
+    (statement,), _ = connection.exec_driver_sql.call_args
+    assert connection.exec_driver_sql.call_count == 1
+    assert statement.startswith("SET LOCAL statement_timeout = ")
+    assert 1900 < int(statement.rsplit(" ", 1)[1]) <= 2000
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from survey.app import create_app
+from survey.extensions import db
+from survey.models.models import Response, Survey
+from survey.utils.exceptions import SurveyException
+from survey.utils.metrics import SQLITE_WRITE_BATCH
+
+QUESTIONS = [{"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "order": 0}]
+
+
+@pytest.fixture
+def app_config():
+    return {"SQLITE_EMBEDDED": True}
+
+
+def submit(client, color, email=None):
+    return client.post("/surveys/1/submit", json={
+        "survey_id": 1, "answers": [{"question": "Color", "answer": color}], "respondent_email": email,
+    })
+
+
+def test_connections_are_tuned_for_wal(app):
+    """Readers and the writer get the pragmas on connect"""
+    writer = app.extensions["sqlite_writer"]
+    with app.app_context():
+        pragmas = [db.session.execute(text(f"PRAGMA {name}")).scalar()
+                   for name in ("journal_mode", "synchronous", "cache_size", "busy_timeout")]
+    with writer.engine.connect() as connection:
+        writer_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    assert pragmas == ["wal", 1, -64 * 1024, 5000]
+    assert writer_mode == "wal"
+
+
+def test_queued_writes_are_committed_together(app):
+    """Writes waiting behind a running batch share the next commit; a failing one only loses its own work"""
+    writer = app.extensions["sqlite_writer"]
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    batched = SQLITE_WRITE_BATCH._sum.get()
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+
+    def blocking(session):
+        started.set()
+        release.wait(5)
+
+    def add_survey(title):
+        def write(session):
+            session.add(Survey(title=title))
+            session.flush()
+            if title == "fails":
+                raise SurveyException("rolled back")
+            session.commit()
+            return title
+        try:
+            results.append(writer.run(write))
+        except SurveyException as e:
+            errors.append(e.description)
+
+    first = threading.Thread(target=writer.run, args=(blocking,))
+    first.start()
+    started.wait(5)
+    threads = [threading.Thread(target=add_survey, args=(title,)) for title in ("a", "fails", "b", "c")]
+    for thread in threads:
+        thread.start()
+    while writer._queue.qsize() < len(threads):
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [first, *threads]:
+        thread.join(5)
+
+    assert sorted(results) == ["a", "b", "c"] and errors == ["rolled back"]
+    assert SQLITE_WRITE_BATCH._sum.get() == batched + 1 + len(threads)
+    with app.app_context():
+        assert sorted(survey.title for survey in Survey.query.filter(Survey.id > 1)) == ["a", "b", "c"]
+
+
+def test_api_writes_go_through_the_writer(app):
+    """Concurrent submissions all succeed, and duplicate respondents still get a 409"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "dedupe_respondents": True, "questions": QUESTIONS})
+    statuses = []
+
+    def respondent(index):
+        statuses.append(submit(app.test_client(), "Red" if index % 2 else "Blue", f"r{index}@example.com").status_code)
+
+    threads = [threading.Thread(target=respondent, args=(index,)) for index in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    duplicate = submit(client, "Red", "r1@example.com")
+    response_id = submit(client, "Red").get_json()["id"]
+    updated = client.put(f"/responses/{response_id}", json={"answers": [{"question": "Color", "answer": "Blue"}]})
+    renamed = client.put("/surveys/1", json={"title": "Pasta", "questions": QUESTIONS})
+
+    assert statuses == [201] * 30
+    assert duplicate.status_code == 409
+    assert updated.get_json()["answers"] == [{"question": "Color", "answer": "Blue"}]
+    assert renamed.get_json()["title"] == "Pasta"
+    assert client.delete(f"/responses/{response_id}").status_code == 200
+    assert client.delete(f"/responses/{response_id}").status_code == 404
+    with app.app_context():
+        assert Response.query.count() == 30
+    assert client.delete("/surveys/1").status_code == 200
+
+
+def test_embedded_mode_needs_an_sqlite_file():
+    with pytest.raises(RuntimeError, match="SQLite database file"):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "SQLITE_EMBEDDED": True, "LIVE_REDIS_URL": None})
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+
+from survey.extensions import db
+from survey.models.models import Response
+from survey.services.archive_service import ArchiveService
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "order": 0},
+    {"text": "Size", "type": "text", "order": 1},
+]
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"ARCHIVE_DIR": str(tmp_path / "archive")}
+
+
+@pytest.fixture
+def app(app):
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Shirts", "description": "Sizes", "questions": QUESTIONS})
+    client.post("/surveys", json={"title": "Hats", "questions": QUESTIONS[:1]})
+    return app
+
+
+def capture_sql(app):
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_survey_list_selects_only_requested_columns(app):
+    """Without include=questions the question table is never queried"""
+    statements = capture_sql(app)
+    surveys = app.test_client().get("/surveys?fields=id,title").get_json()
+
+    assert surveys == [{"id": 1, "title": "Shirts"}, {"id": 2, "title": "Hats"}]
+    assert not any("question" in statement for statement in statements)
+    assert not any("description" in statement for statement in statements)
+
+
+def test_include_questions_and_defaults(app):
+    client = app.test_client()
+
+    with_questions = client.get("/surveys?fields=title&include=questions").get_json()
+    full = client.get("/surveys").get_json()
+    single = client.get("/surveys/1?fields=title,published").get_json()
+    single_with_questions = client.get("/surveys/1?include=questions").get_json()
+
+    assert [len(survey["questions"]) for survey in with_questions] == [2, 1]
+    assert set(with_questions[0]) == {"title", "questions"}
+    assert full[0]["description"] == "Sizes" and [q["text"] for q in full[0]["questions"]] == ["Color", "Size"]
+    assert single == {"title": "Shirts", "published": True}
+    assert single_with_questions == client.get("/surveys/1").get_json()
+
+
+def test_unknown_fields_are_rejected(app):
+    client = app.test_client()
+
+    assert client.get("/surveys?fields=id,secret").status_code == 400
+    assert client.get("/surveys?include=responses").status_code == 400
+    assert client.get("/surveys/1/submit?fields=respondent_email_hash").status_code == 400
+
+
+def test_response_fields_apply_to_live_and_archived_rows(app):
+    client = app.test_client()
+    for color in ("Red", "Blue"):
+        client.post("/surveys/1/submit", json={
+            "survey_id": 1, "answers": [{"question": "Color", "answer": color}], "respondent_email": "a@example.com",
+        })
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[1])
+        db.session.add(Response(survey_id=1, answers=[{"question": "Color", "answer": "Red"}]))
+        db.session.commit()
+
+    listed = client.get("/surveys/1/submit?fields=id,survey_version").get_json()
+    single = client.get("/responses/3?fields=answers").get_json()
+    archived = client.get("/responses/1?fields=id,respondent_email").get_json()
+
+    assert listed == [{"id": 1, "survey_version": 1}, {"id": 2, "survey_version": 1}, {"id": 3, "survey_version": None}]
+    assert single == {"answers": [{"question": "Color", "answer": "Red"}]}
+    assert archived == {"id": 1, "respondent_email": "a@example.com"}
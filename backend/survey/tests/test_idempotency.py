@@ -0,0 +1,91 @@
+import hashlib
+
+import fakeredis
+import pytest
+from flask import Flask
+from flask_restful import Api, Resource
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from survey.models.models import IdempotencyKey
+from survey.utils.idempotency import Idempotency, SqlIdempotencyStore
+
+
+class CreateResource(Resource):
+    calls = 0
+
+    def post(self):
+        CreateResource.calls += 1
+        return {"id": CreateResource.calls}, 201
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    IdempotencyKey.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+def make_client(idempotency):
+    CreateResource.calls = 0
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_resource(CreateResource, "/surveys")
+    idempotency.init_app(app)
+    idempotency.protect(CreateResource, ["POST"])
+    return app.test_client()
+
+
+@pytest.mark.parametrize("use_redis", [True, False])
+def test_retry_replays_original_response(session_factory, use_redis):
+    """A retry with the same key returns the stored result without running the resource again"""
+    redis_client = fakeredis.FakeRedis() if use_redis else None
+    client = make_client(Idempotency(session_factory=session_factory, redis_client=redis_client))
+    headers = {"Idempotency-Key": "abc"}
+
+    first = client.post("/surveys", json={"title": "t"}, headers=headers)
+    retry = client.post("/surveys", json={"title": "t"}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json() == {"id": 1}
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert CreateResource.calls == 1
+    assert client.post("/surveys", json={"title": "t"}).get_json() == {"id": 2}
+
+
+def test_key_reused_with_different_payload_is_rejected():
+    """The same key with another payload answers 422"""
+    client = make_client(Idempotency(redis_client=fakeredis.FakeRedis()))
+    headers = {"Idempotency-Key": "abc"}
+
+    client.post("/surveys", json={"title": "t"}, headers=headers)
+    response = client.post("/surveys", json={"title": "other"}, headers=headers)
+
+    assert response.status_code == 422
+    assert CreateResource.calls == 1
+
+
+def test_in_progress_duplicate_is_rejected():
+    """A duplicate of a request still running gives up after the wait budget with 409"""
+    idempotency = Idempotency(redis_client=fakeredis.FakeRedis())
+    client = make_client(idempotency)
+    idempotency.wait_seconds = 0
+    fingerprint = hashlib.sha256(b"POST/surveys{}").hexdigest()
+    idempotency.redis_store.claim("createresource:abc", fingerprint)
+
+    response = client.post("/surveys", data="{}", content_type="application/json",
+                           headers={"Idempotency-Key": "abc"})
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert CreateResource.calls == 0
+
+
+def test_sql_store_expired_key_can_be_claimed_again(session_factory):
+    """Expired records no longer block the key"""
+    store = SqlIdempotencyStore(session_factory)
+
+    assert store.claim("k", "fp") is None
+    assert store.claim("k", "fp")["status_code"] is None
+    store.complete("k", "fp", 201, "{}", "application/json", ttl=-1)
+    assert store.claim("k", "fp") is None
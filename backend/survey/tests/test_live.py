@@ -0,0 +1,145 @@
+import json
+
+import pytest
+import redis
+
+from survey.endpoints.survey_endpoint import SurveyLiveAPI
+from survey.utils.live import LiveResults
+from survey.utils.metrics import LIVE_SUBSCRIBERS
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "order": 0},
+    {"text": "Toppings", "type": "checkbox", "options": ["Ham", "Olives"], "order": 1},
+    {"text": "Comment", "type": "text", "order": 2},
+]
+
+
+@pytest.fixture
+def app_config():
+    # Flushed by the tests themselves
+    return {"LIVE_UPDATE_INTERVAL": 3600, "LIVE_KEEPALIVE": 3600}
+
+
+def submit(client, color, toppings):
+    return client.post("/surveys/1/submit", json={"survey_id": 1, "answers": [
+        {"question": "Color", "answer": color},
+        {"question": "Toppings", "answer": toppings},
+        {"question": "Comment", "answer": "Nice"},
+    ]})
+
+
+def read_event(chunks):
+    event = next(chunks).decode()
+    lines = dict(line.split(": ", 1) for line in event.strip().splitlines() if not line.startswith("retry"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_stream_starts_with_a_snapshot_and_coalesces_updates(app):
+    """Responses committed between flushes arrive as one merged update"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    submit(client, "Red", ["Ham"])
+    live = app.extensions["live_results"]
+
+    response = client.get("/surveys/1/live", buffered=False)
+    chunks = response.iter_encoded()
+    snapshot = read_event(chunks)
+    submit(client, "Blue", ["Ham", "Olives"])
+    submit(client, "Blue", [])
+    live.flush()
+    update = read_event(chunks)
+    response.close()
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert snapshot == ("snapshot", {
+        "survey_id": 1,
+        "total_responses": 1,
+        "answers": {"1": {"Red": 1, "Blue": 0}, "2": {"Ham": 1, "Olives": 0}},
+        "last_response_id": 1,
+    })
+    assert update == ("update", {
+        "survey_id": 1,
+        "responses": 2,
+        "answers": {"1": {"Blue": 2}, "2": {"Ham": 1, "Olives": 1}},
+    })
+    assert live.flush() == 0
+
+
+def test_closed_streams_unsubscribe(app):
+    """Updates for surveys nobody follows are not kept"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    live = app.extensions["live_results"]
+    connected = LIVE_SUBSCRIBERS._value.get()
+
+    response = client.get("/surveys/1/live", buffered=False)
+    next(response.iter_encoded())
+    assert LIVE_SUBSCRIBERS._value.get() == connected + 1
+    response.close()
+    submit(client, "Red", [])
+
+    assert LIVE_SUBSCRIBERS._value.get() == connected
+    assert live.flush() == 0
+
+
+def test_responses_committed_while_subscribing_are_counted_once(app):
+    """The subscription comes first; deltas the snapshot already counts are dropped"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    live = app.extensions["live_results"]
+
+    def read_snapshot():
+        submit(client, "Red", [])  # committed after subscribing: counted by the snapshot
+        snapshot = SurveyLiveAPI.snapshot(1)
+        live.flush()  # buffered until the subscription starts, then dropped
+        submit(client, "Blue", [])  # committed after the read: only in the update
+        return snapshot
+
+    with app.app_context():
+        subscription, snapshot = live.follow(1, read_snapshot)
+    live.flush()
+    first = subscription.take()
+    # A late delta at or below the snapshot's mark, flushed together with a new one
+    live.receive({"survey_id": 1, "response_id": 1, "responses": 1, "answers": {"1": {"Red": 1}}})
+    live.receive({"survey_id": 1, "response_id": 3, "responses": 1, "answers": {"1": {"Blue": 1}}})
+    live.flush()
+    second = subscription.take()
+    live.unsubscribe(subscription)
+    live.unsubscribe(subscription)
+
+    assert (snapshot["total_responses"], snapshot["last_response_id"]) == (1, 1)
+    assert first == {"survey_id": 1, "responses": 1, "answers": {"1": {"Blue": 1}, "2": {}}}
+    assert second == {"survey_id": 1, "responses": 1, "answers": {"1": {"Blue": 1}}}
+
+
+def test_unknown_survey_is_not_streamed(app):
+    """The snapshot is read before streaming, so a missing survey is a plain 404"""
+    response = app.test_client().get("/surveys/42/live")
+
+    assert response.status_code == 404
+    assert response.mimetype == "application/json"
+
+
+class FailingRedis:
+    def publish(self, channel, message):
+        raise redis.ConnectionError("down")
+
+
+def test_publish_falls_back_to_in_process_delivery_when_redis_is_down(app):
+    """Subscribers of this process still get updates while Redis is unreachable"""
+    live = LiveResults(redis_client=FailingRedis())
+    live._started = True  # no background threads
+    received = []
+    subscription = live.subscribe(7)
+    subscription.start(None)
+    subscription.listen(lambda: received.append(1))
+
+    live.publish({"survey_id": 7, "response_id": 1, "responses": 1, "answers": {"3": {"Red": 1}}})
+    live.publish({"survey_id": 7, "response_id": 2, "responses": 1, "answers": {"3": {"Red": 1}}})
+    live.flush()
+
+    assert received == [1]
+    assert subscription.take() == {"survey_id": 7, "responses": 2, "answers": {"3": {"Red": 2}}}
+    assert subscription.take() is None
+    live.unsubscribe(subscription)
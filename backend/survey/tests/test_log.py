@@ -0,0 +1,67 @@
+import json
+import logging
+import queue
+
+from survey.app import create_app
+from survey.utils.log import DroppingQueueHandler, JsonFormatter, LoggingPipeline, _parse_levels
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_pipeline_flushes_queued_records_as_json_with_request_id():
+    """Records logged during a request carry its id and are all written when the pipeline stops"""
+    target = ListHandler()
+    target.setFormatter(JsonFormatter())
+    pipeline = LoggingPipeline(target, queue_size=100)
+    pipeline.start()
+    logger = logging.getLogger("survey.tests.pipeline")
+    logger.addHandler(pipeline.queue_handler)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "RATE_LIMIT_ENABLED": False})
+
+    @app.route("/log")
+    def log_something():
+        logger.warning("Survey id=%s", 7)
+        return "ok"
+
+    try:
+        response = app.test_client().get("/log", headers={"X-Request-ID": "req-1"})
+    finally:
+        pipeline.stop()
+        logger.removeHandler(pipeline.queue_handler)
+
+    entry = json.loads(target.lines[-1])
+    assert response.headers["X-Request-ID"] == "req-1"
+    assert entry["message"] == "Survey id=7"
+    assert entry["request_id"] == "req-1"
+    assert entry["task_id"] is None
+
+
+def test_full_queue_drops_and_counts_records():
+    """Logging never blocks: records beyond the queue size are dropped and counted"""
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("survey.tests.dropping")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for index in range(5):
+            logger.warning("record %s", index)
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_parse_levels():
+    """Per-module levels come from a comma separated name=LEVEL list"""
+    assert _parse_levels("survey.services=debug, survey.utils.rate_limit=WARNING,") == {
+        "survey.services": "DEBUG",
+        "survey.utils.rate_limit": "WARNING",
+    }
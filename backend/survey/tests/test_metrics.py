@@ -0,0 +1,63 @@
+import pytest
+from prometheus_client import REGISTRY
+from unittest.mock import Mock
+
+from survey.app import create_app
+from survey.celery_worker import SEND_EMAIL_TASK
+from survey.utils import metrics
+
+
+@pytest.fixture
+def client():
+    return create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "RATE_LIMIT_ENABLED": False}).test_client()
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_recorded_per_resource_and_status(client):
+    """Latency, status counts and in-flight gauges are labelled by resource and method"""
+    labels = {"resource": "pingendpoint", "method": "GET"}
+    before = sample("survey_request_duration_seconds_count", **labels)
+
+    client.get("/survey/ping")
+    client.get("/survey/ping")
+    response = client.get("/survey/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    assert sample("survey_request_duration_seconds_count", **labels) == before + 2
+    assert sample("survey_responses_total", status="200", **labels) >= 2
+    assert sample("survey_requests_in_flight", **labels) == 0
+    assert b'survey_request_duration_seconds_bucket{le="0.005",method="GET",resource="pingendpoint"}' in response.data
+
+
+def test_unmatched_routes_share_one_label(client):
+    """404s do not create a label per requested path"""
+    before = sample("survey_responses_total", resource="unmatched", method="GET", status="404")
+
+    client.get("/no/such/path")
+
+    assert sample("survey_responses_total", resource="unmatched", method="GET", status="404") == before + 1
+
+
+def test_task_signals_record_duration_and_retries():
+    """Tracked tasks get a duration per final state and a retry counter; others are ignored"""
+    task = Mock()
+    task.name = SEND_EMAIL_TASK
+    other = Mock()
+    other.name = "some.other.task"
+    labels = {"task": "send_email_task", "state": "SUCCESS"}
+    before = sample("survey_task_duration_seconds_count", **labels)
+    retries = sample("survey_task_retries_total", task="send_email_task")
+
+    metrics._task_prerun(task_id="1", task=task)
+    metrics._task_postrun(task_id="1", task=task, state="SUCCESS")
+    metrics._task_prerun(task_id="2", task=other)
+    metrics._task_postrun(task_id="2", task=other, state="SUCCESS")
+    metrics._task_retry(sender=task)
+
+    assert sample("survey_task_duration_seconds_count", **labels) == before + 1
+    assert sample("survey_task_retries_total", task="send_email_task") == retries + 1
+    assert metrics._task_started_at == {}
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from survey.celery_worker import PUBLISH_SURVEY_TASK, SEND_EMAIL_TASK
+from survey.extensions import db
+from survey.models.models import OutboxMessage, Survey
+from survey.services.outbox_service import OutboxService
+
+
+def test_messages_share_the_callers_transaction(app):
+    """A rolled back change leaves no task behind, and nothing reaches the broker before the relay"""
+    with app.app_context(), patch("survey.services.outbox_service.send_task") as send_task:
+        outbox = OutboxService(db.session)
+        outbox.enqueue(PUBLISH_SURVEY_TASK, args=[1], countdown=60)
+        db.session.rollback()
+        assert OutboxMessage.query.count() == 0
+
+        outbox.enqueue_many(PUBLISH_SURVEY_TASK, [[1], [2]], countdown=60)
+        db.session.commit()
+        assert [message.args for message in OutboxMessage.query.order_by(OutboxMessage.id)] == [[1], [2]]
+        send_task.assert_not_called()
+
+
+def test_share_queues_email(app):
+    """Sharing a survey responds without waiting on the broker"""
+    with app.app_context():
+        db.session.add(Survey(title="Shared"))
+        db.session.commit()
+
+    response = app.test_client().post("/surveys/1/share", json={"emails": ["a@example.com"], "survey_link": "http://localhost/s/1"})
+
+    assert response.status_code == 200
+    with app.app_context():
+        message = OutboxMessage.query.one()
+        assert message.task_name == SEND_EMAIL_TASK
+        assert message.kwargs["recipients"] == ["a@example.com"]
+
+
+def test_relay_sends_with_eta_and_stable_task_id(app):
+    """Messages are sent once, with their eta and a task id derived from the row"""
+    with app.app_context():
+        outbox = OutboxService(db.session)
+        outbox.enqueue(PUBLISH_SURVEY_TASK, args=[1], countdown=60)
+        outbox.enqueue(SEND_EMAIL_TASK, kwargs={"subject": "Hi"})
+        db.session.commit()
+
+        with patch("survey.services.outbox_service.send_task") as send_task:
+            assert outbox.relay_pending(batch_size=1) == {"sent": 2, "failed": 0}
+            assert outbox.relay_pending() == {"sent": 0, "failed": 0}
+
+        first, second = send_task.call_args_list
+        assert first.args == (PUBLISH_SURVEY_TASK,)
+        assert first.kwargs["task_id"] == "outbox-1"
+        assert first.kwargs["eta"] is not None
+        assert second.kwargs["kwargs"] == {"subject": "Hi"} and second.kwargs["eta"] is None
+
+
+def test_broker_failure_backs_off_and_keeps_messages(app):
+    """A broker error stops the batch and the message is retried later"""
+    with app.app_context():
+        outbox = OutboxService(db.session)
+        outbox.enqueue(PUBLISH_SURVEY_TASK, args=[1])
+        outbox.enqueue(PUBLISH_SURVEY_TASK, args=[2])
+        db.session.commit()
+
+        with patch("survey.services.outbox_service.send_task", side_effect=ConnectionError("down")) as send_task:
+            assert outbox.relay() == {"sent": 0, "failed": 1}
+            assert outbox.relay() == {"sent": 0, "failed": 1}
+            assert outbox.relay() == {"sent": 0, "failed": 0}
+        assert [call.kwargs["args"] for call in send_task.call_args_list] == [[1], [2]]
+
+        failed = db.session.get(OutboxMessage, 1)
+        assert (failed.attempts, failed.last_error, failed.sent_at) == (1, "down", None)
+        assert failed.available_at > datetime.utcnow()
+
+        for message in OutboxMessage.query:
+            message.available_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        with patch("survey.services.outbox_service.send_task"):
+            assert outbox.relay() == {"sent": 2, "failed": 0}
+
+
+def test_purge_deletes_only_old_sent_messages(app):
+    with app.app_context():
+        outbox = OutboxService(db.session)
+        old, recent, pending = (outbox.enqueue(SEND_EMAIL_TASK) for _ in range(3))
+        old.sent_at = datetime.utcnow() - timedelta(days=10)
+        recent.sent_at = datetime.utcnow()
+        db.session.commit()
+
+        assert outbox.purge(older_than_days=7) == 1
+        assert OutboxMessage.query.count() == 2
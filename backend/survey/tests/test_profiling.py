@@ -0,0 +1,74 @@
+import json
+import pstats
+
+import pytest
+
+from survey.app import create_app
+from survey.extensions import db
+
+
+def make_app(tmp_path, **config):
+    app = create_app(dict({
+        "SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "RATE_LIMIT_ENABLED": False,
+        "PROFILING_DIR": str(tmp_path),
+    }, **config))
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.mark.parametrize("mode, extension", [("sampling", "collapsed"), ("cprofile", "prof")])
+def test_token_profiles_request_with_sql_summary(tmp_path, mode, extension):
+    """A request carrying the token is profiled and its SQL time is summarized"""
+    client = make_app(tmp_path, PROFILING_TOKEN="secret", PROFILING_MODE=mode, PROFILING_INTERVAL=0.001).test_client()
+
+    response = client.get("/surveys", headers={"X-Profile": "secret"})
+
+    profile_id = response.headers["X-Profile-Id"]
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert summary["endpoint"] == "surveyapi"
+    assert summary["status"] == 200
+    assert summary["sql_count"] >= 1
+    assert summary["slowest_statements"][0]["statement"].startswith("SELECT")
+    assert (tmp_path / f"{profile_id}.{extension}").exists()
+    if mode == "cprofile":
+        assert pstats.Stats(str(tmp_path / f"{profile_id}.prof")).total_calls > 0
+
+
+def test_requests_without_valid_token_are_not_profiled(tmp_path):
+    """A missing or wrong token leaves the request unprofiled"""
+    client = make_app(tmp_path, PROFILING_TOKEN="secret").test_client()
+
+    assert "X-Profile-Id" not in client.get("/survey/ping").headers
+    assert "X-Profile-Id" not in client.get("/survey/ping?__profile=wrong").headers
+    assert "X-Profile-Id" in client.get("/survey/ping?__profile=secret").headers
+
+
+def test_non_ascii_tokens_are_rejected_not_errors(tmp_path):
+    """A token the client sends with non-ASCII characters is simply a wrong token"""
+    client = make_app(tmp_path, PROFILING_TOKEN="secret").test_client()
+
+    by_query = client.get("/survey/ping?__profile=%C3%A9")
+    by_header = client.get("/survey/ping", headers={"X-Profile": "sécret"})
+
+    assert (by_query.status_code, by_header.status_code) == (200, 200)
+    assert "X-Profile-Id" not in by_query.headers
+    assert "X-Profile-Id" not in by_header.headers
+
+
+def test_sampled_profiles_are_rotated(tmp_path):
+    """Sampling profiles every request at rate 1 and keeps only the newest files"""
+    client = make_app(tmp_path, PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_FILES=2).test_client()
+
+    ids = [client.get("/survey/ping").headers["X-Profile-Id"] for _ in range(4)]
+
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == sorted(set(ids))[-2:]
+
+
+def test_disabled_profiler_registers_no_hooks(tmp_path):
+    """Without a token or sample rate the profiler adds nothing to the request path"""
+    app = make_app(tmp_path)
+    profiler = app.extensions["profiler"]
+
+    assert profiler._start not in app.before_request_funcs.get(None, [])
@@ -0,0 +1,76 @@
+import fakeredis
+import pytest
+import redis
+from flask import Flask
+from flask_restful import Api, Resource
+from unittest.mock import Mock
+
+from survey.utils.rate_limit import RateLimit, RateLimiter
+
+
+class SubmitResource(Resource):
+    def post(self, survey_id):
+        return {"survey_id": survey_id}, 201
+
+
+@pytest.fixture
+def policy():
+    return RateLimit(capacity=2, refill_rate=0.5, key_func=lambda: ["bucket"])
+
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.FakeRedis()
+
+
+def test_redis_bucket_rejects_after_capacity(fake_redis, policy):
+    """The Lua token bucket allows `capacity` hits and then reports how long to wait"""
+    limiter = RateLimiter(redis_client=fake_redis)
+
+    assert limiter.hit(["a"], policy) == (True, 0)
+    assert limiter.hit(["a"], policy) == (True, 0)
+    allowed, retry_after = limiter.hit(["a"], policy)
+
+    assert allowed is False
+    assert retry_after == 2
+    assert fake_redis.ttl("ratelimit:a") > 0
+
+
+def test_redis_bucket_consumes_only_when_all_keys_allow(fake_redis, policy):
+    """A request rejected by one bucket does not drain the others"""
+    limiter = RateLimiter(redis_client=fake_redis)
+    limiter.hit(["email"], policy)
+    limiter.hit(["email"], policy)
+
+    assert limiter.hit(["ip", "email"], policy)[0] is False
+    assert limiter.hit(["ip"], policy) == (True, 0)
+    assert limiter.hit(["ip"], policy) == (True, 0)
+
+
+def test_falls_back_to_local_buckets_when_redis_is_down(policy):
+    """Redis errors switch the limiter to in-process buckets instead of failing the request"""
+    broken_redis = Mock()
+    broken_redis.register_script.return_value = Mock(side_effect=redis.ConnectionError("down"))
+    limiter = RateLimiter(redis_client=broken_redis)
+
+    assert limiter.hit(["a"], policy) == (True, 0)
+    assert limiter.hit(["a"], policy) == (True, 0)
+    assert limiter.hit(["a"], policy)[0] is False
+    assert broken_redis.register_script.return_value.call_count == 1
+
+
+def test_limited_route_returns_429_with_retry_after(fake_redis):
+    """Limited routes answer 429 with Retry-After before reaching the resource"""
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_resource(SubmitResource, "/surveys/<int:survey_id>/submit")
+    limiter = RateLimiter(app, redis_client=fake_redis)
+    limiter.limit(SubmitResource, ["POST"], capacity=1, refill_rate=0.1)
+    client = app.test_client()
+
+    assert client.post("/surveys/1/submit", json={"respondent_email": "a@b.c"}).status_code == 201
+    response = client.post("/surveys/1/submit", json={"respondent_email": "a@b.c"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert client.post("/surveys/2/submit", json={}).status_code == 201
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from survey.extensions import db
+from survey.models.models import ArchivedRespondent, Response
+from survey.services.archive_service import ArchiveService
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"ARCHIVE_DIR": str(tmp_path / "archive")}
+
+
+@pytest.fixture
+def app(app):
+    client = app.test_client()
+    client.post("/surveys", json={"title": "One each", "dedupe_respondents": True})
+    client.post("/surveys", json={"title": "Open"})
+    return app
+
+
+def submit(client, survey_id, email):
+    return client.post(f"/surveys/{survey_id}/submit", json={
+        "survey_id": survey_id, "answers": [], "respondent_email": email,
+    })
+
+
+def test_duplicate_respondent_is_rejected_by_the_constraint(app):
+    """Emails are normalized, so case and spaces do not get around the dedupe"""
+    client = app.test_client()
+
+    first = submit(client, 1, "Ann@Example.com")
+    assert first.status_code == 201
+    assert "respondent_email_hash" not in first.get_json()
+    assert submit(client, 1, "  ann@example.COM ").status_code == 409
+    assert submit(client, 1, "bob@example.com").status_code == 201
+    assert submit(client, 1, None).status_code == 201
+    assert submit(client, 1, None).status_code == 201
+    # Surveys without dedupe accept any number of responses per email
+    assert submit(client, 2, "ann@example.com").status_code == 201
+    assert submit(client, 2, "ann@example.com").status_code == 201
+    with app.app_context():
+        assert db.session.query(Response).filter(Response.survey_id == 1).count() == 4
+
+
+def test_enabling_dedupe_keeps_existing_duplicates(app):
+    """Turning dedupe on marks each email's first response, so later ones are rejected"""
+    client = app.test_client()
+    submit(client, 2, "ann@example.com")
+    submit(client, 2, "ann@example.com")
+
+    assert client.put("/surveys/2", json={"title": "Open", "dedupe_respondents": True}).status_code == 200
+    assert submit(client, 2, "ANN@example.com").status_code == 409
+
+
+def test_respondent_lookup(app):
+    client = app.test_client()
+    submit(client, 2, "ann@example.com")
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[2])
+    submit(client, 2, "bob@example.com")
+
+    assert client.get("/surveys/2/respondents/Bob@example.com").get_json() == {"survey_id": 2, "answered": True}
+    assert client.get("/surveys/2/respondents/ANN@example.com").get_json()["answered"] is True
+    assert client.get("/surveys/2/respondents/carl@example.com").get_json()["answered"] is False
+    assert client.get("/surveys/9/respondents/ann@example.com").status_code == 404
+
+
+def test_archived_respondents_are_still_rejected(app):
+    """Archiving moves a response out of the unique index, but its respondent is kept for dedupe"""
+    client = app.test_client()
+    submit(client, 1, "ann@example.com")
+    with app.app_context():
+        ArchiveService(db.session).archive(survey_ids=[1])
+        assert db.session.query(Response).count() == 0
+
+    assert submit(client, 1, "Ann@example.com").status_code == 409
+
+    # Archives written before respondents were recorded are indexed by the CLI
+    with app.app_context():
+        db.session.query(ArchivedRespondent).delete()
+        db.session.commit()
+    assert submit(client, 1, "ann@example.com").status_code == 201
+    result = app.test_cli_runner().invoke(args=["survey", "index-archived-respondents"])
+    assert json.loads(result.output.splitlines()[-1]) == {"responses": 1}
+    with app.app_context():
+        assert db.session.query(ArchivedRespondent).count() == 1
+    assert client.delete("/surveys/1").status_code == 200
+    with app.app_context():
+        assert db.session.query(ArchivedRespondent).count() == 0
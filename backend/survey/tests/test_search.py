@@ -0,0 +1,48 @@
+import pytest
+
+from survey.services.search_service import build_query
+
+SURVEYS = [
+    {"title": "Customer satisfaction", "description": "Quarterly pulse",
+     "questions": [{"text": "How likely are you to recommend us?", "type": "text"}]},
+    {"title": "Employee onboarding", "description": "Feedback on the first week, customer facing teams",
+     "questions": [{"text": "Was your laptop ready?", "type": "text"}]},
+    {"title": "Office lunch", "description": "Menu poll",
+     "questions": [{"text": "Favourite customer dish?", "type": "text"}]},
+]
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    for survey in SURVEYS:
+        client.post("/surveys", json=survey)
+    return client
+
+
+def test_results_are_ranked_and_paginated(client):
+    """Title matches outrank description matches, which outrank question matches"""
+    first = client.get("/surveys/search?q=customer&per_page=2").get_json()
+    second = client.get("/surveys/search?q=customer&per_page=2&page=2").get_json()
+
+    assert first["total"] == 3
+    assert [survey["title"] for survey in first["results"]] == ["Customer satisfaction", "Employee onboarding"]
+    assert [survey["title"] for survey in second["results"]] == ["Office lunch"]
+    assert "questions" not in first["results"][0]
+
+
+def test_index_follows_updates_and_deletes(client):
+    """Question edits, retitles and deletes are visible to the next search"""
+    client.put("/surveys/3", json={"title": "Office lunch", "questions": [{"text": "Vegetarian options?", "type": "text"}]})
+    client.post("/surveys/bulk", json={"action": "retitle", "title": "Archived {title}", "ids": [2]})
+    client.delete("/surveys/1")
+
+    assert client.get("/surveys/search?q=customer").get_json()["total"] == 1
+    assert [survey["id"] for survey in client.get("/surveys/search?q=vegetar").get_json()["results"]] == [3]
+    assert [survey["id"] for survey in client.get("/surveys/search?q=archived onboard").get_json()["results"]] == [2]
+
+
+def test_query_syntax_is_escaped(client):
+    assert client.get('/surveys/search?q="ready" laptop*(').get_json()["total"] == 1
+    assert client.get("/surveys/search?q=!!").status_code == 400
+    assert build_query("postgresql", ["office", "lun"]) == "office & lun:*"
@@ -0,0 +1,162 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from survey.extensions import db
+from survey.models.models import Response, Survey, SurveyShard
+from survey.utils.sharding import placement
+
+SHARDS = 3
+ID_BLOCK = 1000
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        "SHARD_DATABASE_URIS": [f"sqlite:///{tmp_path / f'shard{shard}.db'}" for shard in range(SHARDS)],
+        "SHARD_ID_BLOCK": ID_BLOCK,
+        "SHARD_DIRECTORY_TTL": 0,
+        "ARCHIVE_DIR": str(tmp_path / "archive"),
+    }
+
+
+@pytest.fixture
+def app(app):
+    with app.app_context():
+        app.extensions["shard_router"].init_shards()
+    return app
+
+
+def create_surveys(client, count):
+    return [
+        client.post("/surveys", json={
+            "title": f"Survey {index}",
+            "questions": [{"text": "Color", "type": "text", "order": 0}],
+        }).get_json()
+        for index in range(count)
+    ]
+
+
+def submit(client, survey_id, answer="Red"):
+    return client.post(f"/surveys/{survey_id}/submit", json={
+        "survey_id": survey_id, "answers": [{"question": "Color", "answer": answer}],
+    }).get_json()
+
+
+def shard_counts(app, model):
+    router = app.extensions["shard_router"]
+    with app.app_context():
+        return router.fan_out(lambda session: session.query(model).count())
+
+
+def test_surveys_are_placed_by_hash_and_read_back_from_their_shard(app):
+    """Ids come from the directory, rows live on the hashed shard only"""
+    client = app.test_client()
+    surveys = create_surveys(client, 12)
+
+    assert [survey["id"] for survey in surveys] == list(range(1, 13))
+    with app.app_context():
+        directory = dict(db.session.query(SurveyShard.survey_id, SurveyShard.shard))
+    assert directory == {survey_id: placement(survey_id, SHARDS) for survey_id in range(1, 13)}
+    assert sum(shard_counts(app, Survey)) == 12
+    assert all(count > 0 for count in shard_counts(app, Survey))
+
+    survey = client.get("/surveys/7").get_json()
+    assert survey["title"] == "Survey 6"
+    assert survey["questions"][0]["text"] == "Color"
+    assert client.get("/surveys/99").status_code == 404
+
+
+@pytest.mark.filterwarnings("error::sqlalchemy.exc.LegacyAPIWarning")
+def test_responses_use_the_shard_id_range(app):
+    """Response ids fall in their shard's range and are found by id alone"""
+    client = app.test_client()
+    create_surveys(client, 6)
+
+    for survey_id in range(1, 7):
+        response_id = submit(client, survey_id)["id"]
+        assert (response_id - 1) // ID_BLOCK == placement(survey_id, SHARDS)
+        assert client.get(f"/responses/{response_id}").get_json()["survey_id"] == survey_id
+
+    assert len(client.get("/surveys/3/submit").get_json()) == 1
+    assert client.get(f"/responses/{SHARDS * ID_BLOCK + 1}").status_code == 404
+
+
+def test_listings_stats_and_search_fan_out_and_merge(app):
+    """Cross-shard reads return every survey in id order"""
+    client = app.test_client()
+    create_surveys(client, 9)
+    submit(client, 4, "Blue")
+
+    listed = client.get("/surveys?fields=title").get_json()
+    stats = client.get("/surveys/stats").get_json()
+    found = client.get("/surveys/search?q=survey&per_page=5&page=2").get_json()
+
+    assert listed == [{"title": f"Survey {index}"} for index in range(9)]
+    assert [entry["survey_id"] for entry in stats] == list(range(1, 10))
+    assert stats[3]["total_responses"] == 1
+    assert found["total"] == 9
+    assert len(found["results"]) == 4
+
+
+def test_bulk_actions_are_split_by_shard(app):
+    """Ids are grouped per shard and filters run on all of them"""
+    client = app.test_client()
+    create_surveys(client, 6)
+
+    unpublished = client.post("/surveys/bulk", json={"action": "unpublish", "ids": [5, 1, 99]}).get_json()
+    deleted = client.post("/surveys/bulk", json={"action": "delete", "filter": {"published": False}}).get_json()
+
+    assert unpublished["results"] == [
+        {"id": 5, "status": "unpublished"},
+        {"id": 1, "status": "unpublished"},
+        {"id": 99, "status": "not_found"},
+    ]
+    assert deleted["affected"] == [1, 5]
+    assert sum(shard_counts(app, Survey)) == 4
+    with app.app_context():
+        assert db.session.get(SurveyShard, 1) is None
+
+
+def test_move_survey_copies_everything_and_frees_the_source(app):
+    """A moved survey keeps its ids, responses and search entry on the new shard"""
+    client = app.test_client()
+    create_surveys(client, 3)
+    response_id = submit(client, 2)["id"]
+    source = placement(2, SHARDS)
+    target = (source + 1) % SHARDS
+    router = app.extensions["shard_router"]
+
+    def late_submit(seconds):
+        # A process still routing by its cached directory entry writes to the source
+        with router.shard_session(source) as session:
+            session.add(Response(survey_id=2, answers=[{"question": "Color", "answer": "Late"}]))
+            session.commit()
+
+    with patch("survey.utils.sharding.time.sleep", side_effect=late_submit):
+        result = app.test_cli_runner().invoke(args=["survey", "move-survey", "2", str(target)])
+
+    assert result.exit_code == 0, result.output
+    moved = json.loads(result.output.splitlines()[-1])  # log lines come first
+    assert (moved["source"], moved["target"]) == (source, target)
+    assert moved["copied"]["response"] == 2
+    with app.app_context():
+        assert router.shard_for(2) == target
+        assert router.fan_out(lambda session: session.get(Survey, 2) is not None) == [
+            shard == target for shard in range(SHARDS)
+        ]
+    assert client.get("/surveys/2").get_json()["title"] == "Survey 1"
+    assert client.get(f"/responses/{response_id}").get_json()["survey_id"] == 2
+    assert client.get("/surveys/search?q=survey").get_json()["total"] == 3
+    assert [response["answers"][0]["answer"] for response in client.get("/surveys/2/submit").get_json()] == ["Red", "Late"]
+    assert sum(shard_counts(app, Response)) == 2
+
+
+def test_move_survey_rejects_unknown_shards_and_surveys(app):
+    """Errors are reported without touching the directory"""
+    create_surveys(app.test_client(), 1)
+    runner = app.test_cli_runner()
+
+    assert "does not exist" in runner.invoke(args=["survey", "move-survey", "1", "7"]).output
+    assert "not found" in runner.invoke(args=["survey", "move-survey", "42", "0"]).output
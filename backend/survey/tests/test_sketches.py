@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+from survey.extensions import db
+from survey.models.models import Response, ResponseSketch
+from survey.utils.sketches import CountMinSketch, HyperLogLog
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "order": 0},
+    {"text": "Why", "type": "text", "order": 1},
+]
+
+
+@pytest.fixture
+def app_config():
+    # Flushed by the tests themselves
+    return {"SKETCH_FLUSH_INTERVAL": 3600}
+
+
+@pytest.fixture
+def app(app):
+    app.test_client().post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    return app
+
+
+def submit(client, email, why):
+    return client.post("/surveys/1/submit", json={"survey_id": 1, "respondent_email": email, "answers": [
+        {"question": "Color", "answer": "Red"},
+        {"question": "Why", "answer": why},
+    ]})
+
+
+def test_hyperloglog_estimates_merge_and_round_trip():
+    """Estimates stay within a few standard errors, and merging halves equals sketching the whole"""
+    first, second, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for index in range(20000):
+        (first if index % 2 else second).add(f"user{index}")
+        whole.add(f"user{index}")
+    first.merge(second)
+    restored = HyperLogLog.from_bytes(first.to_bytes())
+
+    assert abs(whole.estimate() - 20000) <= 3 * whole.relative_error * 20000
+    assert restored.estimate() == whole.estimate()
+    assert len(first.to_bytes()) < 5000
+
+
+def test_count_min_never_undercounts_and_keeps_heavy_hitters():
+    """Frequent values are tracked across merges; counts are upper bounds"""
+    first, second = CountMinSketch(top=3), CountMinSketch(top=3)
+    for index in range(3000):
+        sketch = first if index % 2 else second
+        sketch.add("cheese" if index % 3 == 0 else f"rare {index}")
+        if index % 5 == 0:
+            sketch.add("price")
+    first.merge(second)
+    restored = CountMinSketch.from_bytes(first.to_bytes())
+
+    top = restored.heavy_hitters()
+    assert [answer for answer, _ in top[:2]] == ["cheese", "price"]
+    assert top[0][1] >= 1000 and top[0][1] <= 1000 + restored.epsilon * restored.total
+    assert restored.count("rare 1") >= 1
+    assert restored.total == 3600
+
+
+def test_approximate_stats_come_from_sketches(app):
+    """Each submission updates the sketches once flushed; the stats read them back with error bounds"""
+    client = app.test_client()
+    for index in range(12):
+        assert submit(client, f"user{index % 5}@example.com", ["Cheap", " cheap ", "Fast delivery"][index % 3]).status_code == 201
+    submit(client, None, None)
+    # Submissions only buffer their sketches; the shared rows are merged once per flush
+    assert client.get("/surveys/1/stats?approximate=1").get_json()["total_responses"] == 0
+    assert app.extensions["sketch_buffer"].flush() == 1
+
+    stats = client.get("/surveys/1/stats?approximate=1&days=7").get_json()
+
+    assert stats["total_responses"] == 13
+    assert stats["unique_respondents"] == 5
+    assert [(day["responses"], day["unique_respondents"]) for day in stats["daily"]] == [(13, 5)]
+    assert stats["recent"] == {"days": 7, "unique_respondents": 5}
+    assert list(stats["questions"]) == ["2"]
+    assert stats["questions"]["2"]["answers"] == 12
+    assert stats["questions"]["2"]["distinct_answers"] == 2
+    assert stats["questions"]["2"]["top_answers"] == [
+        {"answer": "cheap", "count": 8}, {"answer": "fast delivery", "count": 4},
+    ]
+    assert stats["error_bounds"] == {"unique_relative_error": 0.0163, "top_answers_confidence": 0.9817}
+    assert "approximate" not in client.get("/surveys/1/stats").get_json()
+    assert client.get("/surveys/1/stats?approximate=1&days=0").status_code == 400
+    assert client.get("/surveys/stats?approximate=1").status_code == 400
+    assert client.get("/surveys/9/stats?approximate=1").status_code == 404
+
+
+def test_bulk_loads_are_sketched_and_rebuild_drops_deleted_responses(app, tmp_path):
+    """Loaded batches update the sketches; a rebuild recounts what is stored"""
+    client = app.test_client()
+    source = tmp_path / "history.ndjson"
+    source.write_text("\n".join(json.dumps({
+        "respondent_email": f"old{index}@example.com", "Why": "Habit", "created_at": f"2020-01-0{index % 3 + 1}",
+    }) for index in range(6)))
+    app.test_cli_runner().invoke(args=["survey", "bulk-load", "1", str(source)])
+
+    loaded = client.get("/surveys/1/stats?approximate=1").get_json()
+    assert (loaded["total_responses"], loaded["unique_respondents"], loaded["daily"]) == (6, 6, [])
+    assert loaded["questions"]["2"]["top_answers"] == [{"answer": "habit", "count": 6}]
+
+    client.delete(f"/responses/{submit(client, 'new@example.com', 'Other').get_json()['id']}")
+    app.extensions["sketch_buffer"].flush()
+    assert client.get("/surveys/1/stats?approximate=1").get_json()["total_responses"] == 7
+    result = app.test_cli_runner().invoke(args=["survey", "rebuild-sketches"])
+
+    assert json.loads(result.output.splitlines()[-1]) == {"surveys": 1, "responses": 6}
+    rebuilt = client.get("/surveys/1/stats?approximate=1").get_json()
+    assert (rebuilt["total_responses"], rebuilt["questions"]["2"]["distinct_answers"]) == (6, 1)
+    assert "not found" in app.test_cli_runner().invoke(args=["survey", "rebuild-sketches", "--survey-id", "5"]).output
+    with app.app_context():
+        assert db.session.query(Response).count() == 6
+
+
+def test_buffered_sketches_skip_rolled_back_and_deleted_surveys(app):
+    """Only committed submissions are buffered, and a survey deleted before the flush is skipped"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Once", "dedupe_respondents": True, "questions": QUESTIONS})
+    answers = [{"question": "Why", "answer": "Because"}]
+    for _ in range(2):
+        client.post("/surveys/2/submit", json={"survey_id": 2, "respondent_email": "ann@example.com", "answers": answers})
+    submit(client, "bob@example.com", "Cheap")
+    client.delete("/surveys/1")
+
+    assert app.extensions["sketch_buffer"].flush() == 1
+    stats = client.get("/surveys/2/stats?approximate=1").get_json()
+    assert (stats["total_responses"], stats["unique_respondents"]) == (1, 1)
+    with app.app_context():
+        assert {row.survey_id for row in db.session.query(ResponseSketch)} == {2}
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from survey.tasks.schedule_publish import publish_survey_task
+from survey.utils.snapshots import SnapshotStore
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "required": True, "order": 0},
+    {"text": "Comment", "type": "text", "order": 1},
+]
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"SNAPSHOT_DIR": str(tmp_path / "snapshots"), "COMPRESSION_MIN_SIZE": 100}
+
+
+def current(app, survey_id):
+    return SnapshotStore.from_app(app).current(survey_id)
+
+
+def test_published_surveys_are_served_from_their_snapshot(app):
+    """The document is rendered at publish time and sent from disk with caching headers"""
+    client = app.test_client()
+    created = client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS}).get_json()
+    digest = current(app, 1)
+    store = SnapshotStore.from_app(app)
+
+    response = client.get("/surveys/1", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/surveys/1", headers={"Accept-Encoding": "identity"})
+    revalidated = client.get("/surveys/1", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+    versioned = client.get(f"/surveys/1/snapshots/{digest}")
+
+    assert {"current", f"{digest}.json", f"{digest}.json.gz"} <= set(os.listdir(os.path.dirname(store.path(1, digest))))
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.headers["Content-Location"] == f"/surveys/1/snapshots/{digest}"
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+    assert plain.get_json()["questions"] == created["questions"]
+    assert plain.get_json()["title"] == "Pizza"
+    assert revalidated.status_code == 304
+    assert versioned.headers["Cache-Control"] == f"public, max-age={app.config['SNAPSHOT_MAX_AGE']}, immutable"
+    assert versioned.get_json() == plain.get_json()
+
+
+def test_edits_replace_the_snapshot_and_unpublished_surveys_lose_it(app):
+    """Each edit switches to a new snapshot, keeping the previous one for in-flight readers"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    first = current(app, 1)
+
+    client.put("/surveys/1", json={"title": "Pasta", "questions": QUESTIONS})
+    second = current(app, 1)
+    assert second != first
+    assert client.get("/surveys/1").get_json()["title"] == "Pasta"
+    assert client.get(f"/surveys/1/snapshots/{first}").get_json()["title"] == "Pizza"
+
+    client.put("/surveys/1", json={"title": "Salad", "questions": QUESTIONS[:1]})
+    assert client.get(f"/surveys/1/snapshots/{first}").status_code == 404
+    assert client.get(f"/surveys/1/snapshots/{second}").status_code == 200
+
+    client.put("/surveys/1", json={"title": "Salad", "published": False, "questions": QUESTIONS[:1]})
+    assert current(app, 1) is None
+    unpublished = client.get("/surveys/1")
+    assert "Content-Location" not in unpublished.headers
+    assert unpublished.get_json()["published"] is False
+
+    client.delete("/surveys/1")
+    assert not os.path.exists(os.path.join(app.config["SNAPSHOT_DIR"], "1"))
+    assert client.get("/surveys/1").status_code == 404
+
+
+def test_scheduled_and_bulk_publishing_keep_snapshots_in_step(app):
+    """The publish task and bulk actions write and remove snapshots after they commit"""
+    client = app.test_client()
+    later = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0).isoformat()
+    client.post("/surveys", json={"title": "Later", "published": False, "questions": QUESTIONS})
+    client.post("/surveys", json={"title": "Now", "questions": QUESTIONS})
+    client.post("/surveys/bulk", json={"action": "schedule", "ids": [1], "scheduled_time": later})
+    assert current(app, 1) is None
+
+    with app.app_context():
+        publish_survey_task.run(1, later)
+    assert client.get("/surveys/1").headers["Content-Location"].startswith("/surveys/1/snapshots/")
+
+    client.post("/surveys/bulk", json={"action": "retitle", "ids": [1, 2], "title": "[Old] {title}"})
+    assert client.get("/surveys/2/snapshots/" + current(app, 2)).get_json()["title"] == "[Old] Now"
+    client.post("/surveys/bulk", json={"action": "unpublish", "ids": [1]})
+    client.post("/surveys/bulk", json={"action": "delete", "ids": [2]})
+    assert (current(app, 1), current(app, 2)) == (None, None)
+
+    client.post("/surveys/bulk", json={"action": "publish", "ids": [1]})
+    result = app.test_cli_runner().invoke(args=["survey", "refresh-snapshots"])
+    assert json.loads(result.output.splitlines()[-1]) == {"surveys": 1}
+    assert current(app, 1) is not None
+
+
+def test_x_sendfile_leaves_the_body_to_the_web_server(app):
+    """With USE_X_SENDFILE only the file path is returned; unknown snapshots are 404"""
+    client = app.test_client()
+    client.post("/surveys", json={"title": "Pizza", "questions": QUESTIONS})
+    app.config["USE_X_SENDFILE"] = True
+
+    response = client.get("/surveys/1", headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["X-Sendfile"] == SnapshotStore.from_app(app).path(1, current(app, 1))
+    assert response.data == b""
+    assert client.get("/surveys/1/snapshots/..").status_code == 404
+    assert client.get("/surveys/1/snapshots/0123456789abcdef").status_code == 404
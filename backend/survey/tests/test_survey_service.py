@@ -128,13 +128,17 @@ class TestSurveyServiceWithFlask:
             with pytest.raises(Exception):
                 survey_service.get_survey(999)
 
-    def test_update_survey_in_app_context(self, survey_service, app_context):
+    def test_update_survey_in_app_context(self, survey_service, app_context, mock_db_session):
         """Test updating a survey in Flask app context"""
         # Create a survey
         survey_data = {"title": "Original Title", "published": True}
         created_survey = survey_service.create_survey(survey_data, [])
 
         assert created_survey.title == "Original Title"
+        assert created_survey.version == 1
+
+        # Simulate survey exists before update
+        mock_db_session.query.return_value.filter.return_value.first.return_value = created_survey
 
         # Update it
         updated_data = {"title": "Updated Title", "published": False}
@@ -142,6 +146,7 @@ class TestSurveyServiceWithFlask:
 
         assert updated_survey.title == "Updated Title"
         assert updated_survey.published is False
+        assert updated_survey.version == 2
 
     def test_delete_survey_in_app_context(self, survey_service, app_context, mock_db_session):
         """Test deleting a survey"""
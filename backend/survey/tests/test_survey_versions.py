@@ -0,0 +1,73 @@
+import pytest
+
+from survey.extensions import db
+from survey.models.models import Question, Response, SurveyVersionQuestion
+
+QUESTIONS = [
+    {"text": "Color", "type": "multiple-choice", "options": ["Red", "Blue"], "order": 0},
+    {"text": "Size", "type": "multiple-choice", "options": ["S", "L"], "order": 1},
+]
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.application = app
+    return client
+
+
+def test_edit_creates_version_sharing_unchanged_questions(client):
+    """Only changed questions get new rows; the old version keeps its definition"""
+    client.post("/surveys", json={"title": "Shirts", "questions": QUESTIONS})
+    first = client.post("/surveys/1/submit", json={"survey_id": 1, "answers": [{"question": "Color", "answer": "Red"}]}).get_json()
+
+    edited = [QUESTIONS[0], {**QUESTIONS[1], "options": ["S", "M", "L"]}]
+    updated = client.put("/surveys/1", json={"title": "Shirts", "questions": edited}).get_json()
+    second = client.post("/surveys/1/submit", json={"survey_id": 1, "answers": [{"question": "Size", "answer": "M"}]}).get_json()
+
+    assert updated["version"] == 2
+    assert (first["survey_version"], second["survey_version"]) == (1, 2)
+    v1 = client.get("/surveys/1/versions/1").get_json()
+    v2 = client.get("/surveys/1/versions/2").get_json()
+    assert v1["questions"][1]["options"] == ["S", "L"]
+    assert v2["questions"][1]["options"] == ["S", "M", "L"]
+    assert v1["questions"][0]["id"] == v2["questions"][0]["id"]
+    assert [entry["version"] for entry in client.get("/surveys/1/versions").get_json()] == [1, 2]
+
+    current = client.get("/surveys/1").get_json()
+    assert [question["options"] for question in current["questions"]] == [["Red", "Blue"], ["S", "M", "L"]]
+    assert client.get("/surveys/1/stats").get_json()["total_questions"] == 2
+    with client.application.app_context():
+        assert db.session.query(Question).count() == 3
+
+
+def test_unchanged_update_keeps_version(client):
+    client.post("/surveys", json={"title": "Shirts", "questions": QUESTIONS})
+    updated = client.put("/surveys/1", json={"title": "Shirts", "published": False, "questions": QUESTIONS})
+
+    assert updated.get_json()["version"] == 1
+
+
+def test_current_definition_is_served_from_the_version_cache(client):
+    """Once cached, a version's questions are not queried again"""
+    client.post("/surveys", json={"title": "Shirts", "questions": QUESTIONS})
+    client.get("/surveys/1")
+    with client.application.app_context():
+        db.session.query(Question).filter(Question.survey_id == 1).update({"text": "Changed behind the cache"})
+        db.session.commit()
+
+    assert client.get("/surveys/1").get_json()["questions"][0]["text"] == "Color"
+
+
+def test_bulk_retitle_and_delete_maintain_versions(client):
+    client.post("/surveys", json={"title": "Shirts", "questions": QUESTIONS})
+    client.post("/surveys/bulk", json={"action": "retitle", "title": "[Old] {title}", "ids": [1]})
+
+    v2 = client.get("/surveys/1/versions/2").get_json()
+    assert v2["title"] == "[Old] Shirts"
+    assert [question["text"] for question in v2["questions"]] == ["Color", "Size"]
+
+    client.post("/surveys/bulk", json={"action": "delete", "ids": [1]})
+    with client.application.app_context():
+        assert db.session.query(SurveyVersionQuestion).count() == 0
+        assert db.session.query(Response).count() == 0
@@ -0,0 +1,240 @@
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# Response types worth compressing; event streams are left alone so events are not held back
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+
+
+def _gzip(data: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _brotli_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        out = compressor.process(chunk)
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def _zstd_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+# Content-Encoding -> (one-shot, streaming) compressors, in order of preference
+CODECS: Dict[str, tuple] = {}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd, _zstd_stream)
+if brotli is not None:
+    CODECS["br"] = (_brotli, _brotli_stream)
+CODECS["gzip"] = (_gzip, _gzip_stream)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """
+    Pick the preferred encoding the client accepts, honouring `q` values.
+
+    Returns:
+        str or None: A key of `CODECS`, or None to send the body uncompressed.
+    """
+    return request.accept_encodings.best_match(list(CODECS))
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return CODECS[encoding][0](data)
+
+
+def compress_stream(chunks: Iterable[Any], encoding: str) -> Iterator[bytes]:
+    """
+    Compress a streamed body incrementally, so memory stays bounded by the codec's window.
+
+    Args:
+        chunks (Iterable): Body chunks as bytes or str.
+        encoding (str): A key of `CODECS`.
+
+    Returns:
+        Iterator[bytes]: Compressed chunks.
+    """
+    encoded = (chunk.encode() if isinstance(chunk, str) else chunk for chunk in chunks)
+    return CODECS[encoding][1](encoded)
+
+
+class CachedBody:
+    """
+    Serialized response body kept with its compressed variants.
+
+    Each variant is compressed on first request and reused afterwards, so hot reads of a
+    cached document skip both serialization and compression.
+    """
+    def __init__(self, data: bytes, mimetype: str = "application/json"):
+        """
+        Args:
+            data (bytes): The uncompressed body.
+            mimetype (str): Content type of the body.
+        """
+        self.data = data
+        self.mimetype = mimetype
+        self._variants: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_json(cls, payload: Any) -> "CachedBody":
+        # Same output as Flask-RESTful's JSON representation
+        return cls((json.dumps(payload) + "\n").encode())
+
+    def encoded(self, encoding: str) -> bytes:
+        """
+        Return the body compressed with `encoding`, compressing it only the first time.
+
+        Args:
+            encoding (str): A key of `CODECS`.
+
+        Returns:
+            bytes: The compressed body.
+        """
+        variant = self._variants.get(encoding)
+        if variant is None:
+            # Concurrent first requests may both compress; either result is kept
+            variant = self._variants[encoding] = compress(self.data, encoding)
+        return variant
+
+    def to_response(self, status: int = 200) -> Response:
+        """
+        Build a response in the client's preferred encoding.
+
+        Args:
+            status (int): HTTP status code.
+
+        Returns:
+            Response: The response, with `Content-Encoding` set when compressed.
+        """
+        encoding = None
+        config = current_app.config
+        if config.get("COMPRESSION_ENABLED", True) and len(self.data) >= config.get("COMPRESSION_MIN_SIZE", 1024):
+            encoding = negotiate_encoding()
+        response = Response(self.encoded(encoding) if encoding else self.data, status=status, mimetype=self.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+class Compression:
+    """
+    Compresses responses in the encoding negotiated from `Accept-Encoding` (zstd, br or gzip).
+
+    Bodies smaller than `COMPRESSION_MIN_SIZE` are sent as is. Streamed responses are
+    compressed chunk by chunk. Responses that already carry a `Content-Encoding`, such as
+    `CachedBody` responses, are left untouched. Register it before other `after_request` hooks
+    (they run in reverse order), so those hooks, e.g. idempotency replay storage, see the
+    uncompressed body.
+    """
+    def __init__(self, app: Flask = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the response hook on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["compression"] = self
+        if not app.config.get("COMPRESSION_ENABLED", True):
+            return
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", 1024)
+        app.after_request(self._compress_response)
+
+    def _compress_response(self, response: Response) -> Response:
+        if (
+            response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or "no-transform" in response.headers.get("Cache-Control", "")
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if not response.is_streamed and response.content_length is not None and response.content_length < self.min_size:
+            return response
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(compress(response.get_data(), encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+def stream_json_array(batches: Iterable[Iterable[Any]]) -> Iterator[str]:
+    """
+    Serialize items as a JSON array one batch at a time.
+
+    Args:
+        batches (Iterable): Batches of JSON-serializable items, e.g. a generator reading rows.
+
+    Returns:
+        Iterator[str]: Chunks of the JSON array, one per non-empty batch.
+    """
+    yield "["
+    first = True
+    for batch in batches:
+        items = [json.dumps(item) for item in batch]
+        if not items:
+            continue
+        yield ("" if first else ",") + ",".join(items)
+        first = False
+    yield "]\n"
@@ -0,0 +1,171 @@
+import contextlib
+import sqlite3
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from flask import Flask, request
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session as OrmSession
+
+from survey.utils.exceptions import DeadlineExceededError
+from survey.utils.metrics import QUERIES_CANCELLED
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite virtual machine instructions between two deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+# SQLSTATE of a statement cancelled by `statement_timeout` (query_canceled)
+POSTGRES_QUERY_CANCELED = "57014"
+
+
+class Budget(NamedTuple):
+    """Time left to a request, as a `time.monotonic()` deadline."""
+    deadline: float
+    resource: str
+    retry_after: int
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("survey_request_budget", default=None)
+
+
+def current_budget() -> Optional[Budget]:
+    """The budget of the request being served, or None outside a budgeted request."""
+    return _budget.get()
+
+
+@contextlib.contextmanager
+def budget_scope(budget: Optional[Budget]) -> Iterator[None]:
+    """
+    Apply a request's budget to the transactions begun in this block, e.g. in a worker thread.
+
+    Args:
+        budget (Budget, optional): The budget, from `current_budget` of the request's thread.
+    """
+    token = _budget.set(budget)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def _exceeded(budget: Budget) -> DeadlineExceededError:
+    QUERIES_CANCELLED.labels(budget.resource).inc()
+    logger.warning("Query of %s cancelled: the request ran out of time", budget.resource)
+    return DeadlineExceededError(budget.retry_after)
+
+
+def _sqlite_connection(connection: Connection) -> Optional[sqlite3.Connection]:
+    driver_connection = connection.connection.driver_connection
+    return driver_connection if isinstance(driver_connection, sqlite3.Connection) else None
+
+
+def _apply_budget(session: OrmSession, transaction, connection: Connection) -> None:
+    """Bound the transaction a session just began by the time its request has left."""
+    budget = _budget.get()
+    if budget is None:
+        return
+    remaining = budget.deadline - time.monotonic()
+    if remaining <= 0:
+        raise _exceeded(budget)
+
+    if connection.dialect.name == "postgresql":
+        # Reset by the server when the transaction ends
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+        return
+    sqlite_connection = _sqlite_connection(connection)
+    if sqlite_connection is not None:
+        deadline = budget.deadline
+        # A non-zero return interrupts the running statement
+        sqlite_connection.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+
+
+def _clear_budget(connection: Connection) -> None:
+    """Remove the SQLite deadline before COMMIT or ROLLBACK, so neither is interrupted."""
+    if connection.dialect.name == "sqlite":
+        sqlite_connection = _sqlite_connection(connection)
+        if sqlite_connection is not None:
+            sqlite_connection.set_progress_handler(None, 0)
+
+
+def _map_cancellation(context) -> None:
+    """Turn a query cancelled by its deadline into a `DeadlineExceededError`."""
+    budget = _budget.get()
+    error = context.original_exception
+    if budget is None:
+        return
+    code = getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)
+    interrupted = isinstance(error, sqlite3.OperationalError) and str(error) == "interrupted"
+    if code == POSTGRES_QUERY_CANCELED or interrupted:
+        raise _exceeded(budget) from error
+
+
+def _listen() -> None:
+    if event.contains(OrmSession, "after_begin", _apply_budget):
+        return
+    event.listen(OrmSession, "after_begin", _apply_budget)
+    event.listen(Engine, "commit", _clear_budget)
+    event.listen(Engine, "rollback", _clear_budget)
+    event.listen(Engine, "handle_error", _map_cancellation)
+
+
+class Deadlines:
+    """
+    Per-route time budgets for Flask-RESTful resources.
+
+    A budgeted request gets a deadline when it starts. Every transaction it begins, including on
+    other shards, is bounded by the time left: `SET LOCAL statement_timeout` on Postgres, a
+    progress handler interrupting the statement on SQLite. A cancelled query, or a transaction
+    begun after the deadline, fails the request with a 503 and `Retry-After`, and is counted in
+    `survey_queries_cancelled`.
+    """
+    def __init__(self, app: Optional[Flask] = None):
+        self._budgets: Dict[Tuple[str, str], float] = {}
+        self.retry_after = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the request hooks on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["deadlines"] = self
+        self.retry_after = app.config.get("DEADLINE_RETRY_AFTER", 5)
+        if not app.config.get("DEADLINES_ENABLED", True):
+            return
+        _listen()
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def limit(self, resource: type, methods: Iterable[str], seconds: float) -> None:
+        """
+        Give a registered resource's methods a time budget.
+
+        Args:
+            resource (type): Flask-RESTful Resource class, already added to the Api.
+            methods (Iterable[str]): HTTP methods to bound, e.g. ["GET"].
+            seconds (float): Time from the start of the request after which its queries are cancelled.
+        """
+        endpoint = getattr(resource, "endpoint", None) or resource.__name__.lower()
+        for method in methods:
+            self._budgets[(endpoint, method.upper())] = seconds
+
+    def budget_for(self, resource: type, method: str) -> Optional[float]:
+        """Seconds of budget of a resource's method, if it has one."""
+        endpoint = getattr(resource, "endpoint", None) or resource.__name__.lower()
+        return self._budgets.get((endpoint, method.upper()))
+
+    def _start_request(self) -> None:
+        seconds = self._budgets.get((request.endpoint, request.method))
+        if seconds is not None:
+            _budget.set(Budget(time.monotonic() + seconds, request.endpoint, self.retry_after))
+
+    @staticmethod
+    def _finish_request(error: Optional[BaseException] = None) -> None:
+        # Worker threads serve many requests; the budget must not outlive this one
+        _budget.set(None)
@@ -1,7 +1,8 @@
 from threading import Thread
+from flask import current_app
 from flask_mail import Mail, Message
 
-from survey.app import mail, app
+from survey.extensions import mail
 
 
 def send_async_email(app, msg):
@@ -12,4 +13,4 @@ def send_async_email(app, msg):
 def send_email(subject, recipients_str, body, html=None):
     recipients = [email.strip() for email in recipients_str.split(',') if email.strip()]
     msg = Message(subject, recipients=recipients, body=body, html=html)
-    Thread(target=send_async_email, args=(app, msg)).start()
+    Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
@@ -0,0 +1,192 @@
+"""
+Embedded SQLite mode, for small single-host deployments without a database server.
+
+With `SQLITE_EMBEDDED` set, every connection is tuned on connect (WAL journal, `synchronous`,
+`mmap_size`, page cache, busy timeout) and writes routed through `ShardRouter.write` run on a
+single writer thread with its own engine. Readers keep the app's engine: in WAL mode they never
+wait for the writer, and the writer never fails with "database is locked" because of them.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession
+
+from survey.extensions import Session, db
+from survey.utils.exceptions import SurveyException
+from survey.utils.metrics import SQLITE_WRITE_BATCH
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+Write = Tuple[Callable[[OrmSession], Any], Future]
+
+
+def tune_connection(dbapi_connection, config: dict) -> None:
+    """Apply the embedded mode's pragmas to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        # Persistent in the database file; cheap once it is set
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={config['synchronous']}")
+        cursor.execute(f"PRAGMA mmap_size={int(config['mmap_size'])}")
+        # Negative: KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(config['cache_size'])}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['busy_timeout'])}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+class EmbeddedSQLite:
+    """
+    Tunes SQLite connections and serializes writes on one thread that group-commits them.
+
+    `run(fn)` queues `fn(session)` and waits for it. The writer thread takes every write queued
+    at that moment (up to `SQLITE_WRITE_BATCH`), runs each in a SAVEPOINT of one `BEGIN
+    IMMEDIATE` transaction, then commits once. A write that raises only rolls back its own
+    savepoint. Results are handed back after the commit, so a caller never sees a write that is
+    not durable. `session.commit()` inside `fn` releases the write's savepoint.
+
+    The thread starts with the first write, so the app can be created before gunicorn forks.
+    Each worker process has its own writer; SQLite still serializes writers across processes,
+    with `busy_timeout` making them wait instead of fail.
+    """
+    def __init__(self, app: Optional[Flask] = None):
+        self.app: Optional[Flask] = None
+        self.engine: Optional[Engine] = None
+        self.max_batch = 256
+        self._queue: "queue.Queue[Write]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Enable the embedded mode on an application when `SQLITE_EMBEDDED` is set.
+
+        Args:
+            app (Flask): The Flask application.
+
+        Raises:
+            RuntimeError: If the database is not an SQLite file, or shards are configured.
+        """
+        if not app.config.get("SQLITE_EMBEDDED"):
+            return
+        if app.config.get("SHARD_DATABASE_URIS"):
+            raise RuntimeError("SQLITE_EMBEDDED cannot be combined with SHARD_DATABASE_URLS")
+        synchronous = str(app.config.get("SQLITE_SYNCHRONOUS", "NORMAL")).upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise RuntimeError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)}")
+
+        with app.app_context():
+            reader = db.engine
+        url = reader.url
+        if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+            raise RuntimeError("SQLITE_EMBEDDED needs an SQLite database file")
+
+        self.app = app
+        self.max_batch = app.config.get("SQLITE_WRITE_BATCH", 256)
+        self._queue = queue.Queue(maxsize=app.config.get("SQLITE_WRITE_QUEUE", 10000))
+        pragmas = {
+            "synchronous": synchronous,
+            "mmap_size": app.config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+            "cache_size": app.config.get("SQLITE_CACHE_SIZE", 64 * 1024),
+            "busy_timeout": app.config.get("SQLITE_BUSY_TIMEOUT", 5000),
+        }
+        event.listen(reader, "connect", lambda dbapi_connection, _: tune_connection(dbapi_connection, pragmas))
+
+        # Same file as the readers (Flask-SQLAlchemy resolves relative paths); one connection
+        self.engine = create_engine(url, pool_size=1, max_overflow=0)
+        event.listen(self.engine, "connect", lambda dbapi_connection, _: self._connect_writer(dbapi_connection, pragmas))
+        # Take the write lock up front: a deferred transaction could not upgrade past another writer
+        event.listen(self.engine, "begin", lambda connection: connection.exec_driver_sql("BEGIN IMMEDIATE"))
+
+        app.extensions["sqlite_writer"] = self
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @staticmethod
+    def _connect_writer(dbapi_connection, pragmas: dict) -> None:
+        # The driver's own transaction handling would break SAVEPOINTs; BEGIN is emitted above
+        dbapi_connection.isolation_level = None
+        tune_connection(dbapi_connection, pragmas)
+
+    def _after_fork(self) -> None:
+        # Threads are not inherited; writes queued in the parent stay with the parent
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._started = False
+        if self.engine is not None:
+            self.engine.dispose(close=False)
+
+    def run(self, fn: Callable[[OrmSession], Any]) -> Any:
+        """
+        Run a write on the writer thread and wait until it is committed.
+
+        Args:
+            fn (Callable): Receives a session; must return plain data, not ORM objects, since
+                the session is closed once it returns.
+
+        Returns:
+            Any: What `fn` returned.
+
+        Raises:
+            SurveyException: If too many writes are waiting (503).
+            Exception: What `fn`, or the commit of its batch, raised.
+        """
+        future: Future = Future()
+        with self._lock:
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True).start()
+        try:
+            self._queue.put_nowait((fn, future))
+        except queue.Full:
+            raise SurveyException("Too many pending writes, please retry later", 503, retry_after=1)
+        return future.result()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self.app.app_context():
+                self._commit(batch)
+
+    def _commit(self, batch: List[Write]) -> None:
+        """Run a batch of writes in one transaction and resolve their futures after the commit."""
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        try:
+            with self.engine.connect() as connection:
+                transaction = connection.begin()
+                for fn, future in batch:
+                    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+                        try:
+                            outcomes.append((future, True, fn(session)))
+                        except Exception as e:
+                            session.rollback()
+                            outcomes.append((future, False, e))
+                transaction.commit()
+        except Exception as e:
+            logger.exception("Group commit of %s writes failed", len(batch))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        SQLITE_WRITE_BATCH.observe(len(batch))
+        for future, succeeded, value in outcomes:
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -1,10 +1,35 @@
 from werkzeug.exceptions import HTTPException
 
+
+def error_body(message) -> dict:
+    """JSON body of an error response, the same on the Flask app and the ASGI routes."""
+    return {"status": "error", "message": message}
+
+
 class SurveyException(HTTPException):
-    def __init__(self, message, status_code=400):
+    def __init__(self, message, status_code=400, retry_after=None):
         super().__init__(description=message)
         self.code = status_code
+        self.retry_after = retry_after
+        # Rendered by Flask-RESTful as the body of errors raised on its routes
+        self.data = error_body(message)
+
+    def get_headers(self, environ=None, scope=None):
+        headers = super().get_headers(environ, scope)
+        if self.retry_after is not None:
+            headers.append(("Retry-After", str(self.retry_after)))
+        return headers
 
 class SurveyNotFoundError(SurveyException):
     def __init__(self, survey_id):
         super().__init__(f"Survey {survey_id} not found", 404)
+
+
+class RateLimitExceededError(SurveyException):
+    def __init__(self, retry_after):
+        super().__init__("Too many requests, please retry later", 429, retry_after)
+
+
+class DeadlineExceededError(SurveyException):
+    def __init__(self, retry_after):
+        super().__init__("The request ran out of time, please retry later", 503, retry_after)
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+import redis
+from flask import Flask, Response as FlaskResponse, g, request
+from sqlalchemy.exc import IntegrityError
+
+from survey.models.models import IdempotencyKey
+from survey.utils.exceptions import SurveyException
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 200
+
+# Seconds an in-progress claim blocks duplicates before it is considered abandoned.
+PENDING_TTL = 60
+
+# Seconds to stay on the SQL store after a Redis failure before trying Redis again.
+REDIS_RETRY_INTERVAL = 5.0
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RedisIdempotencyStore:
+    """Idempotency records kept in Redis as JSON strings with a TTL."""
+    def __init__(self, client: redis.Redis, prefix: str = "idempotency"):
+        self.client = client
+        self.prefix = prefix
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim `key` for the current request.
+
+        Args:
+            key (str): Scoped idempotency key.
+            fingerprint (str): Hash of the request.
+
+        Returns:
+            dict or None: None when the key was claimed, otherwise the existing record.
+        """
+        record = json.dumps({"fingerprint": fingerprint, "status_code": None})
+        if self.client.set(f"{self.prefix}:{key}", record, nx=True, ex=PENDING_TTL):
+            return None
+        return self.get(key) or self.claim(key, fingerprint)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(f"{self.prefix}:{key}")
+        return json.loads(raw) if raw else None
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str, mimetype: str, ttl: int) -> None:
+        record = {"fingerprint": fingerprint, "status_code": status_code, "body": body, "mimetype": mimetype}
+        self.client.set(f"{self.prefix}:{key}", json.dumps(record), ex=ttl)
+
+    def release(self, key: str) -> None:
+        self.client.delete(f"{self.prefix}:{key}")
+
+
+class SqlIdempotencyStore:
+    """Idempotency records kept in the `idempotency_key` table, used when Redis is unavailable."""
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+
+    def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        now = _utcnow()
+        with self.session_factory() as session:
+            query = session.query(IdempotencyKey).filter(IdempotencyKey.expires_at < now)
+            if random.random() < 0.01:
+                # Opportunistically purge every expired key, not just this one
+                query.delete()
+            else:
+                query.filter(IdempotencyKey.key == key).delete()
+            session.add(IdempotencyKey(
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=PENDING_TTL),
+            ))
+            try:
+                session.commit()
+                return None
+            except IntegrityError:
+                session.rollback()
+        return self.get(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.session_factory() as session:
+            row = session.get(IdempotencyKey, key)
+            if row is None or row.expires_at < _utcnow():
+                return None
+            return {
+                "fingerprint": row.fingerprint,
+                "status_code": row.status_code,
+                "body": row.body,
+                "mimetype": row.mimetype,
+            }
+
+    def complete(self, key: str, fingerprint: str, status_code: int, body: str, mimetype: str, ttl: int) -> None:
+        with self.session_factory() as session:
+            session.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+                IdempotencyKey.status_code: status_code,
+                IdempotencyKey.body: body,
+                IdempotencyKey.mimetype: mimetype,
+                IdempotencyKey.expires_at: _utcnow() + timedelta(seconds=ttl),
+            })
+            session.commit()
+
+    def release(self, key: str) -> None:
+        with self.session_factory() as session:
+            session.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete()
+            session.commit()
+
+
+class Idempotency:
+    """
+    `Idempotency-Key` support for Flask-RESTful resources.
+
+    The first request carrying a key claims it and runs normally; its status and body are then
+    stored for `IDEMPOTENCY_TTL` seconds and replayed to retries without running the resource again.
+    A duplicate arriving while the first is still running waits up to `IDEMPOTENCY_WAIT_SECONDS`
+    for it to finish and is otherwise rejected with 409. Records live in Redis, or in the
+    `idempotency_key` table while Redis is unreachable.
+    """
+    def __init__(self, app: Optional[Flask] = None, session_factory: Optional[Callable] = None,
+                 redis_client: Optional[redis.Redis] = None):
+        """
+        Args:
+            app (Flask, optional): Application to register the hooks on.
+            session_factory (Callable, optional): Session factory of the SQL fallback store.
+            redis_client (redis.Redis, optional): Client of the primary store. Built from
+                `IDEMPOTENCY_REDIS_URL` on `init_app` when omitted.
+        """
+        self.redis_store = RedisIdempotencyStore(redis_client) if redis_client is not None else None
+        self.sql_store = SqlIdempotencyStore(session_factory) if session_factory is not None else None
+        self.ttl = 24 * 60 * 60
+        self.wait_seconds = 2.0
+        self._protected: Set[Tuple[str, str]] = set()
+        self._redis_down_until = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the request hooks on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        if self.redis_store is None and app.config.get("IDEMPOTENCY_REDIS_URL"):
+            self.redis_store = RedisIdempotencyStore(redis.Redis.from_url(
+                app.config["IDEMPOTENCY_REDIS_URL"],
+                socket_timeout=0.1,
+                socket_connect_timeout=0.1,
+            ))
+        self.ttl = app.config.get("IDEMPOTENCY_TTL", self.ttl)
+        self.wait_seconds = app.config.get("IDEMPOTENCY_WAIT_SECONDS", self.wait_seconds)
+        app.extensions["idempotency"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def protect(self, resource: type, methods: Iterable[str]) -> None:
+        """
+        Honour `Idempotency-Key` on the given methods of a registered resource.
+
+        Args:
+            resource (type): Flask-RESTful Resource class, already added to the Api.
+            methods (Iterable[str]): HTTP methods to protect, e.g. ["POST"].
+        """
+        endpoint = getattr(resource, "endpoint", None) or resource.__name__.lower()
+        for method in methods:
+            self._protected.add((endpoint, method.upper()))
+
+    def _call(self, operation: str, *args):
+        """Run a store operation on Redis, falling back to SQL when Redis fails."""
+        if self.redis_store is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return getattr(self.redis_store, operation)(*args)
+            except redis.RedisError as e:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning("Idempotency store falling back to SQL: %s", e)
+        if self.sql_store is None:
+            raise SurveyException("Idempotency store unavailable", 503)
+        return getattr(self.sql_store, operation)(*args)
+
+    def _before_request(self) -> Optional[FlaskResponse]:
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key or (request.endpoint, request.method) not in self._protected:
+            return None
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            raise SurveyException(f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+        key = f"{request.endpoint}:{idempotency_key}"
+        fingerprint = hashlib.sha256(
+            request.method.encode() + request.path.encode() + request.get_data()
+        ).hexdigest()
+
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            record = self._call("claim", key, fingerprint)
+            if record is None:
+                g.idempotency_claim = (key, fingerprint)
+                return None
+            if record["fingerprint"] != fingerprint:
+                raise SurveyException(f"{IDEMPOTENCY_HEADER} was already used with a different request", 422)
+            if record["status_code"] is not None:
+                response = FlaskResponse(record["body"], status=record["status_code"], mimetype=record["mimetype"])
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if time.monotonic() >= deadline:
+                raise SurveyException("A request with this Idempotency-Key is still in progress", 409, retry_after=1)
+            time.sleep(0.05)
+
+    def _after_request(self, response: FlaskResponse) -> FlaskResponse:
+        claim = g.pop("idempotency_claim", None)
+        if claim is None:
+            return response
+        key, fingerprint = claim
+        try:
+            if response.status_code >= 500 or response.is_streamed:
+                self._call("release", key)
+            else:
+                self._call("complete", key, fingerprint, response.status_code,
+                           response.get_data(as_text=True), response.mimetype, self.ttl)
+        except Exception as e:
+            logger.error("Failed to store idempotency record %s: %s", key, e)
+        return response
+
+    def _teardown_request(self, exc: Optional[BaseException]) -> None:
+        claim = g.pop("idempotency_claim", None)
+        if claim is None:
+            return
+        try:
+            self._call("release", claim[0])
+        except Exception as e:
+            logger.error("Failed to release idempotency key %s: %s", claim[0], e)
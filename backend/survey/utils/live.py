@@ -0,0 +1,379 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import redis
+from flask import Flask, current_app
+
+from survey.utils.metrics import LIVE_SUBSCRIBERS
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+CHANNEL_PREFIX = "survey-live:"
+# Seconds to deliver updates in-process only after a Redis failure before trying Redis again.
+REDIS_RETRY_INTERVAL = 5.0
+# Sent as the SSE `retry` field: milliseconds an EventSource waits before reconnecting
+CLIENT_RETRY_MS = 3000
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def merge_update(target: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    """
+    Add a response delta (or a merged update) to an update in place.
+
+    Both have the shape `{"survey_id", "responses": n, "answers": {question_id: {answer: n}}}`.
+    """
+    target["responses"] = target.get("responses", 0) + delta.get("responses", 0)
+    answers = target.setdefault("answers", {})
+    for question_id, counts in delta.get("answers", {}).items():
+        merged = answers.setdefault(str(question_id), {})
+        for answer, count in counts.items():
+            merged[answer] = merged.get(answer, 0) + count
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _noop() -> None:
+    pass
+
+
+class Subscription:
+    """
+    One client's pending update.
+
+    Updates delivered while the client is still writing the previous one are merged rather than
+    queued, so a slow client costs one dict however far behind it falls, and loses no counts.
+
+    A subscription is made before its snapshot is read, and buffers deltas until `start` gives it
+    the snapshot's last response id. Deltas of responses up to that id are already counted in the
+    snapshot and are dropped; later ones become updates.
+    """
+    def __init__(self, survey_id: int):
+        """
+        Args:
+            survey_id (int): The survey followed.
+        """
+        self.survey_id = survey_id
+        self.after_id: Optional[int] = None
+        self.closed = False
+        self._notify: Callable[[], None] = _noop
+        self._buffer: List[Dict[str, Any]] = []
+        self._pending: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _merge(self, update: Dict[str, Any]) -> None:
+        if self._pending is None:
+            self._pending = {"survey_id": self.survey_id, "responses": 0, "answers": {}}
+        merge_update(self._pending, update)
+
+    def start(self, after_id: Optional[int]) -> None:
+        """
+        Begin updates after the snapshot the client is sent first.
+
+        Args:
+            after_id (int, optional): Highest response id counted in the snapshot.
+        """
+        with self._lock:
+            self.after_id = after_id or 0
+            buffered, self._buffer = self._buffer, []
+            for delta in buffered:
+                if delta["response_id"] > self.after_id:
+                    self._merge(delta)
+            pending = self._pending is not None
+        if pending:
+            self._notify()
+
+    def listen(self, notify: Callable[[], None]) -> None:
+        """
+        Set the callback run, from the flusher thread, whenever an update is pending.
+
+        Args:
+            notify (Callable): The callback; run at once if an update is already pending.
+        """
+        with self._lock:
+            self._notify = notify
+            pending = self._pending is not None
+        if pending:
+            notify()
+
+    def deliver(self, update: Dict[str, Any], deltas: List[Dict[str, Any]], first_id: int) -> None:
+        """
+        Add a flush's deltas of the survey.
+
+        Args:
+            update (dict): The deltas merged, shared by every subscriber.
+            deltas (list): The deltas themselves, for subscribers whose snapshot counts some of them.
+            first_id (int): Lowest response id among the deltas.
+        """
+        with self._lock:
+            if self.after_id is None:
+                self._buffer.extend(deltas)
+                return
+            if first_id > self.after_id:
+                self._merge(update)
+            else:
+                fresh = [delta for delta in deltas if delta["response_id"] > self.after_id]
+                if not fresh:
+                    return
+                for delta in fresh:
+                    self._merge(delta)
+            notify = self._notify
+        notify()
+
+    def take(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
+
+
+class LiveResults:
+    """
+    Fans out live response counts to Server-Sent Events subscribers.
+
+    Every committed response is published once as a delta (one response and its choice answers)
+    on the Redis channel `survey-live:<survey_id>`. Each process listens on all of them with a
+    single pattern subscription and keeps deltas only for surveys it has subscribers for. A
+    flusher thread merges them and delivers at most one update per survey every
+    `LIVE_UPDATE_INTERVAL` seconds. Deltas carry their response id, so a client subscribing
+    while responses come in gets each of them either in its snapshot or in an update (response
+    ids are taken to grow with commit order, which Postgres sequences only nearly guarantee).
+    Without `LIVE_REDIS_URL`, or for `REDIS_RETRY_INTERVAL`
+    seconds after a Redis error, deltas are delivered in-process only, so subscribers of other
+    processes miss them until they reconnect and receive a fresh snapshot.
+
+    The background threads start with the first subscription, so the app can be created before
+    gunicorn forks.
+    """
+    def __init__(self, app: Optional[Flask] = None, redis_client: Optional[redis.Redis] = None):
+        """
+        Args:
+            app (Flask, optional): The Flask application.
+            redis_client (redis.Redis, optional): Pub/sub client. Built from `LIVE_REDIS_URL` when omitted.
+        """
+        self.redis = redis_client
+        self.interval = 1.0
+        self.keepalive = 15.0
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._pending: Dict[int, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._redis_down_until = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Configure the broker on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["live_results"] = self
+        self.interval = app.config.get("LIVE_UPDATE_INTERVAL", 1.0)
+        self.keepalive = app.config.get("LIVE_KEEPALIVE", 15.0)
+        if self.redis is None and app.config.get("LIVE_REDIS_URL"):
+            self.redis = redis.Redis.from_url(
+                app.config["LIVE_REDIS_URL"], socket_connect_timeout=0.5, socket_timeout=0.5,
+            )
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # Threads are not inherited; subscribers of the parent stay with the parent
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._pending = {}
+        self._started = False
+
+    def publish(self, delta: Dict[str, Any]) -> None:
+        """
+        Publish the delta of one committed response. Never raises on broker errors.
+
+        Args:
+            delta (dict): `{"survey_id", "response_id", "responses": 1, "answers": {question_id: {answer: 1}}}`.
+        """
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                self.redis.publish(f"{CHANNEL_PREFIX}{delta['survey_id']}", json.dumps(delta))
+                return
+            except redis.RedisError as e:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning("Live results publish failed, delivering in-process for %ss: %s", REDIS_RETRY_INTERVAL, e)
+        self.receive(delta)
+
+    def receive(self, delta: Dict[str, Any]) -> None:
+        """Queue a delta for the next flush if this process has subscribers for its survey."""
+        survey_id = delta["survey_id"]
+        with self._lock:
+            if survey_id not in self._subscribers:
+                return
+            self._pending.setdefault(survey_id, []).append(delta)
+
+    def flush(self) -> int:
+        """
+        Deliver the merged deltas of every survey to its subscribers.
+
+        Returns:
+            int: Number of surveys updated.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            targets = {survey_id: list(self._subscribers.get(survey_id, ())) for survey_id in pending}
+        for survey_id, deltas in pending.items():
+            update = {"survey_id": survey_id}
+            for delta in deltas:
+                merge_update(update, delta)
+            first_id = min(delta["response_id"] for delta in deltas)
+            for subscription in targets[survey_id]:
+                subscription.deliver(update, deltas, first_id)
+        return len(pending)
+
+    def subscribe(self, survey_id: int) -> Subscription:
+        """
+        Follow a survey's updates; they are buffered until the subscription is started.
+
+        Args:
+            survey_id (int): The survey.
+
+        Returns:
+            Subscription: Pass it to `unsubscribe` when the client goes away.
+        """
+        subscription = Subscription(survey_id)
+        with self._lock:
+            self._subscribers.setdefault(survey_id, set()).add(subscription)
+            if not self._started:
+                self._started = True
+                self._start_threads()
+        LIVE_SUBSCRIBERS.inc()
+        return subscription
+
+    def follow(self, survey_id: int, read_snapshot: Callable[[], Dict[str, Any]]) -> Tuple[Subscription, Dict[str, Any]]:
+        """
+        Subscribe to a survey, then read the snapshot its updates start from.
+
+        Subscribing first means a response committed while the snapshot is read is either in the
+        snapshot or in an update, never in neither.
+
+        Args:
+            survey_id (int): The survey.
+            read_snapshot (Callable): Returns the current totals with their `last_response_id`.
+
+        Returns:
+            tuple: The started subscription and the snapshot.
+        """
+        subscription = self.subscribe(survey_id)
+        try:
+            snapshot = read_snapshot()
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        subscription.start(snapshot.get("last_response_id"))
+        return subscription, snapshot
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop following a survey. Safe to call more than once."""
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            subscribers = self._subscribers.get(subscription.survey_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.survey_id]
+                    self._pending.pop(subscription.survey_id, None)
+        LIVE_SUBSCRIBERS.dec()
+
+    def _start_threads(self) -> None:
+        threading.Thread(target=self._flush_loop, name="live-results-flush", daemon=True).start()
+        if self.redis is not None:
+            threading.Thread(target=self._listen_loop, name="live-results-listen", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Live results flush failed")
+
+    def _listen_loop(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                while True:
+                    message = pubsub.get_message(timeout=self.keepalive)
+                    if message is not None and message["type"] == "pmessage":
+                        self.receive(json.loads(message["data"]))
+            except (redis.RedisError, ValueError) as e:
+                logger.warning("Live results listener failed, reconnecting in %ss: %s", REDIS_RETRY_INTERVAL, e)
+                time.sleep(REDIS_RETRY_INTERVAL)
+
+    def stream(self, subscription: Subscription, snapshot: Dict[str, Any]) -> Iterator[str]:
+        """
+        Server-Sent Events of a survey for a WSGI worker: the snapshot, then merged updates.
+
+        Holds the worker thread for as long as the client stays connected; the ASGI mode serves
+        the same stream from the event loop instead.
+
+        Args:
+            subscription (Subscription): From `follow`; unsubscribed when the stream ends.
+            snapshot (dict): Current totals, sent first as a `snapshot` event.
+
+        Returns:
+            Iterator[str]: SSE chunks, with a comment every `LIVE_KEEPALIVE` seconds while idle.
+        """
+        ready = threading.Event()
+        subscription.listen(ready.set)
+        try:
+            yield f"retry: {CLIENT_RETRY_MS}\n" + sse_event("snapshot", snapshot)
+            while True:
+                if not ready.wait(self.keepalive):
+                    yield ": keepalive\n\n"
+                    continue
+                ready.clear()
+                update = subscription.take()
+                if update is not None:
+                    yield sse_event("update", update)
+        finally:
+            self.unsubscribe(subscription)
+
+    async def astream(self, subscription: Subscription, snapshot: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Same events as `stream`, for the ASGI event loop: an idle client costs no thread.
+
+        Args:
+            subscription (Subscription): From `follow`; unsubscribed when the stream ends.
+            snapshot (dict): Current totals, sent first as a `snapshot` event.
+
+        Returns:
+            AsyncIterator[str]: SSE chunks.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        subscription.listen(lambda: loop.call_soon_threadsafe(ready.set))
+        try:
+            yield f"retry: {CLIENT_RETRY_MS}\n" + sse_event("snapshot", snapshot)
+            while True:
+                try:
+                    await asyncio.wait_for(ready.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                ready.clear()
+                update = subscription.take()
+                if update is not None:
+                    yield sse_event("update", update)
+        finally:
+            self.unsubscribe(subscription)
+
+
+def get_live_results() -> LiveResults:
+    """Return the current application's live results broker."""
+    return current_app.extensions["live_results"]
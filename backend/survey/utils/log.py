@@ -0,0 +1,199 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from flask import Flask, Response, g, has_request_context, request
+
+from survey.utils.metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s"
+REQUEST_ID_HEADER = "X-Request-ID"
+DEFAULT_QUEUE_SIZE = 10000
+
+# Incoming request ids are echoed into logs and headers, so only accept plain tokens
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_pipeline: Optional["LoggingPipeline"] = None
+
+
+def _current_request_id() -> Optional[str]:
+    return g.get("request_id") if has_request_context() else None
+
+
+def _current_task_id() -> Optional[str]:
+    # Only look when Celery is already loaded; web workers never import it for logging
+    state = sys.modules.get("celery._state")
+    task = state.get_current_task() if state else None
+    return task.request.id if task is not None else None
+
+
+class ContextFilter(logging.Filter):
+    """Adds `request_id` and `task_id` to records, in the thread that logged them."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _current_request_id()
+        record.task_id = _current_task_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request and task ids of the record."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "task_id": getattr(record, "task_id", None),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class StderrHandler(logging.StreamHandler):
+    """Writes to whatever `sys.stderr` is when the record is emitted, not when the handler was built."""
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without blocking; when the queue is full the record is dropped and counted."""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class FlushingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Block instead of failing when the queue is full, so stop() always drains it
+        self.queue.put(self._sentinel)
+
+
+class LoggingPipeline:
+    """
+    Moves log output off request threads.
+
+    Loggers put formatted records on a bounded queue and a listener thread writes them to the
+    real handler. The queue and listener are recreated in forked children, since the
+    listener thread does not survive a fork.
+    """
+    def __init__(self, handler: logging.Handler, queue_size: int):
+        self.handler = handler
+        self.queue_size = queue_size
+        self.queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self.queue_handler.addFilter(ContextFilter())
+        self.listener: Optional[FlushingQueueListener] = None
+
+    def start(self) -> None:
+        self.listener = FlushingQueueListener(self.queue_handler.queue, self.handler, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Write out everything still queued and report dropped records."""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        if self.queue_handler.dropped:
+            self.handler.handle(logging.makeLogRecord({
+                "name": "survey",
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "Dropped %s log records because the log queue was full",
+                "args": (self.queue_handler.dropped,),
+            }))
+        self.handler.flush()
+
+    def restart_after_fork(self) -> None:
+        # The parent's queue lock may have been held at fork time, so start from a new queue
+        self.queue_handler.queue = queue.Queue(self.queue_size)
+        self.queue_handler.dropped = 0
+        self.start()
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """Parse `LOG_LEVELS` such as "survey.services=DEBUG,survey.utils.rate_limit=WARNING"."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> "LoggingPipeline":
+    """
+    Set up the `survey` logger hierarchy once per process.
+
+    Reads `LOG_LEVEL` (default INFO), `LOG_LEVELS` (per-module overrides), `LOG_FORMAT`
+    ("text" or "json") and `LOG_QUEUE_SIZE` from the environment.
+
+    Returns:
+        LoggingPipeline: The process's logging pipeline.
+    """
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+
+    handler = StderrHandler()
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    _pipeline = LoggingPipeline(handler, int(os.getenv("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+    _pipeline.start()
+
+    logger = logging.getLogger("survey")
+    logger.addHandler(_pipeline.queue_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    atexit.register(shutdown_logging)
+    os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+    return _pipeline
+
+
+def shutdown_logging(**kwargs) -> None:
+    """Flush queued records. Accepts and ignores signal keyword arguments so it can be a receiver."""
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def init_request_ids(app: Flask) -> None:
+    """
+    Give every request an id, taken from `X-Request-ID` when valid, for logs and the response.
+
+    Args:
+        app (Flask): The Flask application.
+    """
+    @app.before_request
+    def assign_request_id() -> None:
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response: Response) -> Response:
+        if "request_id" in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
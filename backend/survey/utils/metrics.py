@@ -0,0 +1,183 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from survey.celery_worker import PUBLISH_SURVEY_TASK, SEND_EMAIL_TASK
+
+# When set (before prometheus_client is imported), metric values live in mmap-backed files in
+# this directory and `/survey/metrics` sums them over every gunicorn and Celery process.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Short label values for the Celery tasks we track
+TRACKED_TASKS = {
+    SEND_EMAIL_TASK: "send_email_task",
+    PUBLISH_SURVEY_TASK: "publish_survey_task",
+}
+
+REQUEST_LATENCY = Histogram(
+    "survey_request_duration_seconds",
+    "Request latency by Flask-RESTful resource and method.",
+    ["resource", "method"],
+    buckets=REQUEST_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "survey_requests_in_flight",
+    "Requests currently being served.",
+    ["resource", "method"],
+    multiprocess_mode="livesum",
+)
+RESPONSES = Counter(
+    "survey_responses",
+    "Responses by resource, method and status code.",
+    ["resource", "method", "status"],
+)
+TASK_DURATION = Histogram(
+    "survey_task_duration_seconds",
+    "Celery task run time by final state.",
+    ["task", "state"],
+    buckets=TASK_BUCKETS,
+)
+TASK_RETRIES = Counter(
+    "survey_task_retries",
+    "Celery task retries.",
+    ["task"],
+)
+OUTBOX_MESSAGES = Counter(
+    "survey_outbox_messages",
+    "Outbox messages handled by the relay, by result (sent or failed).",
+    ["result"],
+)
+QUERIES_CANCELLED = Counter(
+    "survey_queries_cancelled",
+    "Queries cancelled because their request ran past its time budget, by resource.",
+    ["resource"],
+)
+SQLITE_WRITE_BATCH = Histogram(
+    "survey_sqlite_write_batch_size",
+    "Writes committed together by the embedded SQLite writer thread.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+LIVE_SUBSCRIBERS = Gauge(
+    "survey_live_subscribers",
+    "Clients connected to live results streams.",
+    multiprocess_mode="livesum",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "survey_log_records_dropped",
+    "Log records dropped because the logging queue was full.",
+)
+
+_task_started_at: Dict[str, float] = {}
+_signals_connected = False
+
+
+class Metrics:
+    """
+    Records request latency, in-flight requests and response statuses for every route.
+
+    Hooks are keyed by `request.endpoint`, which Flask-RESTful sets to the lowercased resource
+    name (e.g. `surveyapi`), so label cardinality stays bounded by the number of resources.
+    Register it before other `before_request` hooks so rejected or replayed requests (rate
+    limiting, idempotency) are measured too.
+    """
+    def __init__(self, app: Flask = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the request hooks on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["metrics"] = self
+        app.before_request(self._start_request)
+        app.after_request(self._record_response)
+        app.teardown_request(self._finish_request)
+
+    @staticmethod
+    def _labels() -> Tuple[str, str]:
+        return request.endpoint or "unmatched", request.method
+
+    def _start_request(self) -> None:
+        g.metrics_labels = self._labels()
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.labels(*g.metrics_labels).inc()
+
+    def _record_response(self, response: Response) -> Response:
+        labels = g.get("metrics_labels")
+        if labels is not None:
+            REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - g.metrics_started)
+            RESPONSES.labels(*labels, str(response.status_code)).inc()
+        return response
+
+    def _finish_request(self, exc=None) -> None:
+        labels = g.pop("metrics_labels", None)
+        if labels is not None:
+            REQUESTS_IN_FLIGHT.labels(*labels).dec()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: The payload and its content type.
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _task_prerun(task_id=None, task=None, **kwargs) -> None:
+    if task is not None and task.name in TRACKED_TASKS:
+        _task_started_at[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs) -> None:
+    started = _task_started_at.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(TRACKED_TASKS[task.name], state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+def _task_retry(sender=None, **kwargs) -> None:
+    if sender is not None and sender.name in TRACKED_TASKS:
+        TASK_RETRIES.labels(TRACKED_TASKS[sender.name]).inc()
+
+
+def _worker_process_shutdown(pid=None, **kwargs) -> None:
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def connect_task_signals() -> None:
+    """Record duration and retries of the tracked Celery tasks. Safe to call more than once."""
+    global _signals_connected
+    if _signals_connected:
+        return
+    from celery.signals import task_postrun, task_prerun, task_retry, worker_process_shutdown
+
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
+    task_retry.connect(_task_retry, weak=False)
+    worker_process_shutdown.connect(_worker_process_shutdown, weak=False)
+    _signals_connected = True
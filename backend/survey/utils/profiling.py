@@ -0,0 +1,233 @@
+import contextlib
+import cProfile
+import glob
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_ARG = "__profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Number of slowest statements kept in a profile's summary
+TOP_STATEMENTS = 10
+
+
+class SqlTimer:
+    """Per-thread SQL timing for the requests being profiled."""
+    def __init__(self):
+        self._active: Dict[int, Dict] = {}
+
+    def start(self, thread_id: int) -> None:
+        self._active[thread_id] = {"count": 0, "seconds": 0.0, "statements": [], "current": None}
+
+    def stop(self, thread_id: int) -> Optional[Dict]:
+        return self._active.pop(thread_id, None)
+
+    def current_statement(self, thread_id: int) -> Optional[str]:
+        state = self._active.get(thread_id)
+        return state["current"][1] if state and state["current"] else None
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        state = self._active.get(threading.get_ident())
+        if state is not None:
+            state["current"] = (time.perf_counter(), " ".join(statement.split()))
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        state = self._active.get(threading.get_ident())
+        if state is None or state["current"] is None:
+            return
+        started, text = state["current"]
+        elapsed = time.perf_counter() - started
+        state["current"] = None
+        state["count"] += 1
+        state["seconds"] += elapsed
+        state["statements"].append((elapsed, text))
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval and aggregates collapsed stacks."""
+    def __init__(self, thread_id: int, interval: float, sql_timer: SqlTimer):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.sql_timer = sql_timer
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            statement = self.sql_timer.current_statement(self.thread_id)
+            if statement:
+                stack.append(f"[SQL] {statement[:80]}")
+            self.stacks[";".join(stack)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """
+    Profiles individual requests on demand and writes the results to `PROFILING_DIR`.
+
+    A request is profiled when it carries `PROFILING_TOKEN` in the `X-Profile` header or the
+    `__profile` query argument, or when it is picked by `PROFILING_SAMPLE_RATE`. `PROFILING_MODE`
+    selects a stack sampler writing collapsed stacks (`.collapsed`, flamegraph input) or cProfile
+    writing `.prof` pstats files. Each profile has a `.json` summary with the request, its
+    duration and the time spent in SQL. Only the newest `PROFILING_MAX_FILES` profiles are kept.
+
+    When neither a token nor a sample rate is configured no hooks are registered at all.
+    """
+    def __init__(self, app: Optional[Flask] = None):
+        self.sql_timer = SqlTimer()
+        self._write_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the profiling hooks on an application, if profiling is configured.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        self.token = app.config.get("PROFILING_TOKEN")
+        self.sample_rate = float(app.config.get("PROFILING_SAMPLE_RATE") or 0)
+        self.mode = app.config.get("PROFILING_MODE", "sampling")
+        self.directory = app.config.get("PROFILING_DIR", "/tmp/survey_profiles")
+        self.max_files = int(app.config.get("PROFILING_MAX_FILES", 200))
+        self.interval = float(app.config.get("PROFILING_INTERVAL", 0.005))
+        if self.mode not in ("sampling", "cprofile"):
+            raise ValueError(f"Unknown PROFILING_MODE {self.mode!r}")
+
+        app.extensions["profiler"] = self
+        if not self.token and self.sample_rate <= 0:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        event.listen(Engine, "before_cursor_execute", self.sql_timer.before_execute)
+        event.listen(Engine, "after_cursor_execute", self.sql_timer.after_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+    def _requested(self) -> bool:
+        if self.token:
+            supplied = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_ARG)
+            # Bytes: comparing str raises TypeError on non-ASCII input
+            if supplied and hmac.compare_digest(supplied.encode(), self.token.encode()):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self) -> None:
+        if not self._requested():
+            return
+        thread_id = threading.get_ident()
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active on this interpreter
+                return
+        else:
+            profiler = StackSampler(thread_id, self.interval, self.sql_timer)
+            profiler.start()
+        self.sql_timer.start(thread_id)
+        g.profile = {"profiler": profiler, "thread_id": thread_id, "started": time.perf_counter()}
+
+    def _stop(self) -> Optional[Dict]:
+        state = g.pop("profile", None)
+        if state is None:
+            return None
+        if self.mode == "cprofile":
+            state["profiler"].disable()
+        else:
+            state["profiler"].stop()
+        state["duration"] = time.perf_counter() - state["started"]
+        state["sql"] = self.sql_timer.stop(state["thread_id"])
+        return state
+
+    def _finish(self, response: Response) -> Response:
+        state = self._stop()
+        if state is not None:
+            try:
+                response.headers[PROFILE_ID_HEADER] = self._write(state, response.status_code)
+            except OSError as e:
+                logger.error("Failed to write request profile: %s", e)
+        return response
+
+    def _abandon(self, exc=None) -> None:
+        # after_request did not run (the request failed before a response existed)
+        self._stop()
+
+    def _write(self, state: Dict, status_code: int) -> str:
+        sql = state["sql"] or {"count": 0, "seconds": 0.0, "statements": []}
+        profile_id = (f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}-"
+                      f"{request.endpoint or 'unmatched'}-{request.method.lower()}")
+        base = os.path.join(self.directory, profile_id)
+
+        if self.mode == "cprofile":
+            state["profiler"].dump_stats(f"{base}.prof")
+        else:
+            with open(f"{base}.collapsed", "w") as handle:
+                handle.write(state["profiler"].collapsed())
+
+        summary = {
+            "path": request.full_path.rstrip("?"),
+            "method": request.method,
+            "endpoint": request.endpoint,
+            "status": status_code,
+            "mode": self.mode,
+            "duration_ms": round(state["duration"] * 1000, 2),
+            "sql_ms": round(sql["seconds"] * 1000, 2),
+            "sql_count": sql["count"],
+            "slowest_statements": [
+                {"ms": round(elapsed * 1000, 2), "statement": statement}
+                for elapsed, statement in sorted(sql["statements"], reverse=True)[:TOP_STATEMENTS]
+            ],
+        }
+        with open(f"{base}.json", "w") as handle:
+            json.dump(summary, handle, indent=2)
+
+        self._rotate()
+        logger.info("Profiled %s %s in %sms: %s", request.method, request.path, summary['duration_ms'], profile_id)
+        return profile_id
+
+    def _rotate(self) -> None:
+        with self._write_lock:
+            summaries: List[str] = sorted(glob.glob(os.path.join(self.directory, "*.json")))
+            for summary in summaries[:max(0, len(summaries) - self.max_files)]:
+                base = summary[:-len(".json")]
+                for path in (summary, f"{base}.prof", f"{base}.collapsed"):
+                    # Another worker may be rotating the same directory
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(path)
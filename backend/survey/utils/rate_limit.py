@@ -0,0 +1,239 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+from flask import Flask, request
+
+from survey.utils.exceptions import RateLimitExceededError
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Checks every bucket in KEYS and consumes one token from each only if all of them have one.
+# ARGV: capacity, refill rate (tokens/second), now (unix seconds), key ttl (seconds).
+# Returns {allowed (0/1), seconds to wait as a string}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local t = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if t == nil or ts == nil then
+        t = capacity
+        ts = now
+    end
+    t = math.min(capacity, t + math.max(0, now - ts) * rate)
+    tokens[i] = t
+    if t < 1 then
+        wait = math.max(wait, (1 - t) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, ttl)
+end
+return {1, '0'}
+"""
+
+# Seconds to stay on the in-process buckets after a Redis failure before trying Redis again.
+REDIS_RETRY_INTERVAL = 5.0
+
+# Upper bound of in-process buckets kept before idle ones are pruned.
+MAX_LOCAL_BUCKETS = 10000
+
+
+class RateLimit:
+    """Token bucket policy attached to a resource's HTTP methods."""
+    def __init__(self, capacity: int, refill_rate: float, key_func: Callable[[], List[str]]):
+        """
+        Args:
+            capacity (int): Maximum burst size, i.e. the number of tokens in a full bucket.
+            refill_rate (float): Tokens added back per second.
+            key_func (Callable): Returns the bucket keys for the current request; all must have a token.
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.key_func = key_func
+
+    @property
+    def ttl(self) -> int:
+        """Seconds after which an idle bucket is full again and can be forgotten."""
+        return int(math.ceil(self.capacity / self.refill_rate)) + 1
+
+
+def survey_submit_keys() -> List[str]:
+    """
+    Build the bucket keys of a response submission.
+
+    Every request consumes from the (survey, client IP) bucket and, when the payload carries a
+    `respondent_email`, from the (survey, respondent) bucket as well, so rotating either one
+    alone does not escape the limit.
+
+    Returns:
+        List[str]: Bucket keys for the current request.
+    """
+    survey_id = (request.view_args or {}).get("survey_id")
+    keys = [f"{request.endpoint}:{survey_id}:ip:{request.remote_addr}"]
+
+    data = request.get_json(silent=True)
+    email = data.get("respondent_email") if isinstance(data, dict) else None
+    if email:
+        keys.append(f"{request.endpoint}:{survey_id}:email:{str(email).strip().lower()}")
+    return keys
+
+
+class RateLimiter:
+    """
+    Admission control for Flask-RESTful resources using token buckets.
+
+    Buckets live in Redis and are updated atomically by a Lua script so every worker shares them.
+    When Redis is unreachable the limiter falls back to per-process buckets instead of failing open
+    or blocking requests. Checks run in a `before_request` hook, before any database work.
+    """
+    def __init__(self, app: Optional[Flask] = None, redis_client: Optional[redis.Redis] = None,
+                 prefix: str = "ratelimit"):
+        """
+        Args:
+            app (Flask, optional): Application to register the hook on.
+            redis_client (redis.Redis, optional): Client holding the buckets. Built from
+                `RATE_LIMIT_REDIS_URL` on `init_app` when omitted.
+            prefix (str): Prefix of the Redis keys.
+        """
+        self.redis = redis_client
+        self.prefix = prefix
+        self._limits: Dict[Tuple[str, str], RateLimit] = {}
+        self._script = None
+        self._redis_down_until = 0.0
+        self._local_buckets: Dict[str, Tuple[float, float]] = {}
+        self._local_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the limiter on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        if self.redis is None and app.config.get("RATE_LIMIT_REDIS_URL"):
+            self.redis = redis.Redis.from_url(
+                app.config["RATE_LIMIT_REDIS_URL"],
+                socket_timeout=0.05,
+                socket_connect_timeout=0.05,
+            )
+        app.extensions["rate_limiter"] = self
+        if app.config.get("RATE_LIMIT_ENABLED", True):
+            app.before_request(self._check_request)
+
+    def limit(self, resource: type, methods: Iterable[str], capacity: int, refill_rate: float,
+              key_func: Callable[[], List[str]] = survey_submit_keys) -> None:
+        """
+        Attach a token bucket policy to a registered resource.
+
+        Args:
+            resource (type): Flask-RESTful Resource class, already added to the Api.
+            methods (Iterable[str]): HTTP methods to limit, e.g. ["POST"].
+            capacity (int): Maximum burst size.
+            refill_rate (float): Tokens added back per second.
+            key_func (Callable, optional): Builds the bucket keys of a request.
+        """
+        endpoint = getattr(resource, "endpoint", None) or resource.__name__.lower()
+        policy = RateLimit(capacity, refill_rate, key_func)
+        for method in methods:
+            self._limits[(endpoint, method.upper())] = policy
+
+    def policy_for(self, resource: type, method: str) -> Optional[RateLimit]:
+        """
+        Return the policy attached to a resource's method, if any.
+
+        Args:
+            resource (type): Flask-RESTful Resource class.
+            method (str): HTTP method.
+
+        Returns:
+            RateLimit or None: The configured policy.
+        """
+        endpoint = getattr(resource, "endpoint", None) or resource.__name__.lower()
+        return self._limits.get((endpoint, method.upper()))
+
+    def _check_request(self) -> None:
+        """
+        `before_request` hook rejecting the request when its buckets are empty.
+
+        Raises:
+            RateLimitExceededError: If any bucket of the request has no token left.
+        """
+        policy = self._limits.get((request.endpoint, request.method))
+        if policy is None:
+            return
+        allowed, retry_after = self.hit(policy.key_func(), policy)
+        if not allowed:
+            logger.warning("Rate limit exceeded for %s from %s", request.endpoint, request.remote_addr)
+            raise RateLimitExceededError(retry_after)
+
+    def hit(self, keys: List[str], policy: RateLimit) -> Tuple[bool, int]:
+        """
+        Try to take one token from every bucket in `keys`.
+
+        Args:
+            keys (List[str]): Bucket keys.
+            policy (RateLimit): Capacity and refill rate of the buckets.
+
+        Returns:
+            tuple: Whether the request is allowed, and the seconds to wait before retrying.
+        """
+        keys = [f"{self.prefix}:{key}" for key in keys]
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                return self._hit_redis(keys, policy)
+            except redis.RedisError as e:
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning("Rate limiter falling back to in-process buckets: %s", e)
+        return self._hit_local(keys, policy)
+
+    def _hit_redis(self, keys: List[str], policy: RateLimit) -> Tuple[bool, int]:
+        if self._script is None:
+            self._script = self.redis.register_script(TOKEN_BUCKET_LUA)
+        allowed, wait = self._script(
+            keys=keys,
+            args=[policy.capacity, policy.refill_rate, time.time(), policy.ttl],
+        )
+        return bool(int(allowed)), int(math.ceil(float(wait)))
+
+    def _hit_local(self, keys: List[str], policy: RateLimit) -> Tuple[bool, int]:
+        now = time.monotonic()
+        with self._local_lock:
+            if len(self._local_buckets) > MAX_LOCAL_BUCKETS:
+                self._prune_local(now, policy.ttl)
+
+            tokens = []
+            wait = 0.0
+            for key in keys:
+                current, ts = self._local_buckets.get(key, (policy.capacity, now))
+                current = min(policy.capacity, current + (now - ts) * policy.refill_rate)
+                tokens.append(current)
+                if current < 1:
+                    wait = max(wait, (1 - current) / policy.refill_rate)
+
+            if wait > 0:
+                return False, int(math.ceil(wait))
+
+            for key, current in zip(keys, tokens):
+                self._local_buckets[key] = (current - 1, now)
+            return True, 0
+
+    def _prune_local(self, now: float, ttl: int) -> None:
+        stale = [key for key, (_, ts) in self._local_buckets.items() if now - ts > ttl]
+        for key in stale:
+            del self._local_buckets[key]
@@ -0,0 +1,445 @@
+import heapq
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import create_engine, delete, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session as OrmSession
+
+from survey.extensions import Session, db
+from survey.models.models import Response, Survey, SurveyShard
+from survey.services.search_service import SearchService
+from survey.utils.cache import LRUCache
+from survey.utils.deadlines import budget_scope, current_budget
+from survey.utils.exceptions import SurveyException, SurveyNotFoundError
+from survey.utils.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Tables holding a survey and everything that belongs to it, in insert order. They are copied when
+# a survey moves.
+SURVEY_TABLES = (
+    "survey", "question", "survey_version", "survey_version_question",
+    "response", "response_archive", "archived_respondent", "response_sketch",
+)
+# Every table created on a shard. `survey_search` is created with them by the metadata's
+# `after_create` hook. Pending outbox messages and bulk-load checkpoints stay with the shard that
+# wrote them.
+SHARDED_TABLES = SURVEY_TABLES + ("outbox_message", "bulk_load_checkpoint")
+# Ids exposed outside a survey (`/responses/<id>`, crosstab question ids) are kept unique across
+# shards by starting shard k's sequences at k * SHARD_ID_BLOCK
+ID_FLOOR_TABLES = ("question", "response")
+MOVE_BATCH_SIZE = 5000
+
+
+def placement(survey_id: int, shard_count: int) -> int:
+    """Shard a new survey is created on: a stable hash of its id."""
+    return zlib.crc32(str(survey_id).encode()) % shard_count
+
+
+class ShardRouter:
+    """
+    Routes each survey, with its questions, versions and responses, to one of several databases.
+
+    Shards are listed in `SHARD_DATABASE_URIS`; their engines are created on first use and, like
+    the default one, drop inherited connections after fork. The default database keeps the
+    directory (`survey_shard`): survey ids are allocated there and each survey is placed on
+    `crc32(id) % shards`, unless it has been moved since. Directory lookups are cached for
+    `SHARD_DIRECTORY_TTL` seconds. Without shards every method falls back to the default
+    database, so callers route the same way in both modes.
+    """
+    def __init__(self, app: Optional[Flask] = None):
+        self.shard_count = 0
+        self._uris: List[str] = []
+        self._engines: Dict[int, Engine] = {}
+        self._engine_lock = threading.Lock()
+        self._directory = LRUCache(maxsize=100_000)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the shard databases on an application.
+
+        Args:
+            app (Flask): The Flask application.
+        """
+        app.extensions["shard_router"] = self
+        self._uris = list(app.config.get("SHARD_DATABASE_URIS") or [])
+        self._engine_options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        self.shard_count = len(self._uris)
+        self.id_block = app.config.get("SHARD_ID_BLOCK", 100_000_000)
+        self.directory_ttl = app.config.get("SHARD_DIRECTORY_TTL", 30)
+        if self._uris:
+            # Forked workers must neither share pooled connections nor inherit fan-out threads
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count > 0
+
+    def shards(self) -> List[Optional[int]]:
+        """Every shard, or `[None]` (the default database) when unsharded."""
+        return list(range(self.shard_count)) if self.sharded else [None]
+
+    def databases(self) -> List[Optional[int]]:
+        """The default database (`None`) followed by every shard, e.g. for outbox relays."""
+        return [None] + list(range(self.shard_count))
+
+    def engine(self, shard: Optional[int]) -> Engine:
+        if shard is None:
+            return db.engine
+        with self._engine_lock:
+            if shard not in self._engines:
+                self._engines[shard] = create_engine(self._uris[shard], **self._engine_options)
+            return self._engines[shard]
+
+    def shard_session(self, shard: Optional[int]) -> OrmSession:
+        return Session() if shard is None else Session(bind=self.engine(shard))
+
+    def session(self, survey_id: Optional[int]) -> OrmSession:
+        """
+        Open a session on the shard holding a survey.
+
+        Args:
+            survey_id (int, optional): The survey; None opens a session on the default database.
+
+        Returns:
+            Session: A new session, to be used as a context manager.
+        """
+        return self.shard_session(self.shard_for(survey_id) if survey_id is not None else None)
+
+    def write(self, survey_id: Optional[int], fn: Callable[[OrmSession], Any]) -> Any:
+        """
+        Run a write with a session on the shard holding a survey.
+
+        In embedded SQLite mode (`survey.utils.embedded`), `fn` runs on the single writer thread
+        and is committed together with the other queued writes, so it must return plain data
+        rather than ORM objects.
+
+        Args:
+            survey_id (int, optional): The survey; None writes to the default database.
+            fn (Callable): Receives a session and commits its work.
+
+        Returns:
+            Any: What `fn` returned.
+        """
+        return self.write_shard(self.shard_for(survey_id) if survey_id is not None else None, fn)
+
+    def write_shard(self, shard: Optional[int], fn: Callable[[OrmSession], Any]) -> Any:
+        """Run a write with a session on one shard; see `write`."""
+        writer = current_app.extensions.get("sqlite_writer")
+        if writer is not None:
+            return writer.run(fn)
+        with self.shard_session(shard) as session:
+            return fn(session)
+
+    def shard_for(self, survey_id: int) -> Optional[int]:
+        """
+        Find the shard holding a survey.
+
+        Surveys missing from the directory map to their hash placement, where they are reported
+        as not found.
+
+        Args:
+            survey_id (int): The survey.
+
+        Returns:
+            int or None: The shard, or None when unsharded.
+        """
+        if not self.sharded:
+            return None
+        now = time.monotonic()
+        cached = self._directory.get(survey_id)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        shard = self._lookup(survey_id)
+        if shard is None:
+            shard = placement(survey_id, self.shard_count)
+        self._directory.set(survey_id, (shard, now + self.directory_ttl))
+        return shard
+
+    def _lookup(self, survey_id: int) -> Optional[int]:
+        with Session() as session:
+            return session.execute(select(SurveyShard.shard).where(SurveyShard.survey_id == survey_id)).scalar()
+
+    def group_by_shard(self, survey_ids: Iterable[int]) -> Dict[Optional[int], List[int]]:
+        """Split survey ids by the shard holding them, keeping their order."""
+        groups: Dict[Optional[int], List[int]] = {}
+        for survey_id in survey_ids:
+            groups.setdefault(self.shard_for(survey_id), []).append(survey_id)
+        return groups
+
+    def response_shards(self, response_id: int) -> List[Optional[int]]:
+        """
+        Shards to look for a response in, most likely first.
+
+        A response normally lives on the shard whose id range it falls in; responses of moved
+        surveys keep their ids, so the other shards are searched after it.
+        """
+        if not self.sharded:
+            return [None]
+        home = (response_id - 1) // self.id_block
+        shards = list(range(self.shard_count))
+        if 0 <= home < self.shard_count:
+            shards.remove(home)
+            shards.insert(0, home)
+        return shards
+
+    def allocate_survey_id(self) -> Optional[int]:
+        """
+        Allocate the id of a new survey in the directory and place it on a shard.
+
+        An id whose survey is never created stays in the directory, pointing at an empty slot.
+
+        Returns:
+            int or None: The new id, or None when unsharded (the database assigns it).
+        """
+        if not self.sharded:
+            return None
+        with Session() as session:
+            entry = SurveyShard(shard=0)
+            session.add(entry)
+            session.flush()
+            entry.shard = placement(entry.survey_id, self.shard_count)
+            session.commit()
+            survey_id, shard = entry.survey_id, entry.shard
+        self._directory.set(survey_id, (shard, time.monotonic() + self.directory_ttl))
+        return survey_id
+
+    def release(self, survey_ids: Iterable[int]) -> None:
+        """Drop the directory entries of deleted surveys."""
+        survey_ids = list(survey_ids)
+        if not self.sharded or not survey_ids:
+            return
+        with Session() as session:
+            session.execute(delete(SurveyShard).where(SurveyShard.survey_id.in_(survey_ids)))
+            session.commit()
+        for survey_id in survey_ids:
+            self._directory.pop(survey_id)
+
+    def sessions(self, shards: Optional[Iterable[Optional[int]]] = None) -> Iterator[OrmSession]:
+        """Open a session on each shard in turn, closing it before the next one is opened."""
+        for shard in self.shards() if shards is None else shards:
+            with self.shard_session(shard) as session:
+                yield session
+
+    def fan_out(self, fn: Callable[[OrmSession], Any], shards: Optional[Iterable[Optional[int]]] = None) -> List[Any]:
+        """
+        Call `fn` with a session on every shard, in parallel, and collect the results.
+
+        Args:
+            fn (Callable): Receives a session; runs in an app context but outside the request.
+            shards (Iterable, optional): Shards to run on. Defaults to `shards()`.
+
+        Returns:
+            list: The results in shard order.
+
+        Raises:
+            Exception: The first error raised by `fn`.
+        """
+        shards = self.shards() if shards is None else shards
+        return self.fan_out_grouped(lambda session, _: fn(session), dict.fromkeys(shards))
+
+    def fan_out_grouped(self, fn: Callable[[OrmSession, Any], Any], groups: Dict[Optional[int], Any]) -> List[Any]:
+        """
+        Call `fn(session, value)` on the shard of each `groups` entry, in parallel.
+
+        Args:
+            fn (Callable): Receives a session and the group's value, e.g. its survey ids.
+            groups (dict): Values keyed by shard, e.g. from `group_by_shard`.
+
+        Returns:
+            list: The results in the order of `groups`.
+        """
+        if len(groups) <= 1:
+            return [self._run(fn, shard, value) for shard, value in groups.items()]
+        app = current_app._get_current_object()
+        budget = current_budget()
+
+        def run(item):
+            with app.app_context(), budget_scope(budget):
+                return self._run(fn, *item)
+
+        return list(self._executor().map(run, groups.items()))
+
+    def write_grouped(self, fn: Callable[[OrmSession, Any], Any], groups: Dict[Optional[int], Any]) -> List[Any]:
+        """Like `fan_out_grouped`, for writes: through the writer thread in embedded SQLite mode."""
+        if current_app.extensions.get("sqlite_writer") is None:
+            return self.fan_out_grouped(fn, groups)
+        return [self.write_shard(shard, lambda session, value=value: fn(session, value)) for shard, value in groups.items()]
+
+    def _run(self, fn: Callable[[OrmSession, Any], Any], shard: Optional[int], value: Any) -> Any:
+        with self.shard_session(shard) as session:
+            return fn(session, value)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=max(self.shard_count, 1) * 4,
+                                                thread_name_prefix="shard-fan-out")
+            return self._pool
+
+    def _after_fork(self) -> None:
+        for engine in self._engines.values():
+            engine.dispose(close=False)
+        self._engine_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def init_shards(self) -> None:
+        """
+        Create the survey tables on every shard and start each shard's id sequences in its range.
+
+        Safe to run again, e.g. after adding shards. Shards are created from the models, so
+        stamp them (`DATABASE_URL=<shard> flask db stamp head`) before running later migrations
+        against them.
+        """
+        tables = [db.metadata.tables[name] for name in SHARDED_TABLES]
+        for shard in range(self.shard_count):
+            engine = self.engine(shard)
+            db.metadata.create_all(engine, tables=tables)
+            with engine.begin() as connection:
+                self._set_id_floors(connection, shard * self.id_block)
+            logger.info("Initialized shard %s (%s)", shard, engine.url.render_as_string(hide_password=True))
+
+    @staticmethod
+    def _set_id_floors(connection: Connection, floor: int) -> None:
+        if not floor:
+            return
+        for table in ID_FLOOR_TABLES:
+            if connection.dialect.name == "sqlite":
+                # Tables declared with sqlite_autoincrement continue from their sqlite_sequence row
+                current = connection.execute(
+                    text("SELECT seq FROM sqlite_sequence WHERE name = :table"), {"table": table}
+                ).scalar()
+                if current is None:
+                    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:table, :floor)"),
+                                       {"table": table, "floor": floor})
+                elif current < floor:
+                    connection.execute(text("UPDATE sqlite_sequence SET seq = :floor WHERE name = :table"),
+                                       {"table": table, "floor": floor})
+            elif connection.dialect.name == "postgresql":
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"greatest(:floor, (SELECT coalesce(max(id), 0) FROM {table})) + 1, false)"
+                ), {"floor": floor})
+
+    def move_survey(self, survey_id: int, target: int) -> Dict[str, Any]:
+        """
+        Move a survey and everything belonging to it to another shard.
+
+        Rows are copied to the target, the directory is switched, and after `SHARD_DIRECTORY_TTL`
+        (once every process routes to the target) responses that still reached the source are
+        copied too, before the source rows are deleted. Edits made to the survey or to existing
+        responses during the move are not carried over. Running it again after an interruption
+        finishes the move; with the survey already on `target` it removes leftover copies from
+        the other shards.
+
+        Postgres sequences ignore copied ids, but SQLite continues after the largest id in a
+        table, so on SQLite shards a survey moved to a lower shard pushes that shard's new ids
+        into a higher shard's range. Use SQLite shards for local testing only.
+
+        Args:
+            survey_id (int): The survey to move.
+            target (int): The destination shard.
+
+        Returns:
+            dict: The source and target shards and the number of rows copied per table.
+
+        Raises:
+            SurveyException: If the router is unsharded or `target` does not exist.
+            SurveyNotFoundError: If the survey does not exist.
+        """
+        if not 0 <= target < self.shard_count:
+            raise SurveyException(f"Shard {target} does not exist; {self.shard_count} shards are configured")
+        self._directory.pop(survey_id)
+        source = self.shard_for(survey_id)
+
+        if source == target:
+            removed = []
+            for shard in range(self.shard_count):
+                if shard == target:
+                    continue
+                with self.shard_session(shard) as session:
+                    if session.get(Survey, survey_id) is not None:
+                        self._delete_survey_rows(session, survey_id)
+                        session.commit()
+                        removed.append(shard)
+            logger.info("Survey %s is already on shard %s; removed copies from %s", survey_id, target, removed)
+            return {"survey_id": survey_id, "source": source, "target": target, "copied": {}, "removed_from": removed}
+
+        with self.shard_session(source) as source_session, self.shard_session(target) as target_session:
+            if source_session.get(Survey, survey_id) is None:
+                raise SurveyNotFoundError(survey_id)
+            # Leftovers of an interrupted move
+            self._delete_survey_rows(target_session, survey_id)
+            copied = {name: self._copy_rows(source_session, target_session, name, survey_id) for name in SURVEY_TABLES}
+            SearchService(target_session).index_surveys([survey_id])
+            target_session.commit()
+            last_response_id = target_session.execute(
+                select(func.max(Response.id)).where(Response.survey_id == survey_id)
+            ).scalar() or 0
+
+        with Session() as session:
+            entry = session.get(SurveyShard, survey_id)
+            if entry is None:
+                session.add(SurveyShard(survey_id=survey_id, shard=target))
+            else:
+                entry.shard = target
+            session.commit()
+        self._directory.pop(survey_id)
+        logger.info("Survey %s now routes to shard %s; waiting %ss for cached routes to expire",
+                    survey_id, target, self.directory_ttl)
+        # Other processes keep routing to the source until their cached entry expires
+        time.sleep(self.directory_ttl)
+
+        with self.shard_session(source) as source_session, self.shard_session(target) as target_session:
+            late = self._copy_rows(source_session, target_session, "response", survey_id, after_id=last_response_id)
+            copied["response"] += late
+            target_session.commit()
+            self._delete_survey_rows(source_session, survey_id)
+            source_session.commit()
+
+        logger.info("Moved survey %s from shard %s to %s (%s late responses)", survey_id, source, target, late)
+        return {"survey_id": survey_id, "source": source, "target": target, "copied": copied, "removed_from": [source]}
+
+    @staticmethod
+    def _copy_rows(source: OrmSession, target: OrmSession, name: str, survey_id: int, after_id: int = 0) -> int:
+        table = db.metadata.tables[name]
+        key = table.c.id if name == "survey" else table.c.survey_id
+        query = select(table).where(key == survey_id)
+        if name == "response":
+            query = query.where(table.c.id > after_id).order_by(table.c.id)
+        result = source.execute(query.execution_options(yield_per=MOVE_BATCH_SIZE))
+        count = 0
+        for batch in result.mappings().partitions():
+            target.execute(insert(table), [dict(row) for row in batch])
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def _delete_survey_rows(session: OrmSession, survey_id: int) -> None:
+        for name in reversed(SURVEY_TABLES):
+            table = db.metadata.tables[name]
+            key = table.c.id if name == "survey" else table.c.survey_id
+            session.execute(delete(table).where(key == survey_id))
+        SearchService(session).remove_surveys([survey_id])
+
+
+def get_shard_router() -> ShardRouter:
+    """Return the current application's shard router."""
+    return current_app.extensions["shard_router"]
+
+
+def merge_sorted(results: Iterable[List[Any]], key: Callable[[Any], Any]) -> List[Any]:
+    """Merge per-shard lists that are each sorted by `key` into one sorted list."""
+    return list(heapq.merge(*results, key=key))
+
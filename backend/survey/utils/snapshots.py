@@ -0,0 +1,181 @@
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, current_app, request, send_file
+from flask import Response as FlaskResponse
+from werkzeug.datastructures import Accept
+
+from survey.utils.compression import CODECS, CachedBody
+
+# File suffix of each precompressed variant
+SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+CURRENT = "current"
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{16}")
+
+
+def snapshot_url(survey_id: int, digest: str) -> str:
+    return f"/surveys/{survey_id}/snapshots/{digest}"
+
+
+class SnapshotStore:
+    """
+    Published survey documents rendered once to static, precompressed JSON files.
+
+    `<directory>/<survey_id>/<digest>.json` holds a document, next to `.json.zst`, `.json.br` and
+    `.json.gz` variants when it is large enough to compress, and `current` names the digest being
+    served. Files are never modified in place: a new snapshot is written beside the old one, then
+    `current` is atomically replaced, so readers see one snapshot or the other, whole. The
+    previous snapshot is kept for requests that read `current` just before the switch.
+    """
+    def __init__(self, directory: str, compression: bool = True, min_size: int = 1024):
+        self.directory = directory
+        self.compression = compression
+        self.min_size = min_size
+
+    @classmethod
+    def from_app(cls, app: Optional[Flask] = None) -> Optional["SnapshotStore"]:
+        """
+        Build the store configured by `SNAPSHOT_DIR`.
+
+        Args:
+            app (Flask, optional): The Flask application. Defaults to `current_app`.
+
+        Returns:
+            SnapshotStore or None: The store, or None when snapshots are disabled.
+        """
+        app = app or current_app
+        directory = app.config.get("SNAPSHOT_DIR")
+        if not directory:
+            return None
+        return cls(
+            # Absolute, so `X-Sendfile` paths do not depend on the web server's working directory
+            os.path.abspath(directory),
+            compression=app.config.get("COMPRESSION_ENABLED", True),
+            min_size=app.config.get("COMPRESSION_MIN_SIZE", 1024),
+        )
+
+    def path(self, survey_id: int, digest: str, encoding: Optional[str] = None) -> str:
+        return os.path.join(self.directory, str(survey_id), f"{digest}.json{SUFFIXES[encoding] if encoding else ''}")
+
+    def current(self, survey_id: int) -> Optional[str]:
+        """Digest of the snapshot served for a survey, or None when it has none."""
+        try:
+            with open(os.path.join(self.directory, str(survey_id), CURRENT)) as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def exists(self, survey_id: int, digest: str) -> bool:
+        return bool(DIGEST_PATTERN.fullmatch(digest)) and os.path.exists(self.path(survey_id, digest))
+
+    def write(self, survey_id: int, body: CachedBody) -> str:
+        """
+        Make `body` the served snapshot of a survey.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            body (CachedBody): The serialized survey document.
+
+        Returns:
+            str: The digest naming the snapshot.
+        """
+        digest = hashlib.sha256(body.data).hexdigest()[:16]
+        previous = self.current(survey_id)
+        if previous == digest:
+            return digest
+
+        directory = os.path.join(self.directory, str(survey_id))
+        os.makedirs(directory, exist_ok=True)
+        files: Dict[Optional[str], bytes] = {None: body.data}
+        if self.compression and len(body.data) >= self.min_size:
+            files.update((encoding, body.encoded(encoding)) for encoding in CODECS)
+        for encoding, data in files.items():
+            self._replace(directory, self.path(survey_id, digest, encoding), data)
+        self._replace(directory, os.path.join(directory, CURRENT), digest.encode())
+
+        keep = {digest, previous, CURRENT}
+        for name in os.listdir(directory):
+            if name.split(".", 1)[0] not in keep and not name.endswith(".tmp"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(directory, name))
+        return digest
+
+    @staticmethod
+    def _replace(directory: str, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            # Readable by a web server sending the files itself
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+
+    def remove(self, survey_id: int) -> None:
+        """Stop serving a survey's snapshot and delete its files."""
+        directory = os.path.join(self.directory, str(survey_id))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(directory, CURRENT))
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def variant(self, survey_id: int, digest: str, accept_encodings: Accept) -> Tuple[str, Optional[str]]:
+        """
+        Pick the file of a snapshot to send for an `Accept-Encoding` header.
+
+        Returns:
+            tuple: The file path and its `Content-Encoding`, None for the uncompressed file.
+        """
+        encoding = accept_encodings.best_match(list(CODECS))
+        if encoding and os.path.exists(self.path(survey_id, digest, encoding)):
+            return self.path(survey_id, digest, encoding), encoding
+        return self.path(survey_id, digest), None
+
+    @staticmethod
+    def headers(survey_id: int, digest: str, encoding: Optional[str], max_age: Optional[int]) -> Dict[str, str]:
+        """
+        Caching headers of a snapshot response.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            digest (str): The snapshot digest.
+            encoding (str, optional): The `Content-Encoding` sent.
+            max_age (int, optional): Lifetime of an immutable, versioned URL; None for the
+                survey's own URL, which clients revalidate with `If-None-Match`.
+
+        Returns:
+            dict: Response headers.
+        """
+        headers = {
+            "ETag": f'"{digest}-{encoding}"' if encoding else f'"{digest}"',
+            "Vary": "Accept-Encoding",
+            "Cache-Control": f"public, max-age={max_age}, immutable" if max_age else "no-cache",
+            "Content-Location": snapshot_url(survey_id, digest),
+        }
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return headers
+
+    def send(self, survey_id: int, digest: str, max_age: Optional[int] = None) -> FlaskResponse:
+        """
+        Send a snapshot with `send_file`, as an `X-Sendfile` header when `USE_X_SENDFILE` is set.
+
+        Args:
+            survey_id (int): The ID of the survey.
+            digest (str): The snapshot digest.
+            max_age (int, optional): See `headers`.
+
+        Returns:
+            Response: The file response, or 304 when the client's copy is current.
+        """
+        path, encoding = self.variant(survey_id, digest, request.accept_encodings)
+        headers = self.headers(survey_id, digest, encoding, max_age)
+        response = send_file(path, mimetype="application/json", etag=headers.pop("ETag").strip('"'), conditional=True)
+        response.headers.update(headers)
+        return response
@@ -1,27 +1,28 @@
+import hashlib
 import logging
 import pytz
 from dateutil import parser
 from datetime import timezone
-from typing import Optional
+from typing import Any, Iterable, List, Optional
 
-_logger: Optional[logging.Logger] = None
+def get_logger(name: str = "survey") -> logging.Logger:
+    """
+    Return a logger in the `survey` hierarchy, setting up the logging pipeline on first use.
+
+    Pass the module's `__name__` so `LOG_LEVELS` can tune levels per module. Log with
+    %-style arguments, e.g. `logger.debug("Survey id=%s", survey_id)`, so disabled levels
+    skip formatting.
 
-def get_logger() -> logging.Logger:
-    global _logger
-    if _logger is not None:
-        return _logger
+    Args:
+        name (str): Logger name.
 
-    _logger = logging.getLogger("survey")
-    if not _logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-        _logger.addHandler(handler)
+    Returns:
+        logging.Logger: The logger.
+    """
+    from survey.utils.log import configure_logging
 
-    _logger.setLevel(logging.INFO)
-    return _logger
+    configure_logging()
+    return logging.getLogger(name)
 
 
 def convert_to_utc(datetime_str: str, tz_name: str = "UTC"):
@@ -52,3 +53,89 @@ def convert_to_utc(datetime_str: str, tz_name: str = "UTC"):
     dt_utc = dt.astimezone(timezone.utc)
 
     return dt_utc
+
+
+def str_to_bool(value: Optional[str], default: bool = False) -> bool:
+    """
+    Interpret a query-string or env style flag such as "1", "true" or "yes".
+
+    Args:
+        value (str, optional): The raw string value.
+        default (bool): Value returned when `value` is None or empty.
+
+    Returns:
+        bool: The parsed flag.
+    """
+    if value is None or value == "":
+        return default
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def extract_answer(answers: Any, question_id: int, question_text: str) -> Any:
+    """
+    Find the answer given to a question inside a stored `Response.answers` payload.
+
+    Answers are stored as a list of `{"question": <text>, "answer": <value>}` entries
+    (optionally carrying a `question_id`), or as a mapping keyed by question id or text.
+
+    Args:
+        answers (list or dict): The stored answers payload.
+        question_id (int): ID of the question.
+        question_text (str): Text of the question.
+
+    Returns:
+        Any: The answer value (a list for checkbox questions), or None if unanswered.
+    """
+    if isinstance(answers, dict):
+        for key in (question_id, str(question_id), question_text):
+            if key in answers:
+                return answers[key]
+        return None
+
+    for entry in answers or []:
+        if not isinstance(entry, dict):
+            continue
+        if entry.get("question_id") == question_id or entry.get("question") == question_text:
+            return entry.get("answer")
+    return None
+
+
+def hash_email(email: Optional[str]) -> Optional[str]:
+    """
+    Hash an email address for indexed lookups, after trimming and lowercasing it.
+
+    Args:
+        email (str, optional): The email address.
+
+    Returns:
+        str or None: Hex SHA-256 of the normalized address, or None for a blank address.
+    """
+    normalized = (email or "").strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest() if normalized else None
+
+
+def parse_fieldset(value: Optional[str], allowed: Iterable[str], param: str = "fields") -> Optional[List[str]]:
+    """
+    Parse a comma-separated query parameter such as `?fields=id,title` into known names.
+
+    Args:
+        value (str, optional): The raw parameter value.
+        allowed (Iterable[str]): Names the parameter may contain.
+        param (str): Parameter name used in error messages.
+
+    Returns:
+        List[str] or None: The names in request order without duplicates, or None when absent.
+
+    Raises:
+        SurveyException: If the value is empty or names an unknown field.
+    """
+    from survey.utils.exceptions import SurveyException
+
+    if value is None:
+        return None
+    allowed = list(allowed)
+    names = list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if not names or unknown:
+        raise SurveyException(f"Invalid '{param}': {', '.join(unknown) or 'empty'}. Allowed: {', '.join(allowed)}.")
+    return names
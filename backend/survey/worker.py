@@ -0,0 +1,6 @@
+"""Celery worker entry point: `celery -A survey.worker:celery worker`."""
+from survey.app import create_app
+from survey.celery_worker import make_celery
+
+app = create_app(register_api=False)
+celery = make_celery(app)
@@ -1,4 +1,6 @@
 from survey.utils.utils import get_logger
-from survey.driver import api_enabled_app as app
+from survey.app import create_app
 
-logger = get_logger()
+app = create_app()
+
+logger = get_logger(__name__)